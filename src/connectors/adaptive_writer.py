@@ -0,0 +1,162 @@
+"""
+Ajustement dynamique des écritures MongoDB (AIMD).
+
+Une taille de batch fixe (MONGO_INSERT_BATCH_SIZE) n'est bonne que pour une
+cible : replica set local, MongoDB standalone sur ECS ou un petit tier Atlas
+ne supportent pas la même charge. Le contrôleur règle pendant le chargement :
+- la taille des batchs d'insert_many
+- le nombre de batchs en vol (insertions concurrentes)
+
+Règle AIMD (augmentation additive, diminution multiplicative) :
+- batch réussi sous la latence cible : taille + pas additif, et un batch en
+  vol de plus après plusieurs succès consécutifs (si le taux d'erreur récent
+  reste sous le seuil)
+- batch trop lent, erreur transitoire (réseau, délai) ou write concern non
+  satisfait : taille et concurrence divisées par deux
+
+Avec un write concern majoritaire, la latence mesurée inclut la réplication :
+un secondaire en retard ralentit les acquittements et fait reculer le
+contrôleur avant que le retard ne s'accumule.
+"""
+
+import logging
+import os
+from collections import deque
+
+from pymongo import errors
+
+from src.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_MIN_BATCH = 500
+DEFAULT_MAX_BATCH = 20000
+DEFAULT_MAX_INFLIGHT = 4
+DEFAULT_TARGET_LATENCY_MS = 1500
+
+# Succès consécutifs avant d'ajouter un batch en vol
+INCREASE_EVERY = 3
+# Fenêtre (en batchs) du taux d'erreur
+ERROR_WINDOW = 20
+DEFAULT_MAX_ERROR_RATE = 0.1
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """
+    Erreur de surcharge ou de réseau : le batch peut être réessayé.
+
+    WTimeoutError est exclu : les écritures ont déjà été appliquées sur le primaire.
+    """
+    if isinstance(exc, (errors.AutoReconnect, errors.ExecutionTimeout)):
+        return True
+    if isinstance(exc, errors.OperationFailure) and not isinstance(exc, errors.BulkWriteError):
+        # Cache du moteur saturé / limitation de débit (Atlas)
+        return exc.has_error_label("RetryableWriteError") or exc.code in (91, 189, 262, 462)
+    return False
+
+
+class AdaptiveWriteController:
+    """
+    Taille de batch et nombre de batchs en vol, ajustés batch après batch.
+
+    Attributs:
+        batch_size: taille du prochain batch
+        concurrency: nombre maximal de batchs en vol
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, min_batch: int = DEFAULT_MIN_BATCH,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_concurrency: int = DEFAULT_MAX_INFLIGHT,
+                 target_latency_s: float = DEFAULT_TARGET_LATENCY_MS / 1000,
+                 max_error_rate: float = DEFAULT_MAX_ERROR_RATE):
+        self.min_batch = max(1, min(min_batch, max_batch))
+        self.max_batch = max(max_batch, self.min_batch)
+        self.max_concurrency = max(1, max_concurrency)
+        self.target_latency_s = target_latency_s
+        self.max_error_rate = max_error_rate
+
+        self.batch_size = min(max(batch_size, self.min_batch), self.max_batch)
+        self.concurrency = 1
+        self.step = self.min_batch
+        self._streak = 0
+        self._outcomes = deque(maxlen=ERROR_WINDOW)
+        self.stats = {"batches": 0, "errors": 0, "decreases": 0,
+                      "peak_batch_size": self.batch_size, "peak_concurrency": 1}
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveWriteController":
+        """Bornes lues dans MONGO_INSERT_BATCH_SIZE (taille de départ), MONGO_BATCH_MIN/MAX, etc."""
+        return cls(
+            batch_size=int(os.getenv("MONGO_INSERT_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+            min_batch=int(os.getenv("MONGO_BATCH_MIN", DEFAULT_MIN_BATCH)),
+            max_batch=int(os.getenv("MONGO_BATCH_MAX", DEFAULT_MAX_BATCH)),
+            max_concurrency=int(os.getenv("MONGO_MAX_INFLIGHT", DEFAULT_MAX_INFLIGHT)),
+            target_latency_s=float(os.getenv("MONGO_TARGET_LATENCY_MS", DEFAULT_TARGET_LATENCY_MS)) / 1000,
+            max_error_rate=float(os.getenv("MONGO_MAX_ERROR_RATE", DEFAULT_MAX_ERROR_RATE))
+        )
+
+    @classmethod
+    def fixed(cls, batch_size: int) -> "AdaptiveWriteController":
+        """Taille imposée, un seul batch en vol (aucun ajustement)."""
+        return cls(batch_size=batch_size, min_batch=batch_size, max_batch=batch_size, max_concurrency=1)
+
+    @property
+    def adaptive(self) -> bool:
+        return self.min_batch < self.max_batch or self.max_concurrency > 1
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def describe_bounds(self) -> str:
+        return (f"batch {self.min_batch}-{self.max_batch} (départ {self.batch_size}), "
+                f"batchs en vol 1-{self.max_concurrency}, latence cible {self.target_latency_s * 1000:.0f} ms")
+
+    # ─────────────────────────────────────────────────────────────
+    # RÉACTION AUX BATCHS
+    # ─────────────────────────────────────────────────────────────
+
+    def record_success(self, latency_s: float):
+        """Batch acquitté : augmentation additive sous la latence cible, sinon réduction."""
+        self.stats["batches"] += 1
+        self._outcomes.append(False)
+        if latency_s > self.target_latency_s:
+            self._decrease(f"latence {latency_s * 1000:.0f} ms")
+            return
+
+        self.batch_size = min(self.batch_size + self.step, self.max_batch)
+        self._streak += 1
+        if (self._streak >= INCREASE_EVERY and self.concurrency < self.max_concurrency
+                and self.error_rate <= self.max_error_rate):
+            self.concurrency += 1
+            self._streak = 0
+        self.stats["peak_batch_size"] = max(self.stats["peak_batch_size"], self.batch_size)
+        self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], self.concurrency)
+        self._publish()
+
+    def record_failure(self, reason: str = "erreur"):
+        """Erreur transitoire ou write concern non satisfait : diminution multiplicative."""
+        self.stats["batches"] += 1
+        self.stats["errors"] += 1
+        self._outcomes.append(True)
+        self._decrease(reason)
+
+    def _decrease(self, reason: str):
+        previous = (self.batch_size, self.concurrency)
+        self.batch_size = max(self.batch_size // 2, self.min_batch)
+        self.concurrency = max(self.concurrency // 2, 1)
+        self._streak = 0
+        if (self.batch_size, self.concurrency) != previous:
+            self.stats["decreases"] += 1
+            logger.info(f"   ↘ Écritures MongoDB ralenties ({reason}) : batch {previous[0]} -> {self.batch_size}, "
+                        f"en vol {previous[1]} -> {self.concurrency}")
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge("etl_insert_batch_size", self.batch_size)
+        metrics.set_gauge("etl_insert_inflight_batches", self.concurrency)
+
+    def summary(self) -> str:
+        return (f"batch {self.batch_size} (max atteint {self.stats['peak_batch_size']}), "
+                f"en vol {self.concurrency} (max atteint {self.stats['peak_concurrency']}), "
+                f"{self.stats['decreases']} réduction(s), taux d'erreur {self.error_rate:.0%}")
@@ -0,0 +1,219 @@
+"""
+Lecture colonnaire des mesures MongoDB vers pandas / Arrow.
+
+Au lieu de matérialiser une liste de dictionnaires puis pd.DataFrame,
+chaque batch BSON brut (find_raw_batches) est décodé et versé directement
+dans des colonnes NumPy :
+- measurements.* aplaties en float64 (NaN si absent)
+- timestamp en datetime64[ms]
+- station_id en catégorie pandas
+
+Les lectures peuvent être parallélisées par plages (station_id, timestamp),
+chaque plage utilisant l'index idx_station_timestamp.
+"""
+
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import bson
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from bson.codec_options import CodecOptions
+
+logger = logging.getLogger(__name__)
+
+MEASUREMENT_FIELDS = ["temperature_celsius", "humidity_percent", "wind_speed_kmh", "pressure_hpa"]
+INDEX_HINT = [("station_id", 1), ("timestamp", 1)]
+
+# Décodage BSON sans conversion tz (datetimes naïfs, comme le reste du pipeline)
+_CODEC_OPTIONS = CodecOptions(tz_aware=False)
+
+
+def _iter_document_batches(collection, query: dict, projection: dict, batch_size: int):
+    """
+    Itère sur les batchs de documents.
+    - MongoDB réel : batchs BSON bruts décodés en bloc (find_raw_batches)
+    - mongomock    : curseur classique découpé en batchs
+    """
+    try:
+        raw_cursor = collection.find_raw_batches(query, projection, batch_size=batch_size).hint(INDEX_HINT)
+    except NotImplementedError:
+        raw_cursor = None
+
+    if raw_cursor is not None:
+        for raw_batch in raw_cursor:
+            yield bson.decode_all(raw_batch, _CODEC_OPTIONS)
+        return
+
+    cursor = collection.find(query, projection).hint(INDEX_HINT).batch_size(batch_size)
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _batch_to_columns(docs: list, fields: list) -> dict:
+    """Convertit un batch de documents en colonnes NumPy."""
+    n = len(docs)
+    columns = {
+        "station_id": [d.get("station_id") for d in docs],
+        "timestamp": np.array([d.get("timestamp") for d in docs], dtype="datetime64[ms]"),
+    }
+    nan = math.nan
+    for field in fields:
+        values = ((d.get("measurements") or {}).get(field) for d in docs)
+        columns[field] = np.fromiter(
+            (nan if v is None else v for v in values), dtype=np.float64, count=n
+        )
+    return columns
+
+
+def read_columns(collection, query: dict, fields: list = None, batch_size: int = 10000) -> dict:
+    """
+    Lit les mesures correspondant à 'query' sous forme de colonnes NumPy.
+
+    Returns:
+        dict: {station_id: list, timestamp: datetime64[ms], <field>: float64}
+    """
+    fields = fields or MEASUREMENT_FIELDS
+    projection = {"_id": 0, "station_id": 1, "timestamp": 1}
+    projection.update({f"measurements.{field}": 1 for field in fields})
+
+    chunks = [_batch_to_columns(docs, fields)
+              for docs in _iter_document_batches(collection, query, projection, batch_size)]
+
+    if not chunks:
+        return _empty_columns(fields)
+
+    columns = {"station_id": [sid for chunk in chunks for sid in chunk["station_id"]]}
+    for name in ["timestamp"] + fields:
+        columns[name] = np.concatenate([chunk[name] for chunk in chunks])
+    return columns
+
+
+def _empty_columns(fields: list) -> dict:
+    columns = {"station_id": [], "timestamp": np.array([], dtype="datetime64[ms]")}
+    columns.update({field: np.array([], dtype=np.float64) for field in fields})
+    return columns
+
+
+def columns_to_frame(columns: dict) -> pd.DataFrame:
+    """Assemble les colonnes en DataFrame (station_id catégoriel)."""
+    frame = {"station_id": pd.Categorical(columns["station_id"])}
+    frame.update({name: values for name, values in columns.items() if name != "station_id"})
+    return pd.DataFrame(frame, copy=False)
+
+
+# =============================================================================
+# LECTURE PARALLÈLE PAR PLAGES (station_id, timestamp)
+# =============================================================================
+
+def build_base_query(station_ids=None, start=None, end=None) -> dict:
+    """Filtre MongoDB sur les mesures (station / période)."""
+    query = {"record_type": "measurement"}
+    if station_ids:
+        query["station_id"] = {"$in": list(station_ids)}
+    time_filter = {}
+    if start is not None:
+        time_filter["$gte"] = start
+    if end is not None:
+        time_filter["$lt"] = end
+    if time_filter:
+        query["timestamp"] = time_filter
+    return query
+
+
+def plan_partitions(collection, station_ids=None, start=None, end=None, splits_per_station: int = 1) -> list:
+    """
+    Découpe la lecture en plages (station_id, [t0, t1[) disjointes.
+    Les bornes min/max par station sont lues via l'index idx_station_timestamp.
+
+    Returns:
+        list: Filtres MongoDB, un par plage
+    """
+    base = build_base_query(station_ids, start, end)
+    stations = station_ids or sorted(s for s in collection.distinct("station_id", base) if s)
+
+    partitions = []
+    for station_id in stations:
+        station_query = dict(base, station_id=station_id)
+        if splits_per_station <= 1:
+            partitions.append(station_query)
+            continue
+
+        first = collection.find_one(station_query, {"timestamp": 1}, sort=[("timestamp", 1)])
+        last = collection.find_one(station_query, {"timestamp": 1}, sort=[("timestamp", -1)])
+        if first is None:
+            continue
+
+        t_min, t_max = first["timestamp"], last["timestamp"]
+        step = (t_max - t_min) / splits_per_station
+        if step.total_seconds() <= 0:
+            partitions.append(station_query)
+            continue
+
+        bounds = [t_min + step * i for i in range(splits_per_station)]
+        for i, lower in enumerate(bounds):
+            time_filter = dict(base.get("timestamp", {}))
+            time_filter["$gte"] = lower if i > 0 else time_filter.get("$gte", t_min)
+            if i + 1 < len(bounds):
+                time_filter["$lt"] = bounds[i + 1]
+            partitions.append(dict(station_query, timestamp=time_filter))
+
+    return partitions
+
+
+def read_measurements_frame(collection, station_ids=None, start=None, end=None, fields: list = None,
+                            parallelism: int = 1, splits_per_station: int = 1,
+                            batch_size: int = 10000) -> pd.DataFrame:
+    """
+    Lit les mesures de weather_data directement en DataFrame colonnaire.
+
+    Args:
+        collection: Collection pymongo (ou mongomock)
+        station_ids: Stations à lire (toutes si None)
+        start: Borne basse incluse sur timestamp
+        end: Borne haute exclue sur timestamp
+        fields: Champs de measurements à charger (tous si None)
+        parallelism: Nombre de lectures simultanées (1 = séquentiel)
+        splits_per_station: Nombre de plages temporelles par station
+        batch_size: Taille des batchs MongoDB
+
+    Returns:
+        pd.DataFrame: station_id (category), timestamp (datetime64), mesures (float64),
+                      trié par (station_id, timestamp)
+    """
+    fields = fields or MEASUREMENT_FIELDS
+
+    if parallelism <= 1 and splits_per_station <= 1:
+        columns = read_columns(collection, build_base_query(station_ids, start, end), fields, batch_size)
+        df = columns_to_frame(columns)
+    else:
+        partitions = plan_partitions(collection, station_ids, start, end, splits_per_station)
+        with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+            results = list(executor.map(
+                lambda q: read_columns(collection, q, fields, batch_size), partitions
+            ))
+        frames = [columns_to_frame(columns) for columns in results if len(columns["timestamp"])]
+        if not frames:
+            return columns_to_frame(_empty_columns(fields))
+        df = pd.concat(frames, ignore_index=True)
+        df["station_id"] = df["station_id"].astype("category")
+
+    logger.info(f"Lecture colonnaire : {len(df)} mesures, "
+                f"{df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} Mo en mémoire")
+    return df.sort_values(["station_id", "timestamp"], kind="stable", ignore_index=True)
+
+
+def read_measurements_table(collection, **kwargs) -> pa.Table:
+    """
+    Variante Arrow de read_measurements_frame (station_id en dictionnaire Arrow).
+    Accepte les mêmes arguments.
+    """
+    return pa.Table.from_pandas(read_measurements_frame(collection, **kwargs), preserve_index=False)
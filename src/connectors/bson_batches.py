@@ -0,0 +1,169 @@
+"""
+Lots de documents pré-encodés en BSON.
+
+Quand la transformation tourne dans des processus fils (parallel_ingest), renvoyer
+des listes de dictionnaires au parent coûte cher deux fois : sérialisation pickle
+pour l'IPC, puis encodage BSON par pymongo dans le seul processus de chargement.
+Les processus fils encodent donc eux-mêmes les documents validés ; le parent
+reçoit un tampon contigu par segment et l'insère sans ré-encodage
+(RawBSONDocument), en ne faisant plus que des entrées/sorties réseau.
+
+Le lot conserve à côté du tampon les informations dont le chargement a besoin
+sans décoder les documents : type d'enregistrement, station, position du
+timestamp (recalage des segments, déduplication).
+"""
+
+import bson
+import numpy as np
+from bson.raw_bson import RawBSONDocument
+
+# Élément BSON "timestamp" de type date UTC (0x09) : valeur int64 (ms) juste après
+TIMESTAMP_ELEMENT = b"\x09timestamp\x00"
+
+
+class EncodedBatch:
+    """
+    Documents BSON concaténés dans un tampon unique.
+
+    Attributs:
+        buffer: bytearray des documents encodés, bout à bout
+        offsets: bornes des documents dans le tampon (n + 1 valeurs)
+        timestamp_positions: position de la valeur int64 du timestamp (-1 si absent)
+        station_ids, record_types: listes parallèles aux documents
+    """
+
+    __slots__ = ("buffer", "offsets", "timestamp_positions", "station_ids", "record_types")
+
+    def __init__(self, buffer: bytearray, offsets: np.ndarray, timestamp_positions: np.ndarray,
+                 station_ids: list, record_types: list):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.timestamp_positions = timestamp_positions
+        self.station_ids = station_ids
+        self.record_types = record_types
+
+    @classmethod
+    def from_documents(cls, documents: list) -> "EncodedBatch":
+        """Encode une liste de documents (ordre conservé)."""
+        chunks = []
+        offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+        positions = np.full(len(documents), -1, dtype=np.int64)
+        position = 0
+
+        for i, doc in enumerate(documents):
+            encoded = bson.encode(doc)
+            if doc.get("timestamp") is not None:
+                positions[i] = position + encoded.index(TIMESTAMP_ELEMENT) + len(TIMESTAMP_ELEMENT)
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets[i + 1] = position
+
+        return cls(bytearray(b"".join(chunks)), offsets, positions,
+                   [doc.get("station_id") for doc in documents],
+                   [doc.get("record_type") for doc in documents])
+
+    @classmethod
+    def concat(cls, batches: list) -> "EncodedBatch":
+        """Concatène plusieurs lots (dans l'ordre)."""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.from_documents([])
+
+        offsets, positions = [np.zeros(1, dtype=np.int64)], []
+        base = 0
+        for batch in batches:
+            offsets.append(batch.offsets[1:] + base)
+            positions.append(np.where(batch.timestamp_positions >= 0, batch.timestamp_positions + base, -1))
+            base += len(batch.buffer)
+
+        return cls(bytearray(b"".join(batch.buffer for batch in batches)),
+                   np.concatenate(offsets), np.concatenate(positions),
+                   [sid for batch in batches for sid in batch.station_ids],
+                   [rtype for batch in batches for rtype in batch.record_types])
+
+    def __len__(self) -> int:
+        return len(self.station_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer)
+
+    # ─────────────────────────────────────────────────────────────
+    # TIMESTAMPS
+    # ─────────────────────────────────────────────────────────────
+
+    def _timestamp_bytes(self, positions: np.ndarray) -> np.ndarray:
+        return positions[:, None] + np.arange(8)
+
+    def timestamps_ms(self) -> np.ndarray:
+        """Timestamps en ms epoch (int64), -1 pour les documents sans timestamp."""
+        result = np.full(len(self), -1, dtype=np.int64)
+        present = self.timestamp_positions >= 0
+        if present.any():
+            raw = np.frombuffer(self.buffer, dtype=np.uint8)
+            values = raw[self._timestamp_bytes(self.timestamp_positions[present])]
+            result[present] = values.copy().view("<i8").ravel()
+        return result
+
+    def shift_timestamps(self, delta_ms: int, start: int = 0, stop: int = None):
+        """Décale en place les timestamps des documents [start, stop) (valeurs int64 du tampon)."""
+        positions = self.timestamp_positions[start:stop]
+        positions = positions[positions >= 0]
+        if not delta_ms or not len(positions):
+            return
+        raw = np.frombuffer(self.buffer, dtype=np.uint8)
+        index = self._timestamp_bytes(positions)
+        values = raw[index].copy().view("<i8") + np.int64(delta_ms)
+        raw[index] = values.view(np.uint8).reshape(-1, 8)
+
+    def keys(self) -> list:
+        """Clés (station_id, timestamp) des documents (timestamp datetime naïf UTC, ou None)."""
+        millis = self.timestamps_ms()
+        timestamps = millis.astype("datetime64[ms]").tolist()
+        return [(station_id, timestamp if ms >= 0 else None)
+                for station_id, timestamp, ms in zip(self.station_ids, timestamps, millis.tolist())]
+
+    def measurement_keys(self) -> list:
+        """(index, station_id, timestamp) des mesures datées (déduplication)."""
+        return [(i, station_id, timestamp)
+                for i, (record_type, (station_id, timestamp)) in enumerate(zip(self.record_types, self.keys()))
+                if record_type == "measurement" and timestamp is not None]
+
+    def encoded_size(self, indices) -> int:
+        """Taille BSON des documents aux indices donnés."""
+        sizes = self.offsets[1:] - self.offsets[:-1]
+        return int(sizes[np.asarray(list(indices), dtype=np.int64)].sum())
+
+    # ─────────────────────────────────────────────────────────────
+    # SÉLECTION / INSERTION
+    # ─────────────────────────────────────────────────────────────
+
+    def select(self, indices: list) -> "EncodedBatch":
+        """Sous-lot des documents aux indices donnés (ordre conservé)."""
+        chunks = []
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        positions = np.full(len(indices), -1, dtype=np.int64)
+        position = 0
+        for j, i in enumerate(indices):
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+            chunks.append(self.buffer[start:end])
+            if self.timestamp_positions[i] >= 0:
+                positions[j] = self.timestamp_positions[i] - start + position
+            position += end - start
+            offsets[j + 1] = position
+
+        return EncodedBatch(bytearray(b"".join(chunks)), offsets, positions,
+                            [self.station_ids[i] for i in indices],
+                            [self.record_types[i] for i in indices])
+
+    def raw_documents(self, start: int = 0, stop: int = None) -> list:
+        """RawBSONDocument des documents [start, stop) : insérés tels quels par pymongo."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [RawBSONDocument(bytes(self.buffer[self.offsets[i]:self.offsets[i + 1]]))
+                for i in range(start, stop)]
+
+    def count_by_type(self) -> dict:
+        counts = {}
+        for record_type in self.record_types:
+            counts[record_type] = counts.get(record_type, 0) + 1
+        return counts
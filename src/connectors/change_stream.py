@@ -0,0 +1,395 @@
+"""
+Consommateur de change stream sur weather_data.
+
+Au lieu que chaque consommateur (qualité, exports, agrégats) reparcoure la
+collection à chaque exécution, ce service suit les insertions en continu
+(change stream du ReplicaSet rs0) et met à jour l'état dérivé par incréments :
+- agrégats horaires par station (collection weather_hourly : heures touchées
+  recalculées depuis weather_data)
+- compteurs qualité (règles de check_quality, fichier JSON)
+- partitions Parquet (nouveaux fichiers part-* dans les partitions concernées)
+
+Le resume token est persisté sur disque après chaque lot traité : au
+redémarrage, le flux reprend là où il s'était arrêté (livraison au moins une
+fois : un lot interrompu avant la sauvegarde du token est rejoué). Les
+handlers restent justes malgré les rejeux :
+- les agrégats horaires sont recalculés (remplacés), jamais incrémentés
+- les compteurs qualité et l'export Parquet mémorisent, avec leur état, le
+  token du dernier événement appliqué et ignorent les événements antérieurs
+
+Usage:
+    python -m src.connectors.change_stream
+    python -m src.connectors.change_stream --handlers rollups quality --batch-size 1000
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bson import json_util
+from pymongo import ReplaceOne
+from pymongo.errors import OperationFailure
+
+from src.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_PATH = "data/change_stream/resume_token.json"
+DEFAULT_QUALITY_PATH = "data/change_stream/quality_counters.json"
+ROLLUP_COLLECTION = "weather_hourly"
+ROLLUP_FIELDS = ["temperature_celsius", "humidity_percent", "wind_speed_kmh", "pressure_hpa"]
+SOURCE_COLLECTION = "weather_data"
+
+# Code serveur quand le resume token n'est plus dans l'oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+# =============================================================================
+# RESUME TOKEN
+# =============================================================================
+
+class ResumeTokenStore:
+    """Persistance du resume token (JSON étendu, écriture atomique)."""
+
+    def __init__(self, path: str = DEFAULT_TOKEN_PATH):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json_util.loads(f.read())["token"]
+
+    def save(self, token):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json_util.dumps({"token": token, "saved_at": datetime.now()}))
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def token_key(token):
+    """Clé ordonnée d'un resume token (chaîne hexadécimale '_data', croissante dans l'oplog)."""
+    return token.get("_data") if isinstance(token, dict) else None
+
+
+# =============================================================================
+# ÉTAT DÉRIVÉ
+# =============================================================================
+
+class HourlyRollupHandler:
+    """
+    Agrégats horaires par station (count, somme, min, max par mesure).
+
+    Les heures touchées par un lot sont recalculées depuis la collection source
+    et remplacées : un lot rejoué donne le même résultat.
+    """
+
+    name = "rollups"
+    last_token = None
+
+    def __init__(self, db, collection_name: str = ROLLUP_COLLECTION, source_name: str = SOURCE_COLLECTION):
+        self.collection = db[collection_name]
+        self.source = db[source_name]
+
+    @staticmethod
+    def _hour(timestamp: datetime) -> datetime:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+
+    def handle(self, documents: list, token=None) -> int:
+        hours = {}
+        for doc in documents:
+            if doc.get("record_type") != "measurement" or doc.get("timestamp") is None:
+                continue
+            hours.setdefault(doc.get("station_id"), set()).add(self._hour(doc["timestamp"]))
+        if not hours:
+            return 0
+
+        # Une requête par lot : plage [première heure, dernière heure + 1 h[ de chaque station
+        rollups = {(station_id, hour): {"count": 0} for station_id, touched in hours.items() for hour in touched}
+        clauses = [{"station_id": station_id,
+                    "timestamp": {"$gte": min(touched), "$lt": max(touched) + timedelta(hours=1)}}
+                   for station_id, touched in hours.items()]
+        projection = {"_id": 0, "station_id": 1, "timestamp": 1,
+                      **{f"measurements.{field}": 1 for field in ROLLUP_FIELDS}}
+        for doc in self.source.find({"record_type": "measurement", "$or": clauses}, projection):
+            rollup = rollups.get((doc.get("station_id"), self._hour(doc["timestamp"])))
+            if rollup is None:
+                continue
+            rollup["count"] += 1
+            for field in ROLLUP_FIELDS:
+                value = (doc.get("measurements") or {}).get(field)
+                if value is None:
+                    continue
+                stats = rollup.setdefault(field, {"sum": 0, "n": 0, "min": value, "max": value})
+                stats["sum"] += value
+                stats["n"] += 1
+                stats["min"] = min(stats["min"], value)
+                stats["max"] = max(stats["max"], value)
+
+        operations = [ReplaceOne({"station_id": station_id, "hour": hour},
+                                 {"station_id": station_id, "hour": hour, **rollup}, upsert=True)
+                      for (station_id, hour), rollup in rollups.items()]
+        self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+
+class QualityCountersHandler:
+    """Compteurs des règles de check_quality, mis à jour document par document."""
+
+    name = "quality"
+
+    MEASUREMENT_RULES = {
+        "station_id_missing": lambda d: not d.get("station_id"),
+        "timestamp_missing": lambda d: d.get("timestamp") is None,
+        "temperature_out_of_range": lambda d: _out_of_range(d, "temperature_celsius", -60, 60),
+        "humidity_out_of_range": lambda d: _out_of_range(d, "humidity_percent", 0, 100),
+        "location_missing": lambda d: _missing_coordinates(d.get("location") or {}),
+    }
+
+    STATION_RULES = {
+        "station_id_missing": lambda d: not d.get("station_id"),
+        "station_name_missing": lambda d: not d.get("station_name"),
+        "location_invalid": lambda d: _invalid_coordinates(d.get("location") or {}),
+    }
+
+    def __init__(self, path: str = DEFAULT_QUALITY_PATH):
+        self.path = path
+        self.counters = self._load()
+
+    @property
+    def last_token(self):
+        """Token du dernier événement compté (sauvegardé avec les compteurs)."""
+        return self.counters.get("last_token")
+
+    def _load(self) -> dict:
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"measurement": {"total": 0, "rules": {}, "stations": {}},
+                "station_reference": {"total": 0, "rules": {}, "stations": {}}}
+
+    def handle(self, documents: list, token=None) -> int:
+        for doc in documents:
+            record_type = doc.get("record_type")
+            rules = self.MEASUREMENT_RULES if record_type == "measurement" else \
+                self.STATION_RULES if record_type == "station_reference" else None
+            if rules is None:
+                continue
+            counters = self.counters[record_type]
+            counters["total"] += 1
+            station = counters["stations"].setdefault(str(doc.get("station_id")), {"count": 0})
+            station["count"] += 1
+            if doc.get("timestamp") is not None:
+                station["last_timestamp"] = max(station.get("last_timestamp", ""),
+                                                doc["timestamp"].isoformat())
+            for rule, check in rules.items():
+                if check(doc):
+                    counters["rules"][rule] = counters["rules"].get(rule, 0) + 1
+        if token is not None:
+            self.counters["last_token"] = token
+        self._save()
+        return len(documents)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.counters, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _out_of_range(doc: dict, field: str, low: float, high: float) -> bool:
+    value = (doc.get("measurements") or {}).get(field)
+    return value is not None and not (low <= value <= high)
+
+
+def _missing_coordinates(location: dict) -> bool:
+    return "latitude" not in location or "longitude" not in location
+
+
+def _invalid_coordinates(location: dict) -> bool:
+    lat, lon = location.get("latitude"), location.get("longitude")
+    return (lat is not None and not -90 <= lat <= 90) or (lon is not None and not -180 <= lon <= 180)
+
+
+class ParquetHandler:
+    """Ajoute les nouvelles mesures aux partitions Parquet concernées."""
+
+    name = "parquet"
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    @property
+    def last_token(self):
+        """Token du dernier événement exporté (enregistré dans le manifeste)."""
+        return self.exporter.load_manifest().get("change_stream_token")
+
+    def handle(self, documents: list, token=None) -> int:
+        return self.exporter.append_documents(documents, token=token)["rows"]
+
+
+# =============================================================================
+# CONSOMMATEUR
+# =============================================================================
+
+class ChangeStreamConsumer:
+    """
+    Suit les insertions de weather_data et alimente les handlers par lots.
+    """
+
+    def __init__(self, collection, handlers: list, token_store: ResumeTokenStore = None,
+                 batch_size: int = 500, max_wait_s: float = 1.0):
+        self.collection = collection
+        self.handlers = handlers
+        self.token_store = token_store or ResumeTokenStore()
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.stop_event = threading.Event()
+        self.processed = 0
+
+    def process_events(self, events: list) -> int:
+        """
+        Transmet les documents insérés d'un lot d'événements à chaque handler.
+
+        Les événements déjà appliqués par un handler (token antérieur ou égal
+        à son last_token, cas d'un lot rejoué après redémarrage) lui sont retirés.
+        """
+        inserts = [event for event in events
+                   if event.get("operationType") == "insert" and event.get("fullDocument")]
+        if not inserts:
+            return 0
+        token = inserts[-1].get("_id")
+
+        for handler in self.handlers:
+            applied = token_key(handler.last_token)
+            documents = [event["fullDocument"] for event in inserts
+                         if applied is None or token_key(event.get("_id")) is None
+                         or token_key(event["_id"]) > applied]
+            if not documents:
+                logger.info(f"Handler '{handler.name}' : lot déjà appliqué (rejeu ignoré)")
+                continue
+            try:
+                handler.handle(documents, token=token)
+            except Exception as e:
+                logger.error(f"Erreur handler '{handler.name}' : {e}", exc_info=True)
+                raise
+
+        self.processed += len(inserts)
+        metrics.inc("etl_change_stream_documents_total", len(inserts))
+        return len(inserts)
+
+    def _open_stream(self):
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        token = self.token_store.load()
+        if token is not None:
+            logger.info("Reprise du change stream depuis le dernier resume token.")
+        return self.collection.watch(pipeline, resume_after=token,
+                                     max_await_time_ms=int(self.max_wait_s * 1000))
+
+    def run(self):
+        """Boucle de consommation jusqu'à stop() (SIGTERM / SIGINT)."""
+        logger.info(f"Change stream sur '{self.collection.name}' "
+                    f"(handlers : {', '.join(h.name for h in self.handlers)})")
+        while not self.stop_event.is_set():
+            try:
+                with self._open_stream() as stream:
+                    self._consume(stream)
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAM_HISTORY_LOST:
+                    raise
+                # Token sorti de l'oplog : reprise au présent (un rattrapage complet peut être nécessaire)
+                logger.warning("Resume token expiré -> reprise sans token. "
+                               "L'état dérivé peut nécessiter une reconstruction complète.")
+                self.token_store.clear()
+        logger.info(f"Change stream arrêté ({self.processed} documents traités).")
+
+    def _consume(self, stream):
+        buffer = []
+        last_flush = time.monotonic()
+        saved_token = None
+
+        while not self.stop_event.is_set():
+            change = stream.try_next()
+            if change is not None:
+                buffer.append(change)
+
+            due = buffer and (len(buffer) >= self.batch_size or change is None
+                              or time.monotonic() - last_flush >= self.max_wait_s)
+            if due:
+                self.process_events(buffer)
+                buffer = []
+                last_flush = time.monotonic()
+
+            # Token sauvegardé après traitement (y compris quand le flux est inactif)
+            if not buffer and stream.resume_token is not None and stream.resume_token != saved_token:
+                saved_token = stream.resume_token
+                self.token_store.save(saved_token)
+
+        if buffer:
+            self.process_events(buffer)
+            self.token_store.save(stream.resume_token)
+
+    def stop(self, *_):
+        logger.info("Signal d'arrêt reçu.")
+        self.stop_event.set()
+
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+def build_handlers(names: list, db) -> list:
+    handlers = []
+    for name in names:
+        if name == "rollups":
+            handlers.append(HourlyRollupHandler(db))
+        elif name == "quality":
+            handlers.append(QualityCountersHandler())
+        elif name == "parquet":
+            from src.connectors.parquet_exporter import ParquetExporter
+            handlers.append(ParquetHandler(ParquetExporter(None)))
+    return handlers
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Consommateur de change stream weather_data")
+    parser.add_argument("--handlers", nargs="+", default=["rollups", "quality", "parquet"],
+                        choices=["rollups", "quality", "parquet"], help="État dérivé à maintenir")
+    parser.add_argument("--token-path", default=DEFAULT_TOKEN_PATH, help="Fichier du resume token")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents par lot")
+    parser.add_argument("--max-wait", type=float, default=1.0, help="Attente max avant traitement (s)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from src.connectors.mongo_connector import MongoConnector
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv("config/.env")
+    args = parse_args()
+
+    mongo = MongoConnector()
+    mongo.connect()
+    consumer = ChangeStreamConsumer(
+        mongo.db[MongoConnector.COLLECTION_NAME],
+        build_handlers(args.handlers, mongo.db),
+        token_store=ResumeTokenStore(args.token_path),
+        batch_size=args.batch_size,
+        max_wait_s=args.max_wait
+    )
+    signal.signal(signal.SIGTERM, consumer.stop)
+    signal.signal(signal.SIGINT, consumer.stop)
+    consumer.run()
+    mongo.close()
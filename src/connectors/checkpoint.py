@@ -0,0 +1,241 @@
+"""
+Points de reprise du chargement (exécutions interrompues).
+
+Si la tâche Fargate s'arrête au milieu de l'insertion, l'exécution suivante
+repartait de zéro : re-téléchargement, re-transformation et ré-envoi de tout.
+Le CheckpointStore enregistre, pour un identifiant d'exécution (run_id) :
+- l'état de chaque fichier (version, transformé, chargé, en échec)
+- la progression du chargement par tranche (nombre de documents traités)
+
+L'état est écrit à chaque tranche validée dans un fichier local (écriture
+atomique) et répliqué dans la collection MongoDB etl_runs : une nouvelle tâche
+(conteneur vierge, fichier local perdu) reprend depuis la base. Une exécution
+interrompue est reprise avec le même run_id ; les fichiers déjà chargés sont
+ignorés (ni téléchargés ni transformés) et le fichier en cours reprend après
+la dernière tranche validée. Une exécution terminée avec succès n'est pas reprise.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = "data/checkpoints/pipeline_run.json"
+RUNS_COLLECTION = "etl_runs"
+DEFAULT_CHECKPOINT_ROWS = 50000
+
+# Octets lus en début et fin de fichier pour sa version locale
+_FINGERPRINT_BYTES = 64 * 1024
+
+
+def file_fingerprint(file_path: str) -> str:
+    """Version d'un fichier local : taille + empreinte du début et de la fin (pas de lecture complète)."""
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(file_path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_BYTES))
+        if size > _FINGERPRINT_BYTES:
+            f.seek(max(size - _FINGERPRINT_BYTES, _FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return f"{size}:{digest.hexdigest()[:16]}"
+
+
+class CheckpointStore:
+    """
+    État de chargement d'une exécution du pipeline (fichier local + etl_runs).
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, collection=None):
+        self.path = path
+        self.collection = collection
+        self.state = None
+
+    # ─────────────────────────────────────────────────────────────
+    # PERSISTANCE
+    # ─────────────────────────────────────────────────────────────
+
+    def _load_local(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def _load_remote(self):
+        """Dernière exécution enregistrée dans etl_runs."""
+        if self.collection is None:
+            return None
+        try:
+            doc = self.collection.find_one({}, sort=[("started_at", -1)])
+        except Exception as e:
+            logger.warning(f"Lecture de {RUNS_COLLECTION} impossible : {e}")
+            return None
+        if doc is None:
+            return None
+        doc["run_id"] = doc.pop("_id")
+        doc["files"] = {entry.pop("name"): entry for entry in doc.get("files", [])}
+        return doc
+
+    def _save(self):
+        self.state["updated_at"] = datetime.now().isoformat()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+        if self.collection is not None:
+            # Noms de fichiers en liste (les '.' sont interdits dans les clés MongoDB imbriquées)
+            doc = {key: value for key, value in self.state.items() if key not in ("run_id", "files")}
+            doc["files"] = [{"name": name, **entry} for name, entry in self.state["files"].items()]
+            try:
+                self.collection.replace_one({"_id": self.state["run_id"]}, doc, upsert=True)
+            except Exception as e:
+                logger.warning(f"Écriture de {RUNS_COLLECTION} impossible (point de reprise local seul) : {e}")
+
+    def attach(self, collection):
+        """Réplique l'état dans etl_runs (connexion MongoDB ouverte après le démarrage)."""
+        self.collection = collection
+        if self.state is not None:
+            self._save()
+
+    # ─────────────────────────────────────────────────────────────
+    # EXÉCUTION
+    # ─────────────────────────────────────────────────────────────
+
+    def start_run(self) -> str:
+        """
+        Reprend l'exécution interrompue (fichier local, sinon etl_runs) ou en démarre une nouvelle.
+
+        Returns:
+            str: run_id
+        """
+        previous = self._load_local() or self._load_remote()
+        if previous and previous.get("status") != "success":
+            self.state = previous
+            self.state["status"] = "running"
+            self.state["attempts"] = previous.get("attempts", 1) + 1
+            committed = sum(1 for entry in previous["files"].values() if entry.get("status") == "committed")
+            logger.info(f"♻️  Reprise de l'exécution {previous['run_id']} "
+                        f"(tentative {self.state['attempts']}, {committed} fichier(s) déjà chargé(s))")
+        else:
+            self.state = {
+                "run_id": datetime.now().strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:6],
+                "status": "running",
+                "attempts": 1,
+                "started_at": datetime.now().isoformat(),
+                "files": {}
+            }
+            logger.info(f"Nouvelle exécution {self.state['run_id']}")
+        self._save()
+        return self.state["run_id"]
+
+    def finish(self, status: str = "success"):
+        self.state["status"] = status
+        self.state["finished_at"] = datetime.now().isoformat()
+        self._save()
+
+    @property
+    def run_id(self) -> str:
+        return self.state["run_id"] if self.state else None
+
+    # ─────────────────────────────────────────────────────────────
+    # FICHIERS ET TRANCHES
+    # ─────────────────────────────────────────────────────────────
+
+    def _entry(self, name: str, version: str) -> dict:
+        entry = self.state["files"].get(name)
+        if entry is None or entry.get("version") != version:
+            # Fichier nouveau ou modifié depuis l'interruption : repris depuis le début
+            entry = self.state["files"][name] = {"version": version, "status": "pending",
+                                                 "documents": None, "offset": 0, "inserted": 0}
+        return entry
+
+    def is_committed(self, name: str, version: str) -> bool:
+        entry = self.state["files"].get(name)
+        return bool(entry) and entry.get("version") == version and entry.get("status") == "committed"
+
+    def committed_offset(self, name: str, version: str) -> int:
+        """Nombre de documents du fichier déjà traités (tranches validées)."""
+        return self._entry(name, version)["offset"]
+
+    def mark_transformed(self, name: str, version: str, documents: int):
+        entry = self._entry(name, version)
+        if entry["documents"] not in (None, documents):
+            # Transformation différente (code modifié entre deux tentatives) : reprise au début
+            entry.update(offset=0, inserted=0)
+        entry.update(status="transformed", documents=documents)
+        self._save()
+
+    def commit_batch(self, name: str, version: str, offset: int, inserted: int):
+        """Tranche chargée : documents [.., offset) traités."""
+        entry = self._entry(name, version)
+        entry["offset"] = offset
+        entry["inserted"] += inserted
+        self._save()
+
+    def mark_failed(self, name: str, version: str, error: str):
+        """Fichier non transformé : ignoré dans cette exécution, retenté à la suivante."""
+        entry = self._entry(name, version)
+        entry.update(status="failed", error=error)
+        self._save()
+
+    def commit_file(self, name: str, version: str):
+        entry = self._entry(name, version)
+        entry["status"] = "committed"
+        entry["committed_at"] = datetime.now().isoformat()
+        self._save()
+
+
+# =============================================================================
+# CHARGEMENT PAR TRANCHES
+# =============================================================================
+
+def _slice(documents, start: int, stop: int):
+    if hasattr(documents, "select"):
+        return documents.select(range(start, min(stop, len(documents))))
+    return documents[start:stop]
+
+
+def load_with_checkpoints(mongo, store: CheckpointStore, name: str, version: str, documents,
+                          dedup: bool = True, checkpoint_rows: int = None) -> dict:
+    """
+    Charge les documents d'un fichier par tranches, en reprenant après la dernière tranche validée.
+
+    Chaque tranche est dédupliquée (le lot en vol lors d'une interruption n'est
+    pas réinséré), insérée, puis enregistrée dans le point de reprise. Une tranche
+    n'est validée qu'après une insertion complète : en cas d'erreur (connexion
+    perdue, écriture refusée), l'exception est propagée sans valider la tranche
+    ni le fichier, et l'exécution suivante reprend après la dernière tranche validée.
+
+    Returns:
+        dict: {inserted, resumed_from, checked, existing, skipped, bytes_saved}
+    """
+    checkpoint_rows = checkpoint_rows or int(os.getenv("CHECKPOINT_ROWS", DEFAULT_CHECKPOINT_ROWS))
+    start = store.committed_offset(name, version)
+    result = {"inserted": 0, "resumed_from": start, "checked": 0, "existing": 0, "skipped": 0, "bytes_saved": 0}
+    if start:
+        logger.info(f"   ↪ {name} : reprise après {start}/{len(documents)} documents déjà traités")
+
+    for offset in range(start, len(documents), checkpoint_rows):
+        chunk = _slice(documents, offset, offset + checkpoint_rows)
+        if dedup:
+            chunk, stats = mongo.filter_new_documents(chunk)
+            for key in ("checked", "existing", "skipped", "bytes_saved"):
+                result[key] += stats[key]
+        stop = min(offset + checkpoint_rows, len(documents))
+        try:
+            # insert_documents lève toute erreur autre qu'un doublon (lot incomplet)
+            inserted = mongo.insert_documents(chunk) if len(chunk) else 0
+        except Exception:
+            logger.error(f"   ✗ {name} : tranche [{offset}, {stop}) non chargée, "
+                         f"reprise possible après {offset}/{len(documents)} documents")
+            raise
+        result["inserted"] += inserted
+        store.commit_batch(name, version, stop, inserted)
+
+    store.commit_file(name, version)
+    return result
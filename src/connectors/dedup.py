@@ -0,0 +1,183 @@
+"""
+Déduplication des mesures avant insertion.
+
+Lors d'une ré-exécution sur un fichier quasi inchangé, insert_many(ordered=False)
+envoie tous les documents au serveur pour qu'il les rejette un à un. Ici, les
+clés (station_id, timestamp) déjà présentes sont lues en une seule requête
+couverte par idx_station_timestamp (filtre et projection limités aux champs
+de l'index), sur la plage de dates de chaque station, puis les doublons sont
+retirés côté client.
+
+Seuls les documents 'measurement' sont filtrés par filter_new_documents. Les
+stations de référence, horodatées à chaque exécution, portent une empreinte de
+leur contenu (content_hash) : filter_changed_stations lit les empreintes
+stockées en une requête projetée et ne garde que les stations nouvelles ou
+modifiées.
+"""
+
+import logging
+from datetime import datetime
+
+import bson
+from pymongo.errors import OperationFailure
+
+from src.monitoring import metrics
+from src.processing.measurement_batch import sample_indices
+
+logger = logging.getLogger(__name__)
+
+def estimate_encoded_size(documents: list, indices) -> int:
+    """
+    Taille BSON estimée des documents aux indices donnés : nombre de documents
+    x taille moyenne d'un petit échantillon (encoder chaque doublon coûterait
+    autant que l'insertion évitée).
+    """
+    indices = list(indices)
+    if not indices:
+        return 0
+    sizes = [len(bson.encode(documents[i])) for i in sample_indices(indices)]
+    return round(len(indices) * sum(sizes) / len(sizes))
+
+
+def _key(station_id, timestamp) -> tuple:
+    """Clé de comparaison (MongoDB stocke les dates à la milliseconde)."""
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000, tzinfo=None)
+    return station_id, timestamp
+
+
+def _measurement_keys(documents) -> list:
+    """
+    (index, station_id, timestamp) des mesures datées.
+    Les lots (EncodedBatch, MeasurementBatch) fournissent leurs clés sans matérialiser de documents.
+    """
+    if hasattr(documents, "measurement_keys"):
+        return documents.measurement_keys()
+    return [(i, doc.get("station_id"), doc["timestamp"]) for i, doc in enumerate(documents)
+            if doc.get("record_type") == "measurement" and doc.get("timestamp") is not None]
+
+
+def build_existing_keys_query(documents) -> dict:
+    """
+    Construit le filtre couvrant les plages [min, max] de timestamp par station.
+
+    Returns:
+        dict: filtre MongoDB ($or par station), None si aucune mesure
+    """
+    ranges = {}
+    for _, station_id, timestamp in _measurement_keys(documents):
+        low, high = ranges.get(station_id, (timestamp, timestamp))
+        ranges[station_id] = (min(low, timestamp), max(high, timestamp))
+
+    if not ranges:
+        return None
+
+    clauses = [{"station_id": station_id, "timestamp": {"$gte": low, "$lte": high}}
+               for station_id, (low, high) in sorted(ranges.items())]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def fetch_existing_keys(collection, documents) -> set:
+    """Clés (station_id, timestamp) déjà présentes en base pour les plages concernées."""
+    query = build_existing_keys_query(documents)
+    if query is None:
+        return set()
+
+    # Projection limitée aux champs de l'index : requête couverte (pas de lecture des documents)
+    projection = {"_id": 0, "station_id": 1, "timestamp": 1}
+    try:
+        cursor = collection.find(query, projection).hint("idx_station_timestamp")
+        return {_key(doc.get("station_id"), doc.get("timestamp")) for doc in cursor}
+    except OperationFailure:
+        # Index absent (MONGO_AUTO_CREATE_INDEXES=false) : requête sans hint
+        logger.warning("idx_station_timestamp absent : déduplication sans index couvrant.")
+        cursor = collection.find(query, projection)
+        return {_key(doc.get("station_id"), doc.get("timestamp")) for doc in cursor}
+
+
+def filter_new_documents(collection, documents) -> tuple:
+    """
+    Retire les mesures déjà en base (et les doublons internes au lot).
+    Accepte une liste de documents ou un lot (EncodedBatch, MeasurementBatch) sans
+    reconstruire les documents.
+
+    Returns:
+        tuple: (documents à insérer, stats {checked, existing, skipped, bytes_saved})
+    """
+    existing = fetch_existing_keys(collection, documents)
+    seen = set()
+    dropped = set()
+
+    for i, station_id, timestamp in _measurement_keys(documents):
+        key = _key(station_id, timestamp)
+        if key in existing or key in seen:
+            dropped.add(i)
+            continue
+        seen.add(key)
+
+    if hasattr(documents, "select"):
+        # Taille exacte (EncodedBatch, offsets) ou estimée sur échantillon (MeasurementBatch)
+        bytes_saved = documents.encoded_size(sorted(dropped))
+        kept = documents.select([i for i in range(len(documents)) if i not in dropped]) \
+            if dropped else documents
+    else:
+        bytes_saved = estimate_encoded_size(documents, dropped)
+        kept = [doc for i, doc in enumerate(documents) if i not in dropped]
+
+    skipped = len(dropped)
+    stats = {
+        "checked": len(documents),
+        "existing": len(existing),
+        "skipped": skipped,
+        "bytes_saved": bytes_saved
+    }
+    if skipped:
+        metrics.inc("etl_documents_skipped_total", skipped, collection=collection.name)
+        metrics.inc("etl_dedup_bytes_saved_total", bytes_saved, collection=collection.name)
+        logger.info(f"Déduplication : {skipped} mesure(s) déjà présente(s) ignorée(s) "
+                    f"(~{bytes_saved / 1024:.1f} Ko non envoyés)")
+    return kept, stats
+
+
+# =============================================================================
+# STATIONS DE RÉFÉRENCE
+# =============================================================================
+
+def _station_key(doc: dict) -> tuple:
+    return doc.get("station_id"), doc.get("source")
+
+
+def fetch_station_hashes(collection, documents: list) -> dict:
+    """Empreintes stockées des stations du lot : {(station_id, source): content_hash}."""
+    station_ids = sorted({doc.get("station_id") for doc in documents})
+    if not station_ids:
+        return {}
+    # Filtre sur le préfixe de idx_unique_station_reference, projection limitée à l'empreinte
+    query = {"record_type": "station_reference", "station_id": {"$in": station_ids}}
+    projection = {"_id": 0, "station_id": 1, "source": 1, "content_hash": 1}
+    return {_station_key(doc): doc.get("content_hash") for doc in collection.find(query, projection)}
+
+
+def filter_changed_stations(collection, documents: list) -> tuple:
+    """
+    Sépare les stations de référence nouvelles, modifiées et inchangées.
+
+    Returns:
+        tuple: (nouvelles, modifiées, stats {checked, new, changed, unchanged})
+    """
+    # Dernière occurrence retenue si une station apparaît plusieurs fois dans le lot
+    latest = {_station_key(doc): doc for doc in documents}
+    stored = fetch_station_hashes(collection, list(latest.values()))
+
+    new, changed = [], []
+    for key, doc in latest.items():
+        if key not in stored:
+            new.append(doc)
+        elif stored[key] is None or stored[key] != doc.get("content_hash"):
+            changed.append(doc)
+
+    unchanged = len(latest) - len(new) - len(changed)
+    stats = {"checked": len(documents), "new": len(new), "changed": len(changed), "unchanged": unchanged}
+    if unchanged:
+        metrics.inc("etl_documents_skipped_total", unchanged, collection=collection.name)
+    return new, changed, stats
@@ -0,0 +1,315 @@
+"""
+Magasin de variables de prévision, rafraîchi de manière incrémentale.
+
+Les variables (src.processing.features) sont écrites dans la collection
+weather_features ou en Parquet partitionné (station / mois). Après un
+chargement, seule la fin de la série de chaque station est recalculée :
+- les mesures arrivées depuis le dernier rafraîchissement sont repérées par
+  leur _id (ObjectId attribué à l'insertion, index _id) : une agrégation
+  donne, par station, le plus ancien timestamp nouvellement chargé
+- les ObjectId ne suivent pas l'ordre de validation (démon et pipeline qui
+  écrivent en même temps, horloges des clients décalées) : l'agrégation relit
+  une fenêtre de sécurité derrière le dernier _id traité (FEATURE_WATERMARK_WINDOW_S)
+  et compare, par station, le nombre de mesures de cette fenêtre à celui
+  mémorisé au rafraîchissement précédent ; une mesure validée en retard avec
+  un _id plus petit fait recalculer sa station depuis le début de la fenêtre
+- les variables de la station sont recalculées à partir de ce timestamp,
+  en relisant juste l'historique nécessaire en amont (la plus grande fenêtre
+  glissante et le plus grand retard)
+- les lignes recalculées remplacent les anciennes (même station, timestamp >= début)
+
+Le coût d'un rafraîchissement suit donc le volume de nouvelles données, pas
+l'historique. L'état (dernier _id traité, comptes de la fenêtre de sécurité)
+est conservé dans un fichier JSON.
+
+Usage:
+    python -m src.connectors.feature_store
+    python -m src.connectors.feature_store --sink parquet --output data/features/weather
+    python -m src.connectors.feature_store --full
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+from pymongo import ASCENDING
+
+from src.connectors.arrow_reader import columns_to_frame, read_columns
+from src.processing.features import (DEFAULT_LAGS, DEFAULT_WINDOWS, FEATURE_FIELDS, build_features,
+                                     max_window, parse_lags, parse_windows)
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLLECTION = "weather_features"
+DEFAULT_FEATURE_DIR = "data/features/weather"
+DEFAULT_STATE_PATH = "data/features/feature_state.json"
+# Fenêtre relue derrière le dernier _id traité (écritures concurrentes, décalage d'horloge)
+DEFAULT_WATERMARK_WINDOW_S = 900
+
+
+class FeatureStore:
+    """
+    Rafraîchissement incrémental des variables par station.
+
+    Args:
+        collection: collection weather_data (source)
+        sink: "mongo" (collection weather_features de la même base) ou "parquet"
+    """
+
+    def __init__(self, collection, sink: str = "mongo", output_dir: str = DEFAULT_FEATURE_DIR,
+                 state_path: str = DEFAULT_STATE_PATH, windows=None, lags=None, batch_size: int = 10000,
+                 watermark_window_s: float = None):
+        self.collection = collection
+        self.sink = sink
+        self.output_dir = output_dir
+        self.state_path = state_path
+        self.windows = windows or parse_windows(os.getenv("FEATURE_WINDOWS", ",".join(DEFAULT_WINDOWS)))
+        self.lags = lags or parse_lags(os.getenv("FEATURE_LAGS", ",".join(map(str, DEFAULT_LAGS))))
+        self.batch_size = batch_size
+        self.watermark_window = timedelta(seconds=watermark_window_s if watermark_window_s is not None else
+                                          float(os.getenv("FEATURE_WATERMARK_WINDOW_S",
+                                                          DEFAULT_WATERMARK_WINDOW_S)))
+
+    @classmethod
+    def from_env(cls, collection) -> "FeatureStore":
+        return cls(collection,
+                   sink=os.getenv("FEATURE_SINK", "mongo"),
+                   output_dir=os.getenv("FEATURE_DIR", DEFAULT_FEATURE_DIR),
+                   state_path=os.getenv("FEATURE_STATE_PATH", DEFAULT_STATE_PATH))
+
+    # ─────────────────────────────────────────────────────────────
+    # ÉTAT
+    # ─────────────────────────────────────────────────────────────
+
+    def load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {"last_id": None}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_state(self, state: dict):
+        state["updated_at"] = datetime.now().isoformat()
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    # ─────────────────────────────────────────────────────────────
+    # PLAGES À RECALCULER
+    # ─────────────────────────────────────────────────────────────
+
+    def _window_floor(self, last_id: ObjectId) -> ObjectId:
+        """Plus petit _id de la fenêtre de sécurité derrière last_id."""
+        return ObjectId.from_datetime(last_id.generation_time - self.watermark_window)
+
+    def find_changes(self, state: dict) -> dict:
+        """
+        Stations ayant reçu des mesures depuis le dernier _id traité (toutes sans état).
+
+        Une station dont le nombre de mesures de la fenêtre de sécurité (_id <= last_id)
+        diffère de celui de l'état a reçu une mesure validée en retard : elle est
+        recalculée depuis le plus ancien timestamp de la fenêtre.
+
+        Returns:
+            dict: {station_id: {"start": plus ancien timestamp à recalculer, "last_id": ObjectId,
+                                "rows": mesures nouvelles ou en retard}}
+        """
+        match = {"record_type": "measurement"}
+        last_id = ObjectId(state["last_id"]) if state.get("last_id") else None
+        if last_id is None:
+            pipeline = [
+                {"$match": match},
+                {"$group": {"_id": "$station_id", "start": {"$min": "$timestamp"},
+                            "last_id": {"$max": "$_id"}, "rows": {"$sum": 1}}}
+            ]
+            return {doc["_id"]: doc for doc in self.collection.aggregate(pipeline) if doc["_id"] is not None}
+
+        match["_id"] = {"$gte": self._window_floor(last_id)}
+        is_new = {"$gt": ["$_id", last_id]}
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$station_id",
+                        "start": {"$min": {"$cond": [is_new, "$timestamp", None]}},
+                        "window_start": {"$min": "$timestamp"},
+                        "last_id": {"$max": "$_id"},
+                        "rows": {"$sum": {"$cond": [is_new, 1, 0]}},
+                        "seen": {"$sum": {"$cond": [is_new, 0, 1]}}}}
+        ]
+        window_counts = state.get("window_counts", {})
+        changes = {}
+        for doc in self.collection.aggregate(pipeline):
+            station_id = doc["_id"]
+            if station_id is None:
+                continue
+            late = doc["seen"] - window_counts.get(station_id, 0)
+            if late:
+                # Mesure validée après le rafraîchissement précédent avec un _id plus petit
+                logger.info(f"   {station_id} : {late:+d} mesure(s) en retard dans la fenêtre de sécurité")
+                doc["start"] = doc["window_start"]
+                doc["rows"] += max(late, 0)
+            if doc["rows"] or late:
+                changes[station_id] = doc
+        return changes
+
+    def window_counts(self, last_id: ObjectId) -> dict:
+        """Nombre de mesures par station dans la fenêtre de sécurité derrière last_id (_id <= last_id)."""
+        pipeline = [
+            {"$match": {"record_type": "measurement",
+                        "_id": {"$gte": self._window_floor(last_id), "$lte": last_id}}},
+            {"$group": {"_id": "$station_id", "rows": {"$sum": 1}}}
+        ]
+        return {doc["_id"]: doc["rows"] for doc in self.collection.aggregate(pipeline) if doc["_id"] is not None}
+
+    def context_start(self, station_id: str, start: datetime) -> datetime:
+        """Début de la relecture : la plus grande fenêtre et le plus grand retard avant 'start'."""
+        context = start - max_window(self.windows).to_pytimedelta()
+        max_lag = max(self.lags, default=0)
+        if max_lag:
+            previous = list(self.collection.find(
+                {"record_type": "measurement", "station_id": station_id, "timestamp": {"$lt": start}},
+                {"_id": 0, "timestamp": 1}
+            ).sort("timestamp", -1).skip(max_lag - 1).limit(1))
+            if previous:
+                context = min(context, previous[0]["timestamp"])
+        return context
+
+    # ─────────────────────────────────────────────────────────────
+    # RAFRAÎCHISSEMENT
+    # ─────────────────────────────────────────────────────────────
+
+    def refresh(self, full: bool = False) -> dict:
+        """
+        Recalcule les variables des stations ayant reçu de nouvelles mesures.
+
+        Args:
+            full: Ignore l'état et recalcule tout l'historique
+
+        Returns:
+            dict: {stations, new_rows, context_rows, written, seconds}
+        """
+        started = time.perf_counter()
+        state = {"last_id": None} if full else self.load_state()
+        changes = self.find_changes(state)
+        stats = {"stations": len(changes), "new_rows": sum(c["rows"] for c in changes.values()),
+                 "context_rows": 0, "written": 0}
+        if not changes:
+            logger.info("Variables à jour : aucune nouvelle mesure.")
+            stats["seconds"] = round(time.perf_counter() - started, 3)
+            return stats
+
+        # Nouveau repère, compté avant la lecture : une mesure validée ensuite avec un
+        # _id plus petit modifie le compte de la fenêtre et sera reprise au prochain passage
+        last_id = max([c["last_id"] for c in changes.values()]
+                      + ([ObjectId(state["last_id"])] if state.get("last_id") else []))
+        counts = self.window_counts(last_id)
+
+        # Une seule lecture colonnaire : fin de série de chaque station, avec son contexte
+        clauses = [{"station_id": station_id, "timestamp": {"$gte": self.context_start(station_id, c["start"])}}
+                   for station_id, c in sorted(changes.items())]
+        query = {"record_type": "measurement", "$or": clauses}
+        df = columns_to_frame(read_columns(self.collection, query, FEATURE_FIELDS, self.batch_size))
+        stats["context_rows"] = len(df)
+
+        features = build_features(df, self.windows, self.lags)
+        starts = features["station_id"].astype(str).map({sid: c["start"] for sid, c in changes.items()})
+        features = features[features["timestamp"] >= pd.to_datetime(starts)].reset_index(drop=True)
+
+        tails = {station_id: c["start"] for station_id, c in changes.items()}
+        if self.sink == "parquet":
+            self._write_parquet(features, tails)
+        else:
+            self._write_mongo(features, tails)
+        stats["written"] = len(features)
+
+        state["last_id"] = str(last_id)
+        state["window_counts"] = counts
+        self.save_state(state)
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"🧮 Variables : {stats['stations']} station(s), {stats['new_rows']} nouvelle(s) mesure(s), "
+                    f"{stats['written']} ligne(s) recalculée(s) ({stats['context_rows']} lues) "
+                    f"en {stats['seconds']:.2f}s")
+        return stats
+
+    # ─────────────────────────────────────────────────────────────
+    # ÉCRITURE
+    # ─────────────────────────────────────────────────────────────
+
+    def _write_mongo(self, features: pd.DataFrame, tails: dict):
+        target = self.collection.database[FEATURE_COLLECTION]
+        target.create_index([("station_id", ASCENDING), ("timestamp", ASCENDING)],
+                            name="idx_station_timestamp", unique=True)
+        # Fin de série remplacée : suppression puis insertion (plages disjointes par station)
+        target.delete_many({"$or": [{"station_id": sid, "timestamp": {"$gte": start}}
+                                    for sid, start in tails.items()]})
+        records = features.assign(station_id=features["station_id"].astype(str)).to_dict("records")
+        for start in range(0, len(records), self.batch_size):
+            target.insert_many(records[start:start + self.batch_size], ordered=False)
+
+    def partition_dir(self, station_id: str, month: str) -> str:
+        return os.path.join(self.output_dir, f"station_id={station_id}", f"month={month}")
+
+    def _write_parquet(self, features: pd.DataFrame, tails: dict):
+        """Réécrit les partitions (station, mois) touchées : lignes conservées avant le début recalculé."""
+        features = features.assign(station_id=features["station_id"].astype(str),
+                                   month=features["timestamp"].dt.strftime("%Y-%m"))
+        for (station_id, month), rows in features.groupby(["station_id", "month"], sort=True):
+            directory = self.partition_dir(station_id, month)
+            path = os.path.join(directory, "features.parquet")
+            rows = rows.drop(columns="month")
+            if os.path.exists(path):
+                kept = pq.read_table(path).to_pandas()
+                kept = kept[kept["timestamp"] < tails[station_id]]
+                rows = pd.concat([kept, rows], ignore_index=True)
+
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp_path, compression="snappy")
+            os.replace(tmp_path, path)
+
+
+def read_features(output_dir: str = DEFAULT_FEATURE_DIR, station_ids=None, columns=None) -> pd.DataFrame:
+    """Relit les variables Parquet (élagage des partitions par station)."""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(output_dir, format="parquet", partitioning="hive", exclude_invalid_files=True)
+    filter_expr = ds.field("station_id").isin(list(station_ids)) if station_ids else None
+    df = dataset.to_table(columns=columns, filter=filter_expr).to_pandas()
+    return df.sort_values(["station_id", "timestamp"], kind="stable", ignore_index=True)
+
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rafraîchissement incrémental des variables de prévision")
+    parser.add_argument("--sink", choices=["mongo", "parquet"], default=os.getenv("FEATURE_SINK", "mongo"),
+                        help="Destination des variables")
+    parser.add_argument("--output", default=DEFAULT_FEATURE_DIR, help="Dossier Parquet (--sink parquet)")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Fichier d'état (dernier _id traité)")
+    parser.add_argument("--full", action="store_true", help="Recalcule tout l'historique")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from src.connectors.mongo_connector import MongoConnector
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv("config/.env")
+    args = parse_args()
+
+    mongo = MongoConnector()
+    mongo.connect()
+    store = FeatureStore(mongo.db[MongoConnector.COLLECTION_NAME], sink=args.sink,
+                         output_dir=args.output, state_path=args.state)
+    store.refresh(full=args.full)
+    mongo.close()
@@ -0,0 +1,187 @@
+"""
+Gestion déclarative des index de la collection weather_data.
+
+Au lieu d'appeler create_index pour chaque index à chaque exécution,
+les index existants sont lus une seule fois (list_indexes) et comparés
+aux spécifications déclarées ci-dessous :
+- index manquants : créés en une seule commande createIndexes
+- index modifiés (même nom, clés / options différentes) : signalés, reconstruits
+  uniquement par la commande de migration (hors fenêtre de chargement)
+- index obsolètes (non déclarés) : supprimés uniquement sur demande
+
+Usage:
+    python -m src.connectors.index_manager --dry-run
+    python -m src.connectors.index_manager --migrate --drop-stale
+"""
+
+import argparse
+import logging
+
+from pymongo import ASCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Spécifications des index (nom → clés + options)
+INDEX_SPECS = [
+    # Index 1 : Recherche par station et date (requêtes temporelles)
+    {"name": "idx_station_timestamp", "keys": [("station_id", ASCENDING), ("timestamp", ASCENDING)]},
+    # Index 2 : Filtrage par type de document
+    {"name": "idx_record_type", "keys": [("record_type", ASCENDING)]},
+    # Index 3 : Recherche par source de données
+    {"name": "idx_source", "keys": [("source", ASCENDING)]},
+    # Index 4 : Recherche géographique (si besoin de requêtes geo)
+    {"name": "idx_location", "keys": [("location.latitude", ASCENDING), ("location.longitude", ASCENDING)]},
+    # Index 5 : Unicité pour les stations de référence (évite les doublons de métadonnées)
+    {
+        "name": "idx_unique_station_reference",
+        "keys": [("record_type", ASCENDING), ("station_id", ASCENDING), ("source", ASCENDING)],
+        "options": {"unique": True, "partialFilterExpression": {"record_type": "station_reference"}}
+    },
+]
+
+# Options comparées entre la spécification et l'index existant (avec leur valeur par défaut)
+COMPARED_OPTIONS = {"unique": False, "sparse": False, "partialFilterExpression": None,
+                    "expireAfterSeconds": None}
+
+
+def _normalize_existing(info: dict) -> dict:
+    keys = [(field, int(direction) if isinstance(direction, (int, float)) else direction)
+            for field, direction in info["key"].items()]
+    options = {opt: info[opt] for opt in COMPARED_OPTIONS if opt in info}
+    return {"name": info["name"], "keys": keys, "options": options}
+
+
+def _same_index(spec: dict, existing: dict) -> bool:
+    if [tuple(k) for k in spec["keys"]] != [tuple(k) for k in existing["keys"]]:
+        return False
+    spec_options = spec.get("options", {})
+    for opt, default in COMPARED_OPTIONS.items():
+        # Certaines implémentations (mongomock) n'exposent pas partialFilterExpression :
+        # l'option n'est comparée que si le serveur la renvoie
+        if opt == "partialFilterExpression" and opt not in existing["options"]:
+            continue
+        if spec_options.get(opt, default) != existing["options"].get(opt, default):
+            return False
+    return True
+
+
+def diff_indexes(collection, specs: list = None) -> dict:
+    """
+    Compare les index existants (un seul list_indexes) aux spécifications.
+
+    Returns:
+        dict: {missing: [spec], changed: [spec], stale: [name], ok: [name]}
+    """
+    specs = specs if specs is not None else INDEX_SPECS
+    existing = {info["name"]: _normalize_existing(info) for info in collection.list_indexes()}
+    existing.pop("_id_", None)
+
+    plan = {"missing": [], "changed": [], "stale": [], "ok": []}
+    for spec in specs:
+        current = existing.pop(spec["name"], None)
+        if current is None:
+            plan["missing"].append(spec)
+        elif _same_index(spec, current):
+            plan["ok"].append(spec["name"])
+        else:
+            plan["changed"].append(spec)
+    plan["stale"] = sorted(existing)
+    return plan
+
+
+def _to_model(spec: dict) -> IndexModel:
+    return IndexModel(spec["keys"], name=spec["name"], **spec.get("options", {}))
+
+
+def reconcile_indexes(collection, specs: list = None, create_missing: bool = True,
+                      rebuild_changed: bool = False, drop_stale: bool = False) -> dict:
+    """
+    Applique le plan de diff_indexes.
+
+    Args:
+        create_missing: Crée les index absents (une seule commande createIndexes)
+        rebuild_changed: Supprime puis recrée les index dont la spécification a changé
+        drop_stale: Supprime les index non déclarés
+
+    Returns:
+        dict: plan + listes 'created' et 'dropped'
+    """
+    plan = diff_indexes(collection, specs)
+    plan["created"], plan["dropped"] = [], []
+
+    to_create = list(plan["missing"]) if create_missing else []
+
+    if plan["changed"]:
+        names = ", ".join(spec["name"] for spec in plan["changed"])
+        if rebuild_changed:
+            for spec in plan["changed"]:
+                collection.drop_index(spec["name"])
+                plan["dropped"].append(spec["name"])
+            to_create.extend(plan["changed"])
+        else:
+            logger.warning(f"Index modifiés non reconstruits ({names}) : "
+                           "lancer python -m src.connectors.index_manager --migrate")
+
+    if plan["stale"]:
+        if drop_stale:
+            for name in plan["stale"]:
+                collection.drop_index(name)
+                plan["dropped"].append(name)
+        else:
+            logger.info(f"Index non déclarés conservés : {', '.join(plan['stale'])}")
+
+    if to_create:
+        plan["created"] = collection.create_indexes([_to_model(spec) for spec in to_create])
+
+    return plan
+
+
+# =============================================================================
+# COMMANDE DE MIGRATION
+# =============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Réconciliation des index MongoDB (weather_data)")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le plan sans rien modifier")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Reconstruit les index dont la spécification a changé")
+    parser.add_argument("--drop-stale", action="store_true", help="Supprime les index non déclarés")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from src.connectors.mongo_connector import MongoConnector
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv("config/.env")
+    args = parse_args(argv)
+
+    mongo = MongoConnector()
+    mongo.connect()
+    collection = mongo.db[mongo.COLLECTION_NAME]
+
+    print("=" * 60)
+    print(f"🗂️  INDEX DE '{mongo.COLLECTION_NAME}'")
+    print("=" * 60)
+
+    if args.dry_run:
+        plan = diff_indexes(collection)
+    else:
+        plan = reconcile_indexes(collection, rebuild_changed=args.migrate, drop_stale=args.drop_stale)
+
+    print(f"   À jour     : {', '.join(plan['ok']) or '-'}")
+    print(f"   Manquants  : {', '.join(s['name'] for s in plan['missing']) or '-'}")
+    print(f"   Modifiés   : {', '.join(s['name'] for s in plan['changed']) or '-'}")
+    print(f"   Obsolètes  : {', '.join(plan['stale']) or '-'}")
+    if not args.dry_run:
+        print(f"   Créés      : {', '.join(plan['created']) or '-'}")
+        print(f"   Supprimés  : {', '.join(plan['dropped']) or '-'}")
+    print("=" * 60)
+
+    mongo.close()
+    return plan
+
+
+if __name__ == "__main__":
+    main()
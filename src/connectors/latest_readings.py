@@ -0,0 +1,164 @@
+"""
+Dernière mesure par station (collection matérialisée station_latest).
+
+La requête la plus fréquente des tableaux de bord ("dernier relevé de chaque
+station") parcourt weather_data : find_one trié par timestamp pour une station,
+et un $group complet pour toutes les stations. La collection station_latest
+contient un document par station (_id = station_id) avec sa mesure la plus
+récente ; elle est tenue à jour au chargement :
+- pour chaque lot inséré, la mesure la plus récente de chaque station est
+  calculée côté client
+- un upsert conditionnel par station ne remplace le document stocké que si
+  le nouveau timestamp est plus récent (filtre timestamp $lt) ; si le document
+  stocké est plus récent, l'upsert échoue sur l'_id (E11000), erreur ignorée
+
+Lecture : get_latest_readings, une seule requête sur l'index _id.
+
+Usage (reconstruction depuis weather_data, ex. après un rechargement partiel) :
+    python -m src.connectors.latest_readings --rebuild
+"""
+
+import argparse
+import logging
+from datetime import datetime
+
+import bson
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.connectors.dedup import _measurement_keys
+
+logger = logging.getLogger(__name__)
+
+LATEST_COLLECTION = "station_latest"
+LATEST_FIELDS = ("station_id", "station_name", "source", "location", "timestamp", "measurements")
+
+# Code serveur d'une clé dupliquée (upsert conditionnel sur une station déjà plus récente)
+DUPLICATE_KEY = 11000
+
+
+def _documents_at(documents, indices: list) -> list:
+    """Documents aux indices donnés (lots compacts ou encodés matérialisés uniquement pour ces lignes)."""
+    if hasattr(documents, "select"):
+        selected = documents.select(indices)
+        if hasattr(selected, "raw_documents"):
+            return [bson.decode(raw.raw) for raw in selected.raw_documents()]
+        return selected.documents()
+    return [documents[i] for i in indices]
+
+
+def latest_per_station(documents) -> dict:
+    """
+    Mesure la plus récente de chaque station d'un lot.
+
+    Returns:
+        dict: {station_id: document 'measurement'}
+    """
+    newest = {}
+    for i, station_id, timestamp in _measurement_keys(documents):
+        current = newest.get(station_id)
+        if current is None or timestamp > current[1]:
+            newest[station_id] = (i, timestamp)
+
+    station_ids = list(newest)
+    winners = _documents_at(documents, [newest[station_id][0] for station_id in station_ids])
+    return dict(zip(station_ids, winners))
+
+
+def update_latest(collection, documents) -> dict:
+    """
+    Upserts conditionnels (un par station) dans station_latest.
+
+    Returns:
+        dict: {stations, updated} (updated : stations dont la mesure a été remplacée ou créée)
+    """
+    latest = latest_per_station(documents)
+    if not latest:
+        return {"stations": 0, "updated": 0}
+
+    now = datetime.now()
+    operations = []
+    for station_id, doc in latest.items():
+        fields = {field: doc.get(field) for field in LATEST_FIELDS}
+        fields["updated_at"] = now
+        operations.append(UpdateOne({"_id": station_id, "timestamp": {"$lt": doc["timestamp"]}},
+                                    {"$set": fields}, upsert=True))
+
+    try:
+        result = collection.bulk_write(operations, ordered=False).bulk_api_result
+    except BulkWriteError as bwe:
+        # Stations dont la mesure stockée est déjà plus récente : rien à faire
+        unexpected = [error for error in bwe.details["writeErrors"] if error["code"] != DUPLICATE_KEY]
+        if unexpected:
+            raise
+        result = bwe.details
+
+    updated = result["nModified"] + result["nUpserted"]
+    logger.info(f"   station_latest : {updated}/{len(latest)} station(s) mise(s) à jour")
+    return {"stations": len(latest), "updated": updated}
+
+
+def get_latest_readings(collection, station_ids: list = None) -> list:
+    """Dernière mesure de chaque station (ou des stations demandées), triée par station."""
+    query = {"_id": {"$in": list(station_ids)}} if station_ids is not None else {}
+    return list(collection.find(query).sort("_id", 1))
+
+
+def rebuild_latest(source_collection, latest_collection) -> int:
+    """
+    Reconstruit station_latest depuis weather_data (un $group, hors fenêtre de chargement).
+
+    Returns:
+        int: nombre de stations
+    """
+    pipeline = [
+        {"$match": {"record_type": "measurement"}},
+        {"$sort": {"station_id": 1, "timestamp": -1}},
+        {"$group": {"_id": "$station_id", **{field: {"$first": f"${field}"} for field in LATEST_FIELDS}}}
+    ]
+    now = datetime.now()
+    documents = [dict(doc, updated_at=now) for doc in source_collection.aggregate(pipeline, allowDiskUse=True)]
+    latest_collection.delete_many({})
+    if documents:
+        latest_collection.insert_many(documents)
+    return len(documents)
+
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Collection station_latest (dernière mesure par station)")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruit la collection depuis weather_data")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from src.connectors.mongo_connector import MongoConnector
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv("config/.env")
+    args = parse_args(argv)
+
+    mongo = MongoConnector()
+    mongo.connect()
+
+    if args.rebuild:
+        count = rebuild_latest(mongo.db[mongo.COLLECTION_NAME], mongo.db[LATEST_COLLECTION])
+        print(f"✅ {LATEST_COLLECTION} reconstruite : {count} station(s)")
+
+    print("=" * 60)
+    print(f"📍 DERNIÈRE MESURE PAR STATION ('{LATEST_COLLECTION}')")
+    print("=" * 60)
+    for doc in mongo.get_latest_readings():
+        temperature = (doc.get("measurements") or {}).get("temperature_celsius")
+        print(f"   {doc['_id']:12} : {doc['timestamp']} | {temperature} °C")
+    print("=" * 60)
+
+    mongo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,25 @@ Collection unique : weather_data
 """
 
 import os
+import time
 import logging
-from pymongo import MongoClient, errors, ASCENDING
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pymongo import MongoClient, ReplaceOne, errors
 from pymongo.errors import BulkWriteError
 
+from src.connectors.adaptive_writer import AdaptiveWriteController, is_transient_error
+from src.connectors.bson_batches import EncodedBatch
+from src.connectors.index_manager import reconcile_indexes
+from src.processing.measurement_batch import MeasurementBatch
+from src.monitoring import metrics
+from src.monitoring.spans import record_span
+
 logger = logging.getLogger(__name__)
 
+# Code serveur d'une clé dupliquée (document déjà chargé)
+DUPLICATE_KEY = 11000
+
 
 class MongoConnector:
     """
@@ -50,6 +63,8 @@ class MongoConnector:
         self.db_name = os.getenv("MONGO_DB_NAME", "greenandcoop_weather")
         self.client = None
         self.db = None
+        self.indexes_verified = False
+        self.write_controller = None
         
         logger.info(f"MongoConnector initialisé en mode: {self.mode}")
 
@@ -74,62 +89,58 @@ class MongoConnector:
             logger.error(f"Echec connexion Mongo: {e}")
             raise
 
-    def init_db(self):
+    def init_db(self, force: bool = False):
         """
-        Crée les index pour la collection unifiée.
-        Optimisés pour les requêtes des Data Scientists.
+        Vérifie les index de la collection unifiée (optimisés pour les requêtes
+        des Data Scientists) : un seul list_indexes, puis création des index
+        manquants en une commande. Les index modifiés ne sont jamais reconstruits
+        ici (voir src.connectors.index_manager --migrate).
+
+        Le résultat est mémorisé : les appels suivants sur la même connexion
+        ne font plus d'aller-retour (force=True pour revérifier).
+        MONGO_AUTO_CREATE_INDEXES=false : aucun index créé pendant le chargement.
         """
         if self.db is None:
             self.connect()
 
+        if self.indexes_verified and not force:
+            return
+
         try:
             collection = self.db[self.COLLECTION_NAME]
-            
-            # Index 1 : Recherche par station et date (requêtes temporelles)
-            collection.create_index(
-                [("station_id", ASCENDING), ("timestamp", ASCENDING)],
-                name="idx_station_timestamp"
-            )
-            
-            # Index 2 : Filtrage par type de document
-            collection.create_index(
-                [("record_type", ASCENDING)],
-                name="idx_record_type"
-            )
-            
-            # Index 3 : Recherche par source de données
-            collection.create_index(
-                [("source", ASCENDING)],
-                name="idx_source"
-            )
-            
-            # Index 4 : Recherche géographique (si besoin de requêtes geo)
-            collection.create_index(
-                [("location.latitude", ASCENDING), ("location.longitude", ASCENDING)],
-                name="idx_location"
-            )
-            
-            # Index 5 : Unicité pour les stations de référence
-            # (évite les doublons de métadonnées)
-            collection.create_index(
-                [("record_type", ASCENDING), ("station_id", ASCENDING), ("source", ASCENDING)],
-                unique=True,
-                partialFilterExpression={"record_type": "station_reference"},
-                name="idx_unique_station_reference"
-            )
-            
-            logger.info(f"Index MongoDB vérifiés/créés sur '{self.COLLECTION_NAME}'.")
-            
+            create_missing = os.getenv("MONGO_AUTO_CREATE_INDEXES", "true").lower() != "false"
+            plan = reconcile_indexes(collection, create_missing=create_missing)
+
+            if plan["missing"] and not create_missing:
+                names = ", ".join(spec["name"] for spec in plan["missing"])
+                logger.warning(f"Index manquants non créés ({names}) : "
+                               "lancer python -m src.connectors.index_manager")
+            if plan["created"]:
+                logger.info(f"Index créés sur '{self.COLLECTION_NAME}' : {', '.join(plan['created'])}")
+            logger.info(f"Index MongoDB vérifiés sur '{self.COLLECTION_NAME}' "
+                        f"({len(plan['ok'])} à jour).")
+            self.indexes_verified = True
+
         except Exception as e:
             logger.warning(f"Avertissement lors de la création des index : {e}")
 
-    def insert_documents(self, data_list: list):
+    def insert_documents(self, data_list: list, batch_size: int = None):
         """
-        Insère des documents dans la collection unifiée.
+        Insère des documents dans la collection unifiée, par batchs.
         Gère les doublons de manière idempotente.
+
+        Sans batch_size, la taille des batchs et le nombre de batchs en vol
+        sont ajustés selon la latence observée (voir src.connectors.adaptive_writer) ;
+        le réglage est conservé d'un appel à l'autre sur la même connexion.
+        Les batchs en erreur transitoire sont réessayés (MONGO_INSERT_RETRIES).
+        Toute autre erreur qu'un doublon de clé (E11000) est relancée : le lot
+        n'est alors pas considéré comme chargé par l'appelant.
         
         Args:
-            data_list: Liste de documents au format unifié
+            data_list: Liste de documents au format unifié, lot pré-encodé
+                       (EncodedBatch : documents insérés sans ré-encodage BSON) ou lot
+                       compact (MeasurementBatch : documents reconstruits batch par batch)
+            batch_size: Taille fixe des batchs (désactive l'ajustement)
             
         Returns:
             int: Nombre de documents insérés
@@ -141,36 +152,265 @@ class MongoConnector:
         if self.db is None:
             self.connect()
 
+        encoded = isinstance(data_list, EncodedBatch)
+        compact = isinstance(data_list, MeasurementBatch)
+        stations_written = 0
+
+        # Stations de référence : seules les nouvelles ou modifiées sont écrites (empreinte)
+        if not (encoded or compact) and os.getenv("STATION_HASH_SYNC", "true").lower() != "false":
+            stations = [doc for doc in data_list if doc.get('record_type') == 'station_reference']
+            if stations:
+                stations_written = self.sync_station_references(stations)
+                data_list = [doc for doc in data_list if doc.get('record_type') != 'station_reference']
+                if not data_list:
+                    return stations_written
+
+        controller = AdaptiveWriteController.fixed(batch_size) if batch_size else self._write_controller()
+        max_retries = int(os.getenv("MONGO_INSERT_RETRIES", "3"))
+        collection = self.db[self.COLLECTION_NAME]
+        inserted_count = stations_written
+        duplicates_count = 0
+
+        def materialize(start: int, stop: int):
+            if encoded:
+                return data_list.raw_documents(start, stop)
+            if compact:
+                return data_list.documents(start, stop)
+            return data_list[start:stop]
+
+        def remaining(start: int, stop: int) -> tuple:
+            """
+            Plage d'un nouvel essai sans les mesures déjà écrites : l'essai interrompu a pu
+            être appliqué en partie par le serveur, et aucun index unique ne protège les mesures.
+            """
+            from src.connectors.dedup import filter_new_documents
+
+            if encoded or compact:
+                kept, stats = filter_new_documents(collection, data_list.select(range(start, stop)))
+                return (kept.raw_documents() if encoded else kept.documents()), stats["skipped"]
+            kept, stats = filter_new_documents(collection, data_list[start:stop])
+            return kept, stats["skipped"]
+
+        # Plages (start, stop, tentative) à réessayer, batchs en vol {future: plage}
+        retries = deque()
+        inflight = {}
+        position = 0
+
         try:
-            collection = self.db[self.COLLECTION_NAME]
-            
-            # ordered=False : Continue même si un document échoue (doublon)
-            result = collection.insert_many(data_list, ordered=False)
-            count = len(result.inserted_ids)
-            
+            with ThreadPoolExecutor(max_workers=controller.max_concurrency) as pool:
+                while position < len(data_list) or retries or inflight:
+                    while len(inflight) < controller.concurrency and (retries or position < len(data_list)):
+                        if retries:
+                            start, stop, attempt = retries.popleft()
+                            batch, already_written = remaining(start, stop)
+                            # Écrits par l'essai interrompu : comptés comme insérés
+                            inserted_count += already_written
+                            if not batch:
+                                continue
+                        else:
+                            start, stop, attempt = position, min(position + controller.batch_size, len(data_list)), 0
+                            position = stop
+                            batch = materialize(start, stop)
+                        future = pool.submit(self._insert_batch, collection, batch)
+                        inflight[future] = (start, stop, attempt)
+
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        start, stop, attempt = inflight.pop(future)
+                        try:
+                            batch_inserted, batch_duplicates, latency, write_concern_error = future.result()
+                        except Exception as e:
+                            if not is_transient_error(e) or attempt >= max_retries:
+                                raise
+                            controller.record_failure(type(e).__name__)
+                            metrics.inc("etl_insert_errors_total", collection=self.COLLECTION_NAME)
+                            logger.warning(f"Batch [{start}, {stop}) en erreur ({e}) : "
+                                           f"nouvel essai {attempt + 1}/{max_retries}")
+                            time.sleep(0.5 * 2 ** attempt)
+                            # Documents déjà écrits avant l'erreur : retirés de la plage au nouvel essai
+                            retries.append((start, stop, attempt + 1))
+                            continue
+
+                        metrics.observe("etl_insert_batch_seconds", latency, collection=self.COLLECTION_NAME)
+                        # Span du batch enregistré ici (thread principal) : le recorder n'est pas partagé
+                        record_span("load.insert_batch", latency, rows=batch_inserted + batch_duplicates,
+                                    start=start, stop=stop, attempt=attempt)
+                        if write_concern_error:
+                            # Documents écrits mais réplication en retard : on ralentit
+                            controller.record_failure("write concern")
+                        else:
+                            controller.record_success(latency)
+
+                        inserted_count += batch_inserted
+                        duplicates_count += batch_duplicates
+                        metrics.inc("etl_documents_inserted_total", batch_inserted,
+                                    collection=self.COLLECTION_NAME)
+                        if batch_duplicates:
+                            metrics.inc("etl_documents_duplicates_total", batch_duplicates,
+                                        collection=self.COLLECTION_NAME)
+
+        except Exception as e:
+            # Lot partiellement écrit : l'appelant ne doit pas le considérer comme chargé
+            logger.error(f"Erreur critique insertion dans {self.COLLECTION_NAME} "
+                         f"({inserted_count} documents insérés avant l'erreur) : {e}")
+            metrics.inc("etl_insert_errors_total", collection=self.COLLECTION_NAME)
+            raise
+
+        if controller.adaptive:
+            logger.info(f"   Écritures adaptatives : {controller.summary()}")
+
+        if os.getenv("MAINTAIN_LATEST", "true").lower() != "false":
+            self.update_latest_readings(data_list)
+
+        if duplicates_count:
+            logger.info(f"Insertion '{self.COLLECTION_NAME}' : {inserted_count} ajoutés, "
+                       f"{duplicates_count} doublons ignorés.")
+        else:
             # Statistiques par type
-            measurements = sum(1 for d in data_list if d.get('record_type') == 'measurement')
-            stations = sum(1 for d in data_list if d.get('record_type') == 'station_reference')
-            
-            logger.info(f"-> Succès : {count} documents insérés dans '{self.COLLECTION_NAME}'")
+            if encoded or compact:
+                counts = data_list.count_by_type()
+                measurements, stations = counts.get('measurement', 0), counts.get('station_reference', 0)
+            else:
+                measurements = sum(1 for d in data_list if d.get('record_type') == 'measurement')
+                stations = sum(1 for d in data_list if d.get('record_type') == 'station_reference')
+
+            logger.info(f"-> Succès : {inserted_count} documents insérés dans '{self.COLLECTION_NAME}'")
             logger.info(f"   (Mesures: {measurements}, Stations: {stations})")
-            
-            return count
-            
+
+        return inserted_count
+
+    def _write_controller(self) -> AdaptiveWriteController:
+        """Contrôleur AIMD de la connexion (créé au premier chargement, bornes journalisées)."""
+        if self.write_controller is None:
+            if os.getenv("MONGO_ADAPTIVE_WRITES", "true").lower() == "false":
+                self.write_controller = AdaptiveWriteController.fixed(
+                    int(os.getenv("MONGO_INSERT_BATCH_SIZE", "5000")))
+            else:
+                self.write_controller = AdaptiveWriteController.from_env()
+                logger.info(f"⚙️  Écritures MongoDB adaptatives : {self.write_controller.describe_bounds()}")
+        return self.write_controller
+
+    @staticmethod
+    def _insert_batch(collection, batch: list) -> tuple:
+        """
+        insert_many d'un batch (exécuté dans un thread du pool).
+
+        Returns:
+            tuple: (insérés, doublons, latence en secondes, write concern non satisfait)
+        """
+        batch_start = time.perf_counter()
+        try:
+            # ordered=False : Continue même si un document échoue (doublon)
+            collection.insert_many(batch, ordered=False)
+            # Sans erreur, tout le batch est écrit (inserted_ids reste vide pour les RawBSONDocument)
+            return len(batch), 0, time.perf_counter() - batch_start, False
         except BulkWriteError as bwe:
-            # Gestion des erreurs "Duplicate Key"
-            inserted_count = bwe.details['nInserted']
-            duplicates_count = len(bwe.details['writeErrors'])
-            
-            logger.info(f"Insertion '{self.COLLECTION_NAME}' : {inserted_count} ajoutés, "
-                       f"{duplicates_count} doublons ignorés.")
-            
-            return inserted_count
-            
-        except Exception as e:
-            logger.error(f"Erreur critique insertion dans {self.COLLECTION_NAME}: {e}")
+            # Seules les erreurs "Duplicate Key" sont tolérées
+            write_errors = bwe.details['writeErrors']
+            if any(error.get('code') != DUPLICATE_KEY for error in write_errors):
+                raise
+            return (bwe.details['nInserted'], len(write_errors),
+                    time.perf_counter() - batch_start, bool(bwe.details.get('writeConcernErrors')))
+
+    def sync_station_references(self, stations: list) -> int:
+        """
+        Écrit les stations de référence nouvelles ou modifiées (ReplaceOne avec upsert)
+        et ignore celles dont l'empreinte content_hash est inchangée.
+        Voir src.connectors.dedup.filter_changed_stations.
+
+        Returns:
+            int: Nombre de stations écrites
+        """
+        from src.connectors.dedup import filter_changed_stations
+
+        if self.db is None:
+            self.connect()
+
+        collection = self.db[self.COLLECTION_NAME]
+        new, changed, stats = filter_changed_stations(collection, stations)
+        logger.info(f"Stations de référence : {stats['new']} nouvelle(s), {stats['changed']} modifiée(s), "
+                    f"{stats['unchanged']} inchangée(s) ignorée(s)")
+        if not new and not changed:
             return 0
 
+        operations = [ReplaceOne({"record_type": "station_reference", "station_id": doc["station_id"],
+                                  "source": doc.get("source")}, doc, upsert=True)
+                      for doc in new + changed]
+        result = collection.bulk_write(operations, ordered=False)
+        written = result.upserted_count + result.modified_count
+        metrics.inc("etl_documents_inserted_total", written, collection=self.COLLECTION_NAME)
+        return written
+
+    def filter_new_documents(self, data_list: list) -> tuple:
+        """
+        Retire les mesures déjà présentes (clé station_id + timestamp) avant insertion.
+        Voir src.connectors.dedup.filter_new_documents.
+
+        Returns:
+            tuple: (documents à insérer, statistiques de déduplication)
+        """
+        from src.connectors.dedup import filter_new_documents
+
+        if self.db is None:
+            self.connect()
+
+        return filter_new_documents(self.db[self.COLLECTION_NAME], data_list)
+
+    def update_latest_readings(self, data_list) -> dict:
+        """
+        Met à jour station_latest avec la mesure la plus récente de chaque station du lot.
+        Voir src.connectors.latest_readings.update_latest.
+
+        Returns:
+            dict: {stations, updated}
+        """
+        from src.connectors.latest_readings import LATEST_COLLECTION, update_latest
+
+        if self.db is None:
+            self.connect()
+
+        try:
+            return update_latest(self.db[LATEST_COLLECTION], data_list)
+        except Exception as e:
+            # Collection dérivée : reconstruite par python -m src.connectors.latest_readings --rebuild
+            logger.warning(f"Mise à jour de {LATEST_COLLECTION} impossible : {e}")
+            return {"stations": 0, "updated": 0}
+
+    def get_latest_readings(self, station_ids: list = None) -> list:
+        """
+        Dernière mesure de chaque station, lue dans station_latest (une requête sur l'index _id).
+
+        Returns:
+            list: documents {_id: station_id, station_name, source, location, timestamp, measurements}
+        """
+        from src.connectors.latest_readings import LATEST_COLLECTION, get_latest_readings
+
+        if self.db is None:
+            self.connect()
+
+        return get_latest_readings(self.db[LATEST_COLLECTION], station_ids)
+
+    def pair_reference_stations(self, stations: list = None, k: int = 3, max_radius_km: float = None) -> dict:
+        """
+        Apparie les stations de mesure à leurs k stations de référence les plus proches.
+        Voir src.processing.spatial_index (index en cache, reconstruit si les stations changent).
+
+        Args:
+            stations: documents {station_id, location} (défaut : stations de station_latest)
+
+        Returns:
+            dict: {station_id: [(station_id de référence, distance_km), ...]}
+        """
+        from src.processing.spatial_index import load_reference_index
+
+        if self.db is None:
+            self.connect()
+
+        index = load_reference_index(self.db[self.COLLECTION_NAME])
+        if stations is None:
+            stations = self.get_latest_readings()
+        return index.pair_stations(stations, k, max_radius_km)
+
     def get_stats(self) -> dict:
         """
         Retourne les statistiques de la collection.
@@ -194,6 +434,30 @@ class MongoConnector:
             "collection": self.COLLECTION_NAME
         }
 
+    def read_measurements_frame(self, station_ids=None, start=None, end=None, fields: list = None,
+                                parallelism: int = 1, splits_per_station: int = 1):
+        """
+        Lit les mesures en DataFrame colonnaire (sans passer par des listes de dicts).
+        Voir src.connectors.arrow_reader.read_measurements_frame.
+
+        Returns:
+            pd.DataFrame: station_id (category), timestamp, measurements.* aplaties
+        """
+        from src.connectors.arrow_reader import read_measurements_frame
+
+        if self.db is None:
+            self.connect()
+
+        return read_measurements_frame(
+            self.db[self.COLLECTION_NAME],
+            station_ids=station_ids,
+            start=start,
+            end=end,
+            fields=fields,
+            parallelism=parallelism,
+            splits_per_station=splits_per_station
+        )
+
     def close(self):
         """Ferme proprement la connexion."""
         if self.client:
@@ -0,0 +1,398 @@
+"""
+Module d'export colonnaire (Parquet / Arrow) de la collection weather_data.
+
+Les Data Scientists lisent des fichiers Parquet locaux au lieu de
+parcourir des curseurs MongoDB :
+- Lecture de la collection par batchs (projection + filtre station/période)
+- Écriture partitionnée : <export>/station_id=<id>/month=<YYYY-MM>/part-*.parquet
+- Mode incrémental : seules les partitions absentes de l'export sont écrites,
+  plus le dernier mois exporté de chaque station, réécrit en entier (il était
+  peut-être partiel : des mesures chargées depuis y sont ajoutées)
+
+Usage:
+    python -m src.connectors.parquet_exporter
+    python -m src.connectors.parquet_exporter --stations ILAMAD25 IICHTE19 --start 2025-12-01
+    python -m src.connectors.parquet_exporter --full
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+# Dossier d'export par défaut (à côté de data/downloaded)
+DEFAULT_EXPORT_DIR = "data/exports/weather_data"
+MANIFEST_NAME = "_manifest.json"
+
+# Projection MongoDB : uniquement les champs exportés
+EXPORT_PROJECTION = {
+    "_id": 0,
+    "station_id": 1,
+    "station_name": 1,
+    "source": 1,
+    "timestamp": 1,
+    "location.latitude": 1,
+    "location.longitude": 1,
+    "location.elevation": 1,
+    "measurements": 1
+}
+
+MEASUREMENT_FIELDS = ["temperature_celsius", "humidity_percent", "wind_speed_kmh", "pressure_hpa"]
+
+# Schéma Arrow des fichiers exportés (colonnes aplaties)
+EXPORT_SCHEMA = pa.schema([
+    ("station_id", pa.string()),
+    ("station_name", pa.string()),
+    ("source", pa.string()),
+    ("timestamp", pa.timestamp("ms")),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("elevation", pa.int32()),
+    ("temperature_celsius", pa.float64()),
+    ("humidity_percent", pa.float64()),
+    ("wind_speed_kmh", pa.float64()),
+    ("pressure_hpa", pa.float64()),
+])
+
+
+def partition_key(station_id: str, timestamp: datetime) -> tuple:
+    """Clé de partition (station_id, 'YYYY-MM')."""
+    return station_id, timestamp.strftime("%Y-%m")
+
+
+def month_start(month: str) -> datetime:
+    """Premier jour d'une partition 'YYYY-MM'."""
+    year, mon = (int(x) for x in month.split("-"))
+    return datetime(year, mon, 1)
+
+
+def next_month_start(month: str) -> datetime:
+    """Premier jour du mois suivant une partition 'YYYY-MM'."""
+    year, mon = (int(x) for x in month.split("-"))
+    return datetime(year + mon // 12, mon % 12 + 1, 1)
+
+
+def flatten_document(doc: dict) -> dict:
+    """Aplatit un document MongoDB (location.*, measurements.*) en ligne colonnaire."""
+    location = doc.get("location") or {}
+    measurements = doc.get("measurements") or {}
+    row = {
+        "station_id": doc.get("station_id"),
+        "station_name": doc.get("station_name"),
+        "source": doc.get("source"),
+        "timestamp": doc.get("timestamp"),
+        "latitude": location.get("latitude"),
+        "longitude": location.get("longitude"),
+        "elevation": location.get("elevation"),
+    }
+    for field in MEASUREMENT_FIELDS:
+        row[field] = measurements.get(field)
+    return row
+
+
+class ParquetExporter:
+    """
+    Exporte les mesures de weather_data en Parquet partitionné par station et par mois.
+    Un manifeste (_manifest.json) garde la trace des partitions déjà exportées.
+    """
+
+    def __init__(self, collection, output_dir: str = DEFAULT_EXPORT_DIR,
+                 batch_size: int = 10000, rows_per_file: int = 500000):
+        self.collection = collection
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.rows_per_file = rows_per_file
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    # ─────────────────────────────────────────────────────────────
+    # MANIFESTE
+    # ─────────────────────────────────────────────────────────────
+
+    def load_manifest(self) -> dict:
+        """Charge le manifeste (vide si premier export)."""
+        if not os.path.exists(self.manifest_path):
+            return {"partitions": {}}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: dict):
+        """Écrit le manifeste de manière atomique."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, self.manifest_path)
+
+    def partition_dir(self, station_id: str, month: str) -> str:
+        return os.path.join(self.output_dir, f"station_id={station_id}", f"month={month}")
+
+    # ─────────────────────────────────────────────────────────────
+    # REQUÊTE
+    # ─────────────────────────────────────────────────────────────
+
+    def build_query(self, station_ids=None, start=None, end=None, watermarks=None) -> dict:
+        """
+        Construit le filtre MongoDB.
+        En mode incrémental, 'watermarks' ({station_id: dernier mois exporté})
+        restreint la lecture, pour les stations déjà connues, à ce dernier mois
+        (relu pour être réécrit) et aux mois postérieurs.
+        """
+        query = {"record_type": "measurement"}
+        if station_ids:
+            query["station_id"] = {"$in": list(station_ids)}
+
+        time_filter = {}
+        if start is not None:
+            time_filter["$gte"] = start
+        if end is not None:
+            time_filter["$lt"] = end
+        if time_filter:
+            query["timestamp"] = time_filter
+
+        if watermarks:
+            known = list(watermarks.keys())
+            branches = [{"station_id": {"$nin": known}}]
+            for station_id, month in watermarks.items():
+                branches.append({"station_id": station_id, "timestamp": {"$gte": month_start(month)}})
+            query["$or"] = branches
+
+        return query
+
+    # ─────────────────────────────────────────────────────────────
+    # EXPORT
+    # ─────────────────────────────────────────────────────────────
+
+    def _write_part(self, key: tuple, rows: list, run_id: str, part_no: int) -> str:
+        """Écrit un fichier Parquet pour une partition."""
+        station_id, month = key
+        directory = self.partition_dir(station_id, month)
+        os.makedirs(directory, exist_ok=True)
+
+        columns = {name: [row[name] for row in rows] for name in EXPORT_SCHEMA.names}
+        table = pa.table(columns, schema=EXPORT_SCHEMA)
+
+        path = os.path.join(directory, f"part-{run_id}-{part_no:05d}.parquet")
+        pq.write_table(table, path, compression="snappy")
+        return path
+
+    def export(self, station_ids=None, start: datetime = None, end: datetime = None,
+               incremental: bool = True) -> dict:
+        """
+        Exporte les mesures en Parquet partitionné.
+
+        Args:
+            station_ids: Liste de stations à exporter (toutes si None)
+            start: Borne basse incluse sur timestamp
+            end: Borne haute exclue sur timestamp
+            incremental: Si True, n'écrit que les partitions absentes du manifeste et
+                         réécrit le dernier mois exporté de chaque station.
+                         Si False, réécrit entièrement les partitions rencontrées.
+
+        Returns:
+            dict: Statistiques (rows, files, partitions écrites/ignorées)
+        """
+        manifest = self.load_manifest()
+        exported = manifest["partitions"]
+
+        watermarks = None
+        if incremental and exported:
+            watermarks = {}
+            for entry in exported.values():
+                station_id, month = entry["station_id"], entry["month"]
+                if station_id not in watermarks or month > watermarks[station_id]:
+                    watermarks[station_id] = month
+
+        query = self.build_query(station_ids, start, end, watermarks)
+        cursor = self.collection.find(query, EXPORT_PROJECTION).sort(
+            [("station_id", ASCENDING), ("timestamp", ASCENDING)]
+        ).batch_size(self.batch_size)
+
+        run_id = datetime.now().strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        stats = {"rows": 0, "files": 0, "partitions_written": [], "partitions_skipped": 0}
+
+        def refreshable(key: tuple) -> bool:
+            """Dernier mois exporté de la station, relu en entier (pas de filtre période qui le coupe)."""
+            station_id, month = key
+            return (bool(watermarks) and watermarks.get(station_id) == month
+                    and (start is None or start <= month_start(month))
+                    and (end is None or end >= next_month_start(month)))
+
+        current_key = None
+        buffer = []
+        part_no = 0
+        skipped = set()
+        touched = set()
+
+        def flush():
+            nonlocal part_no
+            if not buffer:
+                return
+            path = self._write_part(current_key, buffer, run_id, part_no)
+            part_no += 1
+            name = "/".join(current_key)
+            entry = exported.setdefault(name, {
+                "station_id": current_key[0], "month": current_key[1], "rows": 0, "files": []
+            })
+            entry["rows"] += len(buffer)
+            entry["files"].append(os.path.relpath(path, self.output_dir))
+            entry["exported_at"] = datetime.now().isoformat()
+            stats["rows"] += len(buffer)
+            stats["files"] += 1
+            buffer.clear()
+
+        for doc in cursor:
+            if doc.get("timestamp") is None or not doc.get("station_id"):
+                continue
+            key = partition_key(doc["station_id"], doc["timestamp"])
+
+            if key != current_key:
+                flush()
+                current_key = key
+                name = "/".join(key)
+
+                if name in exported and key not in touched:
+                    if incremental and not refreshable(key):
+                        skipped.add(key)
+                    else:
+                        # Réécriture complète de la partition
+                        shutil.rmtree(self.partition_dir(*key), ignore_errors=True)
+                        del exported[name]
+                if key not in skipped:
+                    touched.add(key)
+                    stats["partitions_written"].append(name)
+
+            if key in skipped:
+                continue
+
+            buffer.append(flatten_document(doc))
+            if len(buffer) >= self.rows_per_file:
+                flush()
+
+        flush()
+
+        stats["partitions_skipped"] = len(skipped)
+        manifest["last_export"] = {"run_id": run_id, "at": datetime.now().isoformat(), "rows": stats["rows"]}
+        self.save_manifest(manifest)
+
+        logger.info(f"Export Parquet : {stats['rows']} lignes, {stats['files']} fichier(s), "
+                    f"{len(stats['partitions_written'])} partition(s) écrite(s), "
+                    f"{stats['partitions_skipped']} ignorée(s) -> {self.output_dir}")
+        return stats
+
+
+    def append_documents(self, documents: list, token=None) -> dict:
+        """
+        Ajoute des mesures déjà lues (ex: flux de change stream) aux partitions
+        concernées, sans relire la collection : un nouveau fichier part-* par partition.
+
+        token : resume token du dernier événement du lot, enregistré dans le
+        manifeste avec les fichiers écrits (les événements rejoués sont ignorés).
+
+        Returns:
+            dict: Statistiques (rows, files, partitions écrites)
+        """
+        groups = {}
+        for doc in documents:
+            if doc.get("record_type", "measurement") != "measurement":
+                continue
+            if doc.get("timestamp") is None or not doc.get("station_id"):
+                continue
+            groups.setdefault(partition_key(doc["station_id"], doc["timestamp"]), []).append(
+                flatten_document(doc)
+            )
+
+        stats = {"rows": 0, "files": 0, "partitions_written": []}
+        manifest = self.load_manifest()
+        if token is not None:
+            manifest["change_stream_token"] = token
+        if not groups:
+            if token is not None:
+                self.save_manifest(manifest)
+            return stats
+
+        run_id = datetime.now().strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+        for part_no, (key, rows) in enumerate(sorted(groups.items())):
+            rows.sort(key=lambda row: row["timestamp"])
+            path = self._write_part(key, rows, run_id, part_no)
+            name = "/".join(key)
+            entry = manifest["partitions"].setdefault(name, {
+                "station_id": key[0], "month": key[1], "rows": 0, "files": []
+            })
+            entry["rows"] += len(rows)
+            entry["files"].append(os.path.relpath(path, self.output_dir))
+            entry["exported_at"] = datetime.now().isoformat()
+            stats["rows"] += len(rows)
+            stats["files"] += 1
+            stats["partitions_written"].append(name)
+
+        self.save_manifest(manifest)
+        return stats
+
+
+def read_parquet_export(output_dir: str = DEFAULT_EXPORT_DIR, station_ids=None, columns=None):
+    """
+    Relit l'export Parquet en DataFrame pandas (lecture locale, sans MongoDB).
+
+    Args:
+        output_dir: Dossier de l'export
+        station_ids: Filtre optionnel sur les stations (élagage des partitions)
+        columns: Colonnes à charger (toutes si None)
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(output_dir, format="parquet", partitioning="hive",
+                         exclude_invalid_files=True)
+    filter_expr = None
+    if station_ids:
+        filter_expr = ds.field("station_id").isin(list(station_ids))
+    table = dataset.to_table(columns=columns, filter=filter_expr)
+    return table.to_pandas()
+
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export Parquet partitionné de weather_data")
+    parser.add_argument("--output", default=DEFAULT_EXPORT_DIR, help="Dossier d'export")
+    parser.add_argument("--stations", nargs="*", default=None, help="Stations à exporter")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None, help="Date de début (ISO)")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None, help="Date de fin exclue (ISO)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Taille des batchs MongoDB")
+    parser.add_argument("--full", action="store_true", help="Réécrit toutes les partitions rencontrées")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from src.connectors.mongo_connector import MongoConnector
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv("config/.env")
+    args = parse_args()
+
+    mongo = MongoConnector()
+    mongo.connect()
+    exporter = ParquetExporter(
+        mongo.db[MongoConnector.COLLECTION_NAME],
+        output_dir=args.output,
+        batch_size=args.batch_size
+    )
+    exporter.export(
+        station_ids=args.stations,
+        start=args.start,
+        end=args.end,
+        incremental=not args.full
+    )
+    mongo.close()
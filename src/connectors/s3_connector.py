@@ -1,25 +1,37 @@
-import boto3
 import os
 import logging
-from botocore.exceptions import NoCredentialsError, ClientError
+
+from src.monitoring import metrics
 
 
 logger = logging.getLogger(__name__)
 
 class S3Connector:
     def __init__(self):
+        # boto3 (~0.3s d'import) n'est chargé qu'à la création du connecteur
+        import boto3
+
         # Récupération des identifiants depuis le fichier .env
         self.bucket_name = os.getenv("S3_BUCKET_NAME")
+        self.last_versions = {}
         self.s3_client = boto3.client(
             "s3",
             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
             region_name=os.getenv("AWS_REGION", "eu-west-3")
         )
-    def download_files(self, local_dir: str = "data/raw"):
+    def download_files(self, local_dir: str = "data/raw", skip=None):
         """
         Télécharge tous les fichiers du bucket S3 vers un dossier local.
+
+        Args:
+            skip: Fonction (filename, etag) -> bool : objets à ne pas télécharger
+                  (déjà chargés par une exécution interrompue)
+
+        L'ETag de chaque fichier téléchargé est conservé dans self.last_versions.
         """
+        from botocore.exceptions import NoCredentialsError, ClientError
+
         if not os.path.exists(local_dir):
             os.makedirs(local_dir)
         
@@ -44,10 +56,18 @@ class S3Connector:
                 # On conserve juste le nom du fichier pour le stockage local
                 filename = os.path.basename(file_key)
                 local_path = os.path.join(local_dir, filename)
+                etag = obj.get("ETag", "").strip('"')
+
+                if skip is not None and skip(filename, etag):
+                    logger.info(f"Déjà chargé lors de l'exécution interrompue : {file_key} (ignoré)")
+                    continue
 
                 logger.info(f"Téléchargement de {file_key} vers {local_path}")
                 self.s3_client.download_file(self.bucket_name, file_key, local_path)
                 download_files.append(filename)
+                self.last_versions[filename] = etag
+                metrics.inc("etl_files_downloaded_total")
+                metrics.inc("etl_bytes_downloaded_total", obj.get("Size", 0))
 
             logger.info(f"Succès : {len(download_files)} fichiers telechargés depuis S3 vers {local_dir}")
             return download_files
@@ -58,4 +78,36 @@ class S3Connector:
     
         except ClientError as e:
             logger.error(f"Erreur AWS S3 : {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def list_objects(self, prefix: str = "") -> list:
+        """
+        Liste tous les objets du bucket (pagination incluse, dossiers ignorés).
+
+        Returns:
+            list: dicts {key, etag, size, last_modified}
+        """
+        objects = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith("/"):
+                    continue
+                objects.append({
+                    "key": obj["Key"],
+                    "etag": obj.get("ETag", "").strip('"'),
+                    "size": obj.get("Size", 0),
+                    "last_modified": obj.get("LastModified")
+                })
+        return objects
+
+    def download_object(self, file_key: str, local_dir: str = "data/raw", size: int = 0) -> str:
+        """Télécharge un objet et retourne son chemin local."""
+        os.makedirs(local_dir, exist_ok=True)
+        local_path = os.path.join(local_dir, os.path.basename(file_key))
+
+        logger.info(f"Téléchargement de {file_key} vers {local_path}")
+        self.s3_client.download_file(self.bucket_name, file_key, local_path)
+        metrics.inc("etl_files_downloaded_total")
+        metrics.inc("etl_bytes_downloaded_total", size)
+        return local_path
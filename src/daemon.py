@@ -0,0 +1,264 @@
+"""
+Mode démon du pipeline ETL - Forecast 2.0
+
+Le processus reste chaud entre deux exécutions : les imports (pandas, pydantic,
+boto3), les modèles de validation et le client MongoDB (pool de connexions,
+index vérifiés une seule fois) sont réutilisés à chaque cycle.
+
+À chaque cycle :
+1. Liste les objets S3 (ou un dossier de dépôt local)
+2. Ne traite que les objets nouveaux ou modifiés (ETag / mtime+taille)
+3. Insère les documents fichier par fichier et mémorise l'état (data/daemon_state.json)
+
+Arrêt propre sur SIGTERM / SIGINT (le cycle en cours se termine).
+Sonde de santé : GET /healthz (et /metrics) sur DAEMON_HEALTH_PORT.
+
+Usage:
+    python -m src.main --daemon
+    python -m src.main --daemon --interval 300 --source local --drop-dir data/inbox
+"""
+
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+
+from src.processing.cleaner import TransformError, process_file
+from src.connectors.mongo_connector import MongoConnector
+from src.monitoring import metrics
+from src.monitoring.spans import SpanRecorder, set_recorder, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 3600
+DEFAULT_STATE_PATH = "data/daemon_state.json"
+DOWNLOAD_DIR = "data/downloaded"
+
+
+class PipelineDaemon:
+    """
+    Boucle de polling incrémental (S3 ou dossier local).
+    """
+
+    def __init__(self, interval: int = DEFAULT_INTERVAL, source: str = "s3",
+                 drop_dir: str = "data/inbox", state_path: str = DEFAULT_STATE_PATH,
+                 health_port: int = None, mongo: MongoConnector = None, s3=None):
+        self.interval = interval
+        self.source = source
+        self.drop_dir = drop_dir
+        self.state_path = state_path
+        self.health_port = health_port
+        self.mongo = mongo
+        self.s3 = s3
+        self.stop_event = threading.Event()
+        self.state = self._load_state()
+        self.cycles = 0
+        self.last_success = None
+        self.last_error = None
+
+    # ─────────────────────────────────────────────────────────────
+    # ÉTAT (objets déjà traités)
+    # ─────────────────────────────────────────────────────────────
+
+    def _load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    # ─────────────────────────────────────────────────────────────
+    # SOURCES
+    # ─────────────────────────────────────────────────────────────
+
+    def list_new_objects(self) -> list:
+        """
+        Retourne les objets nouveaux ou modifiés depuis le dernier traitement.
+
+        Returns:
+            list: dicts {key, version, size}
+        """
+        if self.source == "local":
+            objects = []
+            if os.path.isdir(self.drop_dir):
+                for filename in sorted(os.listdir(self.drop_dir)):
+                    path = os.path.join(self.drop_dir, filename)
+                    if not os.path.isfile(path) or not filename.endswith(".jsonl"):
+                        continue
+                    stat = os.stat(path)
+                    objects.append({"key": path, "version": f"{stat.st_mtime_ns}:{stat.st_size}",
+                                    "size": stat.st_size})
+        else:
+            if self.s3 is None:
+                from src.connectors.s3_connector import S3Connector
+                self.s3 = S3Connector()
+            objects = [{"key": obj["key"], "version": obj["etag"], "size": obj["size"]}
+                       for obj in self.s3.list_objects()]
+
+        return [obj for obj in objects if self.state.get(obj["key"]) != obj["version"]]
+
+    def _fetch(self, obj: dict) -> str:
+        """Chemin local de l'objet (téléchargé si source S3)."""
+        if self.source == "local":
+            return obj["key"]
+        return self.s3.download_object(obj["key"], local_dir=DOWNLOAD_DIR, size=obj["size"])
+
+    def _get_mongo(self) -> MongoConnector:
+        """Connexion MongoDB ouverte au premier cycle puis réutilisée."""
+        if self.mongo is None:
+            self.mongo = MongoConnector()
+        if self.mongo.db is None:
+            self.mongo.connect()
+        # Index vérifiés une seule fois (résultat mémorisé par le connecteur)
+        self.mongo.init_db()
+        return self.mongo
+
+    # ─────────────────────────────────────────────────────────────
+    # CYCLE
+    # ─────────────────────────────────────────────────────────────
+
+    def poll_once(self) -> dict:
+        """
+        Traite les objets nouveaux : transformation puis insertion fichier par fichier.
+
+        Returns:
+            dict: Statistiques du cycle (files, documents, inserted, failed)
+
+        Un objet n'est marqué traité qu'après une transformation et une insertion
+        complètes : un fichier illisible est ignoré pour ce cycle (réessayé au suivant),
+        une erreur d'insertion interrompt le cycle.
+        """
+        recorder = SpanRecorder()
+        set_recorder(recorder)
+        result = {"files": 0, "documents": 0, "inserted": 0, "failed": 0}
+
+        new_objects = self.list_new_objects()
+        if not new_objects:
+            logger.info("Aucun nouvel objet à traiter.")
+            return result
+
+        logger.info(f"🔄 {len(new_objects)} nouvel(s) objet(s) à traiter")
+        mongo = self._get_mongo()
+
+        for obj in new_objects:
+            if self.stop_event.is_set():
+                logger.info("Arrêt demandé -> fin du cycle après le fichier en cours.")
+                break
+
+            filename = os.path.basename(obj["key"])
+            with span("extract.download", file=filename):
+                local_path = self._fetch(obj)
+
+            try:
+                with span("transform.file", file=filename) as s:
+                    documents = process_file(os.path.abspath(local_path), filename, strict=True)
+                    s["rows"] = len(documents)
+            except TransformError as e:
+                result["failed"] += 1
+                logger.error(f"   -> {filename} non transformé, nouvel essai au prochain cycle : {e}")
+                continue
+
+            to_insert = documents
+            if documents and os.getenv("MONGO_DEDUP", "true").lower() != "false":
+                with span("load.dedup", file=filename):
+                    to_insert, _ = mongo.filter_new_documents(documents)
+
+            with span("load.insert", file=filename) as s:
+                inserted = mongo.insert_documents(to_insert)
+                s["rows"] = inserted
+
+            # L'objet n'est marqué traité qu'après l'insertion complète (sinon exception)
+            self.state[obj["key"]] = obj["version"]
+            self._save_state()
+
+            result["files"] += 1
+            result["documents"] += len(documents)
+            result["inserted"] += inserted
+            logger.info(f"   -> {filename} : {len(documents)} documents, {inserted} insérés")
+
+        recorder.log_summary()
+        return result
+
+    def run(self):
+        """Boucle principale jusqu'à SIGTERM / SIGINT."""
+        self._install_signal_handlers()
+        server = None
+        if self.health_port:
+            server = metrics.start_http_server(self.health_port, health_check=self.health)
+
+        logger.info(f"Démon démarré (source={self.source}, intervalle={self.interval}s)")
+        try:
+            while not self.stop_event.is_set():
+                cycle_start = time.time()
+                try:
+                    result = self.poll_once()
+                    self.last_success = datetime.now()
+                    self.last_error = None
+                    metrics.set_gauge("etl_last_run_success", 1)
+                    logger.info(f"Cycle {self.cycles + 1} terminé : {result}")
+                except Exception as e:
+                    self.last_error = str(e)
+                    metrics.set_gauge("etl_last_run_success", 0)
+                    logger.error(f"❌ Erreur cycle démon : {e}", exc_info=True)
+                finally:
+                    self.cycles += 1
+                    metrics.set_gauge("etl_last_run_timestamp_seconds", time.time())
+                    metrics.set_gauge("etl_last_run_duration_seconds", round(time.time() - cycle_start, 3))
+
+                self.stop_event.wait(self.interval)
+        finally:
+            if server is not None:
+                server.shutdown()
+            if self.mongo is not None:
+                self.mongo.close()
+            logger.info("Démon arrêté proprement.")
+
+    def stop(self, *_):
+        """Demande l'arrêt (gestionnaire de signal)."""
+        logger.info("Signal d'arrêt reçu.")
+        self.stop_event.set()
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+    def health(self) -> tuple:
+        """
+        Sonde de santé : sain si le dernier cycle a réussi et date de moins
+        de 3 intervalles (ou si le premier cycle n'est pas encore terminé).
+        """
+        details = {
+            "cycles": self.cycles,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "stopping": self.stop_event.is_set()
+        }
+        if self.last_error:
+            return False, details
+        if self.last_success is None:
+            return True, details
+        age = (datetime.now() - self.last_success).total_seconds()
+        return age < 3 * self.interval + 60, details
+
+
+def run_daemon(interval: int = None, source: str = None, drop_dir: str = None):
+    """Construit le démon depuis les arguments / variables d'environnement et le lance."""
+    health_port = os.getenv("DAEMON_HEALTH_PORT", "8080")
+    daemon = PipelineDaemon(
+        interval=interval or int(os.getenv("DAEMON_INTERVAL", str(DEFAULT_INTERVAL))),
+        source=source or os.getenv("DAEMON_SOURCE", "s3"),
+        drop_dir=drop_dir or os.getenv("DAEMON_DROP_DIR", "data/inbox"),
+        state_path=os.getenv("DAEMON_STATE_PATH", DEFAULT_STATE_PATH),
+        health_port=int(health_port) if health_port else None
+    )
+    daemon.run()
@@ -10,40 +10,49 @@ Ce script orchestre le pipeline complet :
 
 import os
 import sys
+import argparse
 import logging
-from dotenv import load_dotenv
+import time
+
+# Modules internes légers uniquement : pandas, boto3, pymongo et pydantic
+# sont importés dans l'étape qui en a besoin (démarrage à froid Fargate)
+from src.monitoring import metrics
+from src.monitoring.spans import SpanRecorder, set_recorder, span
+
+logger = logging.getLogger(__name__)
 
-# Import des modules internes
-from src.connectors.s3_connector import S3Connector
-from src.processing.cleaner import process_file
-from src.connectors.mongo_connector import MongoConnector
 
 # =============================================================================
-# CONFIGURATION DU LOGGING
+# CONFIGURATION DU LOGGING ET DE L'ENVIRONNEMENT
 # =============================================================================
 
-if not os.path.exists("logs"):
-    os.makedirs("logs")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/pipeline.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-logger = logging.getLogger(__name__)
+def configure(log_dir: str = "logs", env_file: str = "config/.env"):
+    """
+    Configure le logging (console + logs/pipeline.log) et charge le .env.
+    Appelée par le point d'entrée, pas à l'import du module.
+    """
+    from dotenv import load_dotenv
+
+    os.makedirs(log_dir, exist_ok=True)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(log_dir, "pipeline.log")),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
 
-# Chargement des variables d'environnement
-loaded = load_dotenv("config/.env")
+    # Chargement des variables d'environnement
+    return load_dotenv(env_file)
 
 
 # =============================================================================
 # PIPELINE PRINCIPAL
 # =============================================================================
 
-def run_pipeline():
+def run_pipeline(profile: bool = False):
     """
     Fonction principale qui orchestre le pipeline ETL.
     
@@ -51,7 +60,16 @@ def run_pipeline():
         1. Extraction : Téléchargement des fichiers depuis S3
         2. Transformation : Nettoyage, conversion, validation
         3. Chargement : Insertion dans MongoDB (collection unifiée)
+
+    Args:
+        profile: Si True, profil cProfile/pyinstrument par étape (logs/profiles)
     """
+    # Chronométrage par étape (rapport JSON en fin d'exécution)
+    recorder = SpanRecorder(profile=profile)
+    set_recorder(recorder)
+    report = {"status": "running"}
+    started = time.time()
+
     logger.info("=" * 60)
     logger.info("-- Début du pipeline du projet Forecast 2.0. --")
     logger.info("=" * 60)
@@ -63,19 +81,43 @@ def run_pipeline():
         logger.error("ERREUR CRITIQUE : S3_BUCKET_NAME manquant dans le .env")
         sys.exit(1)
 
+    checkpoints = None
+    mongo = None
+
     try:
+        # ─────────────────────────────────────────────────────────────
+        # POINT DE REPRISE (exécution interrompue)
+        # ─────────────────────────────────────────────────────────────
+        if os.getenv("PIPELINE_CHECKPOINTS", "true").lower() != "false":
+            with span("checkpoint.resume"):
+                from src.connectors.checkpoint import CheckpointStore, DEFAULT_CHECKPOINT_PATH, RUNS_COLLECTION
+                from src.connectors.mongo_connector import MongoConnector
+
+                # Connexion ouverte dès le départ : etl_runs indique ce qui est déjà chargé
+                mongo = MongoConnector()
+                mongo.connect()
+                checkpoints = CheckpointStore(os.getenv("CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH),
+                                              mongo.db[RUNS_COLLECTION])
+                report["run_id"] = checkpoints.start_run()
+
         # ─────────────────────────────────────────────────────────────
         # ÉTAPE 1 : EXTRACTION (S3 → Local)
         # ─────────────────────────────────────────────────────────────
         logger.info("")
         logger.info("[Étape 1/3] : EXTRACTION - Connexion à S3...")
         
-        s3 = S3Connector()
         DOWNLOAD_DIR = "data/downloaded"
-        files = s3.download_files(local_dir=DOWNLOAD_DIR)
+        with span("extract.download") as s:
+            from src.connectors.s3_connector import S3Connector
+            s3 = S3Connector()
+            files = s3.download_files(local_dir=DOWNLOAD_DIR,
+                                      skip=checkpoints.is_committed if checkpoints else None)
+            s["rows"] = len(files)
 
         if not files:
-            logger.warning("Aucun fichier trouvé sur S3 -> Arrêt du pipeline.")
+            logger.warning("Aucun fichier à traiter sur S3 -> Arrêt du pipeline.")
+            if checkpoints:
+                checkpoints.finish("success")
             return
 
         logger.info(f"✅ {len(files)} fichier(s) téléchargé(s) depuis S3")
@@ -86,15 +128,26 @@ def run_pipeline():
         logger.info("")
         logger.info("[Étape 2/3] : TRANSFORMATION - Nettoyage et validation...")
 
+        from src.connectors.bson_batches import EncodedBatch
+        from src.processing.measurement_batch import MeasurementBatch
+        from src.processing.cleaner import TransformError, process_file
+        from src.processing.staging_cache import get_staging_cache
+        from src.connectors.checkpoint import file_fingerprint, load_with_checkpoints
+
         # Liste unifiée de tous les documents
         all_documents = []
+        # Lots compacts (MeasurementBatch) ou encodés en BSON par les processus fils (EncodedBatch)
+        record_batches = []
+        # Documents par fichier (chargement avec points de reprise)
+        file_loads = []
         
         # Compteurs pour le reporting
         stats = {
             "files_processed": 0,
             "measurements": 0,
             "station_references": 0,
-            "rejected": 0
+            "rejected": 0,
+            "failed": 0
         }
 
         for file_path in files:
@@ -111,11 +164,40 @@ def run_pipeline():
                 continue
 
             logger.info(f"📄 Traitement : {filename}")
+
+            version = None
+            if checkpoints:
+                version = s3.last_versions.get(filename) or file_fingerprint(full_path)
+                if checkpoints.is_committed(filename, version):
+                    logger.info("   -> Déjà chargé lors de l'exécution interrompue (ignoré)")
+                    continue
             
             # Transformation (retourne une liste de documents unifiés)
-            documents = process_file(full_path, filename)
+            with span("transform.file", file=filename) as s:
+                # Avec points de reprise, un fichier illisible est marqué en échec (TransformError)
+                # au lieu d'être validé avec 0 document : il est retenté à l'exécution suivante
+                try:
+                    documents = process_file(full_path, filename, strict=checkpoints is not None)
+                except TransformError as e:
+                    checkpoints.mark_failed(filename, version, str(e))
+                    stats["failed"] += 1
+                    logger.warning(f"   -> Fichier en échec, ignoré (retenté à la prochaine exécution)")
+                    continue
+                s["rows"] = len(documents)
+
+            if checkpoints:
+                checkpoints.mark_transformed(filename, version, len(documents))
+                file_loads.append((filename, version, documents))
 
-            if documents:
+            if isinstance(documents, (EncodedBatch, MeasurementBatch)) and documents:
+                counts = documents.count_by_type()
+                stats["measurements"] += counts.get('measurement', 0)
+                stats["station_references"] += counts.get('station_reference', 0)
+                record_batches.append(documents)
+                stats["files_processed"] += 1
+                logger.info(f"   -> {len(documents)} documents extraits "
+                            f"({documents.nbytes / 1024 / 1024:.1f} Mo en mémoire)")
+            elif documents:
                 # Comptage par type
                 for doc in documents:
                     if doc.get('record_type') == 'measurement':
@@ -130,16 +212,29 @@ def run_pipeline():
                 logger.warning(f"   -> Aucun document extrait")
 
         # Résumé de la transformation
-        total_documents = len(all_documents)
+        total_documents = len(all_documents) + sum(len(batch) for batch in record_batches)
         logger.info("")
         logger.info(f"📊 Résumé transformation :")
         logger.info(f"   - Fichiers traités : {stats['files_processed']}")
         logger.info(f"   - Mesures météo    : {stats['measurements']}")
         logger.info(f"   - Stations réf.    : {stats['station_references']}")
         logger.info(f"   - Total documents  : {total_documents}")
+        if stats["failed"]:
+            logger.warning(f"   - Fichiers en échec : {stats['failed']}")
+
+        cache = get_staging_cache()
+        if cache:
+            cache_stats = cache.report()
+            logger.info(f"   - Cache staging    : {cache_stats['hits']} hit(s) / "
+                        f"{cache_stats['misses']} miss(es) ({cache_stats['hit_rate']:.0f}%), "
+                        f"{cache_stats['evictions']} éviction(s), {cache_stats['size_mb']:.1f} Mo")
 
         if total_documents == 0:
             logger.warning("Aucun document à insérer -> Arrêt du pipeline.")
+            if checkpoints:
+                for filename, version, _ in file_loads:
+                    checkpoints.commit_file(filename, version)
+                checkpoints.finish("success")
             return
 
         # ─────────────────────────────────────────────────────────────
@@ -148,12 +243,60 @@ def run_pipeline():
         logger.info("")
         logger.info("[Étape 3/3] : CHARGEMENT - Insertion dans MongoDB...")
 
-        mongo = MongoConnector()
-        mongo.connect()
-        mongo.init_db()
+        with span("load.connect"):
+            from src.connectors.mongo_connector import MongoConnector
+            if mongo is None:
+                mongo = MongoConnector()
+                mongo.connect()
+            mongo.init_db()
+
+        dedup = os.getenv("MONGO_DEDUP", "true").lower() != "false"
+
+        if checkpoints:
+            # Fichier par fichier, tranche par tranche : reprise après la dernière tranche validée
+            inserted_count = 0
+            dedup_stats = {"checked": 0, "existing": 0, "skipped": 0, "bytes_saved": 0}
+            with span("load.insert") as s:
+                for filename, version, documents in file_loads:
+                    result = load_with_checkpoints(mongo, checkpoints, filename, version, documents, dedup=dedup)
+                    inserted_count += result["inserted"]
+                    for key in dedup_stats:
+                        dedup_stats[key] += result[key]
+                s["rows"] = inserted_count
+            if dedup:
+                report["dedup"] = dedup_stats
+
+        # Retrait des mesures déjà présentes (évite l'envoi de doublons au serveur)
+        elif dedup:
+            with span("load.dedup") as s:
+                all_documents, dedup_stats = mongo.filter_new_documents(all_documents)
+                for i, batch in enumerate(record_batches):
+                    record_batches[i], batch_stats = mongo.filter_new_documents(batch)
+                    for key, value in batch_stats.items():
+                        dedup_stats[key] += value
+                s["rows"] = dedup_stats["checked"]
+            report["dedup"] = dedup_stats
 
         # Insertion dans la collection unifiée
-        inserted_count = mongo.insert_documents(all_documents)
+        if not checkpoints:
+            with span("load.insert") as s:
+                inserted_count = mongo.insert_documents(all_documents) if all_documents or not record_batches else 0
+                for batch in record_batches:
+                    inserted_count += mongo.insert_documents(batch)
+                s["rows"] = inserted_count
+
+        # Variables de prévision : seule la fin des séries des stations chargées est recalculée
+        # (une erreur ici n'invalide pas le chargement : rafraîchissement repris au prochain run)
+        if os.getenv("FEATURES_REFRESH_ON_LOAD", "false").lower() == "true":
+            with span("features.refresh") as s:
+                from src.connectors.feature_store import FeatureStore
+                try:
+                    report["features"] = FeatureStore.from_env(mongo.db[mongo.COLLECTION_NAME]).refresh()
+                    s["rows"] = report["features"]["written"]
+                except Exception as e:
+                    logger.warning(f"⚠️ Rafraîchissement des variables impossible (chargement conservé) : {e}",
+                                   exc_info=True)
+                    report["features"] = {"error": str(e)}
         
         # Statistiques finales
         final_stats = mongo.get_stats()
@@ -164,8 +307,8 @@ def run_pipeline():
         logger.info(f"   - Mesures météo        : {final_stats['measurements']}")
         logger.info(f"   - Stations référence   : {final_stats['station_references']}")
 
-        # Fermeture de la connexion
-        mongo.close()
+        if checkpoints:
+            checkpoints.finish("success")
         
         # ─────────────────────────────────────────────────────────────
         # SUCCÈS
@@ -176,17 +319,64 @@ def run_pipeline():
         logger.info("=" * 60)
         
         # Calcul du taux de réussite
-        success_rate = (inserted_count / total_documents * 100) if total_documents > 0 else 0
+        # (les mesures déjà présentes, retirées avant insertion, comptent comme chargées)
+        skipped = report.get("dedup", {}).get("skipped", 0)
+        success_rate = ((inserted_count + skipped) / total_documents * 100) if total_documents > 0 else 0
         logger.info(f"Taux de réussite : {success_rate:.1f}%")
+        report.update(status="success", stats=stats, inserted=inserted_count)
 
     except Exception as e:
         logger.error(f"❌ Erreur Pipeline : {e}", exc_info=True)
+        report.update(status="failed", error=str(e))
+        if checkpoints and checkpoints.state:
+            # Prochaine exécution : reprise de ce run_id après la dernière tranche validée
+            checkpoints.finish("failed")
         sys.exit(1)
 
+    finally:
+        # Fermeture de la connexion (y compris après une erreur)
+        if mongo is not None:
+            mongo.close()
+
+        if report["status"] == "running":
+            report["status"] = "stopped"
+        recorder.log_summary()
+        recorder.write_report(extra=report)
+
+        # Métriques Prometheus (textfile collector)
+        metrics.set_gauge("etl_last_run_timestamp_seconds", time.time())
+        metrics.set_gauge("etl_last_run_duration_seconds", round(time.time() - started, 3))
+        metrics.set_gauge("etl_last_run_success", 0 if report["status"] == "failed" else 1)
+        try:
+            metrics.write_textfile()
+        except OSError as e:
+            logger.warning(f"Écriture des métriques impossible : {e}")
+
 
 # =============================================================================
 # POINT D'ENTRÉE
 # =============================================================================
 
+def main(argv=None):
+    """Point d'entrée en ligne de commande."""
+    parser = argparse.ArgumentParser(description="Pipeline ETL Forecast 2.0")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profil cProfile (ou pyinstrument si PROFILER=pyinstrument) par étape")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Mode démon : polling incrémental (voir src/daemon.py)")
+    parser.add_argument("--interval", type=int, help="Intervalle de polling en secondes (mode démon)")
+    parser.add_argument("--source", choices=["s3", "local"], help="Source du mode démon")
+    parser.add_argument("--drop-dir", help="Dossier de dépôt (mode démon, source local)")
+    args = parser.parse_args(argv)
+
+    configure()
+
+    if args.daemon or os.getenv("PIPELINE_MODE", "oneshot").lower() == "daemon":
+        from src.daemon import run_daemon
+        run_daemon(interval=args.interval, source=args.source, drop_dir=args.drop_dir)
+    else:
+        run_pipeline(profile=args.profile or os.getenv("PIPELINE_PROFILE", "false").lower() == "true")
+
+
 if __name__ == "__main__":
-    run_pipeline()
+    main()
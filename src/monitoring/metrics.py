@@ -0,0 +1,303 @@
+"""
+Métriques du pipeline au format texte Prometheus.
+
+Compteurs, jauges et histogrammes en mémoire, exposés :
+- via un fichier texte (textfile collector de node_exporter) en fin d'exécution batch
+- via un endpoint HTTP local optionnel (/metrics) pour le mode longue durée
+
+Aucune dépendance externe : le format d'exposition texte est généré ici.
+
+Usage:
+    from src.monitoring import metrics
+
+    metrics.inc("etl_rows_parsed_total", len(df), source="weather_underground")
+    metrics.observe("etl_insert_batch_seconds", elapsed)
+    metrics.write_textfile("logs/metrics.prom")
+"""
+
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bornes par défaut des histogrammes de latence (secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# =============================================================================
+# TYPES DE MÉTRIQUES
+# =============================================================================
+
+class Metric:
+    """Métrique étiquetée (une série par combinaison de labels)."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str = ""):
+        self.name = name
+        self.help = help_text
+        self.series = {}
+
+    @staticmethod
+    def _key(labels: dict) -> tuple:
+        return tuple(sorted(labels.items()))
+
+    def render(self) -> list:
+        lines = []
+        if self.help:
+            lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for key in sorted(self.series):
+            lines.extend(self._render_series(key, self.series[key]))
+        return lines
+
+    def _render_series(self, key: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError(f"Un compteur ne peut pas décroître ({self.name})")
+        key = self._key(labels)
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self.series.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.series[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self.series.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str = "", buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self.series.get(key)
+        if state is None:
+            state = self.series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["counts"][i] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+    def _render_series(self, key: tuple, state: dict) -> list:
+        lines = []
+        for bound, count in zip(self.buckets, state["counts"]):
+            labels = _format_labels(key + (("le", _format_value(float(bound))),))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(key + (("le", "+Inf"),))
+        lines.append(f"{self.name}_bucket{labels} {state['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(key)} {state['count']}")
+        return lines
+
+
+# =============================================================================
+# REGISTRE
+# =============================================================================
+
+class MetricsRegistry:
+    """Ensemble des métriques d'un processus, rendu au format texte Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text or METRIC_HELP.get(name, ""), **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Métrique '{name}' déjà déclarée comme {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = "") -> Gauge:
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str = "", buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        with self._lock:
+            self.counter(name).inc(amount, **labels)
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauge(name).set(value, **labels)
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            self.histogram(name).observe(value, **labels)
+
+    def render(self) -> str:
+        """Exposition texte Prometheus (version 0.0.4)."""
+        with self._lock:
+            lines = []
+            for name in sorted(self._metrics):
+                lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> str:
+        """Écrit l'exposition dans un fichier (écriture atomique pour le textfile collector)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        logger.info(f"Métriques écrites : {path}")
+        return path
+
+    def counter_values(self) -> dict:
+        """Valeurs des compteurs {nom: {labels: valeur}} (transmissibles entre processus)."""
+        with self._lock:
+            return {name: dict(metric.series) for name, metric in self._metrics.items()
+                    if isinstance(metric, Counter)}
+
+    def merge_counters(self, values: dict):
+        """Ajoute les compteurs d'un autre processus (voir counter_values)."""
+        with self._lock:
+            for name, series in values.items():
+                counter = self.counter(name)
+                for key, amount in series.items():
+                    counter.series[key] = counter.series.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+# Descriptions des métriques instrumentées dans le pipeline
+METRIC_HELP = {
+    "etl_files_downloaded_total": "Fichiers téléchargés depuis S3",
+    "etl_bytes_downloaded_total": "Octets téléchargés depuis S3",
+    "etl_rows_parsed_total": "Lignes brutes lues par source",
+    "etl_rows_validated_total": "Documents soumis à la validation Pydantic",
+    "etl_rows_rejected_total": "Documents rejetés par la validation",
+    "etl_rejections_by_rule_total": "Erreurs de validation par champ et règle",
+    "etl_documents_inserted_total": "Documents insérés dans MongoDB",
+    "etl_documents_duplicates_total": "Doublons ignorés à l'insertion",
+    "etl_documents_skipped_total": "Mesures déjà présentes retirées avant insertion",
+    "etl_dedup_bytes_saved_total": "Octets BSON non envoyés grâce à la déduplication",
+    "etl_change_stream_documents_total": "Documents traités par le consommateur de change stream",
+    "etl_insert_errors_total": "Batchs d'insertion en erreur",
+    "etl_insert_batch_seconds": "Latence d'insertion par batch",
+    "etl_insert_batch_size": "Taille de batch choisie par le contrôleur d'écriture",
+    "etl_insert_inflight_batches": "Batchs d'insertion en vol autorisés",
+    "etl_last_run_timestamp_seconds": "Horodatage de fin de la dernière exécution",
+    "etl_last_run_success": "1 si la dernière exécution a réussi",
+    "etl_last_run_duration_seconds": "Durée de la dernière exécution",
+}
+
+
+# =============================================================================
+# ENDPOINT HTTP (MODE LONGUE DURÉE)
+# =============================================================================
+
+def start_http_server(port: int, host: str = "0.0.0.0", registry: "MetricsRegistry" = None,
+                      health_check=None):
+    """
+    Démarre un serveur /metrics dans un thread démon.
+
+    Args:
+        health_check: Fonction optionnelle () -> (bool, dict) servie sur /healthz
+                      (200 si sain, 503 sinon, corps JSON)
+
+    Returns:
+        ThreadingHTTPServer: serveur démarré (server.shutdown() pour l'arrêter)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or _registry
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/healthz" and health_check is not None:
+                healthy, details = health_check()
+                self._reply(200 if healthy else 503, "application/json",
+                            json.dumps(details, default=str).encode("utf-8"))
+            elif path == "/metrics":
+                self._reply(200, "text/plain; version=0.0.4; charset=utf-8",
+                            registry.render().encode("utf-8"))
+            else:
+                self.send_error(404)
+
+        def _reply(self, status: int, content_type: str, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Endpoint métriques : http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+# =============================================================================
+# REGISTRE DU PROCESSUS
+# =============================================================================
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def inc(name: str, amount: float = 1, **labels):
+    _registry.inc(name, amount, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    _registry.set(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    _registry.observe(name, value, **labels)
+
+
+def write_textfile(path: str = None) -> str:
+    """Écrit les métriques dans METRICS_TEXTFILE (défaut : logs/metrics.prom)."""
+    return _registry.write_textfile(path or os.getenv("METRICS_TEXTFILE", "logs/metrics.prom"))
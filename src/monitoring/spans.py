@@ -0,0 +1,213 @@
+"""
+Instrumentation légère du pipeline : spans de chronométrage.
+
+Chaque span (context manager) mesure :
+- le temps écoulé (wall) et le temps CPU du processus
+- le nombre de lignes traitées (renseigné par l'appelant)
+- le pic de mémoire résidente (RSS) du processus à la fin du span
+
+Les spans de premier niveau peuvent être profilés (cProfile, ou pyinstrument
+si installé et PROFILER=pyinstrument) : un fichier par étape dans logs/profiles.
+
+Usage:
+    from src.monitoring.spans import span
+
+    with span("transform.load", file=filename) as s:
+        df = load_airbyte_jsonl(path)
+        s["rows"] = len(df)
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus (Mo), None si indisponible."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Ko, macOS : octets
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class SpanRecorder:
+    """
+    Enregistre les spans d'une exécution du pipeline.
+    """
+
+    def __init__(self, profile: bool = False, profile_dir: str = "logs/profiles"):
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.started_at = datetime.now()
+        self.profile = profile
+        self.profile_dir = os.path.join(profile_dir, self.run_id)
+        self.spans = []
+        self._stack = []
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Mesure le bloc encadré ; le dict retourné accepte la clé 'rows'."""
+        record = {"name": name, "parent": self._stack[-1] if self._stack else None, "rows": None}
+        record.update(attrs)
+
+        profiler = self._start_profiler() if self.profile and not self._stack else None
+        self._stack.append(name)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall_start, 4)
+            record["cpu_s"] = round(time.process_time() - cpu_start, 4)
+            record["peak_rss_mb"] = peak_rss_mb()
+            self._stack.pop()
+            if profiler is not None:
+                record["profile"] = self._stop_profiler(profiler, name)
+            self.spans.append(record)
+            logger.debug(f"[span] {name} : {record['wall_s']:.3f}s (cpu {record['cpu_s']:.3f}s), "
+                         f"rows={record['rows']}")
+
+    def record(self, name: str, wall_s: float, rows: int = None, **attrs) -> dict:
+        """
+        Enregistre un span déjà mesuré (ex. batch exécuté dans un thread du pool),
+        rattaché au span ouvert. À appeler depuis le thread principal.
+        """
+        record = {"name": name, "parent": self._stack[-1] if self._stack else None, "rows": rows}
+        record.update(attrs)
+        # Temps CPU du processus non attribuable à un thread : non renseigné
+        record.update(wall_s=round(wall_s, 4), cpu_s=None, peak_rss_mb=peak_rss_mb())
+        self.spans.append(record)
+        return record
+
+    # ─────────────────────────────────────────────────────────────
+    # PROFILAGE PAR ÉTAPE
+    # ─────────────────────────────────────────────────────────────
+
+    def _start_profiler(self):
+        import cProfile
+
+        if os.getenv("PROFILER", "cprofile").lower() == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+                profiler = Profiler()
+                profiler.start()
+                return profiler
+            except ImportError:
+                logger.warning("pyinstrument absent -> profilage cProfile.")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, name: str) -> str:
+        import cProfile
+        import io
+        import pstats
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = os.path.join(self.profile_dir, f"{safe_name}.prof")
+            # Plusieurs spans de même nom : un fichier par occurrence
+            suffix = 1
+            while os.path.exists(path):
+                path = os.path.join(self.profile_dir, f"{safe_name}.{suffix}.prof")
+                suffix += 1
+            profiler.dump_stats(path)
+
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(25)
+            with open(path[:-5] + ".txt", "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+            return path
+
+        profiler.stop()
+        path = os.path.join(self.profile_dir, f"{safe_name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+        return path
+
+    # ─────────────────────────────────────────────────────────────
+    # RAPPORT
+    # ─────────────────────────────────────────────────────────────
+
+    def summary(self) -> dict:
+        """Agrégat par nom de span (occurrences, temps cumulés, lignes)."""
+        result = {}
+        for record in self.spans:
+            entry = result.setdefault(record["name"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0})
+            entry["count"] += 1
+            entry["wall_s"] = round(entry["wall_s"] + record["wall_s"], 4)
+            entry["cpu_s"] = round(entry["cpu_s"] + (record["cpu_s"] or 0.0), 4)
+            entry["rows"] += record["rows"] or 0
+        for entry in result.values():
+            entry["rows_per_s"] = round(entry["rows"] / entry["wall_s"], 1) if entry["wall_s"] else None
+        return result
+
+    def log_summary(self):
+        """Écrit le résumé des spans dans le log du pipeline."""
+        logger.info("⏱️  Temps par étape :")
+        for name, entry in self.summary().items():
+            rows = f", {entry['rows']} lignes" if entry["rows"] else ""
+            logger.info(f"   - {name:24} : {entry['wall_s']:8.3f}s (cpu {entry['cpu_s']:.3f}s, "
+                        f"x{entry['count']}{rows})")
+        logger.info(f"   - Pic mémoire (RSS)        : {peak_rss_mb() or 0:.0f} Mo")
+
+    def write_report(self, report_dir: str = "logs", extra: dict = None) -> str:
+        """Écrit le rapport JSON de l'exécution (logs/run_report_<run_id>.json)."""
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"run_report_{self.run_id}.json")
+        report = {
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "peak_rss_mb": peak_rss_mb(),
+            "summary": self.summary(),
+            "spans": self.spans,
+        }
+        if extra:
+            report.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        logger.info(f"Rapport d'exécution : {path}")
+        return path
+
+
+# =============================================================================
+# RECORDER COURANT
+# =============================================================================
+
+_recorder = SpanRecorder()
+
+
+def get_recorder() -> SpanRecorder:
+    return _recorder
+
+
+def set_recorder(recorder: SpanRecorder):
+    """Installe le recorder utilisé par span() (un par exécution du pipeline)."""
+    global _recorder
+    _recorder = recorder
+
+
+def span(name: str, **attrs):
+    """Ouvre un span sur le recorder courant."""
+    return _recorder.span(name, **attrs)
+
+
+def record_span(name: str, wall_s: float, rows: int = None, **attrs) -> dict:
+    """Enregistre un span mesuré ailleurs sur le recorder courant."""
+    return _recorder.record(name, wall_s, rows, **attrs)
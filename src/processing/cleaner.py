@@ -8,16 +8,49 @@ Collection unique : weather_data
 """
 
 import pandas as pd
+import contextvars
 import json
 import logging
-import re
+import os
 from datetime import datetime
 
+# Décodeurs JSON rapides (optionnels)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
 # Import du validateur Pydantic
 from src.processing.validator import validate_weather_data, validate_station_data
+from src.processing.staging_cache import get_staging_cache
+from src.processing.measurement_batch import MeasurementBatch
+from src.processing.value_parser import clean_value, clean_series
+from src.processing.timestamps import build_timestamps, resolve_observation_date, undated_filename
+from src.monitoring import metrics
+from src.monitoring.spans import span
 
 logger = logging.getLogger(__name__)
 
+
+class TransformError(Exception):
+    """Fichier non transformé : exception interceptée pendant la lecture ou la conversion."""
+
+
+# process_file(strict=True) : les erreurs interceptées sont relancées au lieu de donner []
+_strict_errors = contextvars.ContextVar("strict_transform_errors", default=False)
+
+
+def transform_failed(message: str, error: Exception):
+    """Journalise une erreur de transformation ; la relance (TransformError) en mode strict."""
+    logger.error(message)
+    if _strict_errors.get():
+        raise TransformError(message) from error
+
 # --- CONFIGURATION DES MÉTADONNÉES DES STATIONS WEATHER UNDERGROUND ---
 STATION_METADATA = {
     "station_la_madelaine_FR.jsonl": {
@@ -32,7 +65,8 @@ STATION_METADATA = {
             "elevation": 23
         },
         "hardware": "other",
-        "software": "EasyWeatherPro_V5.1.6"
+        "software": "EasyWeatherPro_V5.1.6",
+        "timezone": "Europe/Paris"
     },
     "station_ichtegem_BE.jsonl": {
         "station_id": "IICHTE19",
@@ -46,24 +80,99 @@ STATION_METADATA = {
             "elevation": 15
         },
         "hardware": "other",
-        "software": "EasyWeatherV1.6.6"
+        "software": "EasyWeatherV1.6.6",
+        "timezone": "Europe/Brussels"
     }
 }
 
 
-def clean_value(val):
+def station_metadata(filename: str) -> dict:
     """
-    Nettoie une valeur brute.
-    Extrait les nombres des chaînes (ex: "57.0 °F" → 57.0)
+    Métadonnées de la station d'un fichier : nom exact, ou nom sans sa date
+    (exports quotidiens 'station_la_madelaine_FR_2025-12-01.jsonl').
     """
-    if pd.isna(val) or val == "":
-        return None
-    if isinstance(val, (int, float)):
-        return float(val)
-    match = re.search(r"[-+]?\d*\.\d+|\d+", str(val))
-    if match:
-        return float(match.group())
-    return None
+    return STATION_METADATA.get(filename) or STATION_METADATA.get(undated_filename(filename), {})
+
+
+# --- DÉCODAGE JSONL (orjson / msgspec / json standard) ---
+
+# Taille des blocs lus en une fois (les lignes sont découpées sur '\n')
+JSONL_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def get_json_backend(name: str = None) -> tuple:
+    """
+    Sélectionne le décodeur JSON.
+    Ordre de préférence en mode "auto" : orjson > msgspec > json (stdlib).
+    Le choix peut être forcé via la variable JSON_BACKEND.
+
+    Returns:
+        tuple: (nom, fonction loads(bytes), décodeur de bloc ou None)
+    """
+    name = (name or os.getenv("JSON_BACKEND", "auto")).lower()
+
+    if name in ("auto", "orjson") and orjson is not None:
+        return "orjson", orjson.loads, None
+    if name in ("auto", "msgspec") and msgspec is not None:
+        decoder = msgspec.json.Decoder()
+        return "msgspec", decoder.decode, decoder.decode_lines
+    if name not in ("auto", "json"):
+        logger.warning(f"Décodeur JSON '{name}' indisponible, utilisation de json (stdlib).")
+    return "json", json.loads, None
+
+
+def iter_jsonl_blocks(file_path: str, block_size: int = JSONL_BLOCK_SIZE):
+    """
+    Lit un fichier JSONL par gros blocs binaires.
+    Chaque bloc retourné se termine sur une fin de ligne complète.
+    """
+    remainder = b""
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            cut = block.rfind(b"\n")
+            if cut == -1:
+                remainder += block
+                continue
+            yield remainder + block[:cut + 1]
+            remainder = block[cut + 1:]
+    if remainder.strip():
+        yield remainder
+
+
+def iter_jsonl_records(file_path: str, backend: str = None, skip_malformed: bool = True,
+                       block_size: int = JSONL_BLOCK_SIZE):
+    """
+    Itère sur les enregistrements d'un fichier JSONL.
+    Les lignes vides sont ignorées ; les lignes mal formées sont ignorées
+    si skip_malformed=True, sinon l'erreur (ValueError) est propagée.
+    """
+    _, loads, decode_lines = get_json_backend(backend)
+
+    for block in iter_jsonl_blocks(file_path, block_size):
+        yield from decode_jsonl_block(block, loads, decode_lines, skip_malformed)
+
+
+def decode_jsonl_block(block: bytes, loads, decode_lines=None, skip_malformed: bool = True):
+    """Décode un bloc de lignes JSONL complètes (voir get_json_backend)."""
+    # Décodage du bloc entier en un appel (msgspec), sinon ligne par ligne
+    if decode_lines is not None:
+        try:
+            yield from decode_lines(block)
+            return
+        except ValueError:
+            pass
+
+    for line in block.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            yield loads(line)
+        except ValueError:
+            if not skip_malformed:
+                raise
 
 
 def fahrenheit_to_celsius(f):
@@ -94,36 +203,98 @@ def load_airbyte_jsonl(file_path: str) -> pd.DataFrame:
     """
     data_list = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    record = json.loads(line)
-                    if '_airbyte_data' in record:
-                        data_list.append(record['_airbyte_data'])
-                except json.JSONDecodeError:
-                    continue
-        return pd.DataFrame(data_list)
+        # Cache de staging : fichier inchangé -> relecture Feather sans parsing JSON
+        cache = get_staging_cache()
+        cache_key = cache.key_for(file_path, "airbyte_data") if cache else None
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        for record in iter_jsonl_records(file_path):
+            if isinstance(record, dict) and '_airbyte_data' in record:
+                data_list.append(record['_airbyte_data'])
+        df = pd.DataFrame(data_list)
+
+        if cache_key:
+            cache.put(cache_key, df)
+        return df
     except Exception as e:
-        logger.error(f"Erreur lecture JSONL {file_path}: {e}")
+        transform_failed(f"Erreur lecture JSONL {file_path}: {e}", e)
         return pd.DataFrame()
 
 
-def transform_weather_data(file_path: str, filename: str) -> list:
+def transform_weather_data(file_path: str, filename: str, compact: bool = False):
     """
     Transforme les fichiers de mesures Weather Underground.
     Retourne une liste de documents prêts pour MongoDB (schéma unifié).
+
+    compact=True : construction et validation par tranches de COMPACT_CHUNK_ROWS lignes,
+    mesures valides rangées en colonnes (MeasurementBatch) au lieu de dictionnaires.
+
+    Les gros fichiers sont découpés en plages traitées en parallèle
+    (src.processing.parallel_ingest, seuil PARALLEL_SPLIT_MIN_MB).
     """
-    df = load_airbyte_jsonl(file_path)
+    from src.processing import parallel_ingest
+
+    meta = station_metadata(filename)
+    if meta and parallel_ingest.should_split(file_path):
+        return parallel_ingest.transform_weather_data_parallel(file_path, filename, meta, compact=compact)
+
+    with span("transform.load", file=filename) as s:
+        df = load_airbyte_jsonl(file_path)
+        s["rows"] = len(df)
+    metrics.inc("etl_rows_parsed_total", len(df), source="weather_underground")
     
     if df.empty:
         return []
 
-    meta = STATION_METADATA.get(filename, {})
-    
     if not meta:
         logger.warning(f"Pas de métadonnées trouvées pour {filename}")
         return []
 
+    with span("transform.convert", file=filename) as s:
+        s["rows"] = len(df)
+        df = convert_weather_frame(df, resolve_observation_date(file_path, filename, meta.get("timezone")))
+
+    chunk_rows = int(os.getenv("COMPACT_CHUNK_ROWS", "50000")) if compact else max(len(df), 1)
+    valid_parts = []
+    rejected_data = []
+    for start in range(0, len(df), chunk_rows):
+        part = df.iloc[start:start + chunk_rows]
+
+        # 5. Construction des documents au format unifié
+        with span("transform.build", file=filename) as s:
+            documents = _build_measurement_documents(part, meta)
+            s["rows"] = len(documents)
+
+        # 6. Validation Pydantic
+        with span("transform.validate", file=filename) as s:
+            valid, rejected = validate_weather_data(documents)
+            s["rows"] = len(documents)
+
+        rejected_data.extend(rejected)
+        valid_parts.append(MeasurementBatch.from_documents(valid) if compact else valid)
+
+    if compact:
+        valid_data = MeasurementBatch.concat(valid_parts)
+    else:
+        valid_data = [doc for part in valid_parts for doc in part]
+
+    if rejected_data:
+        logger.warning(f"Validation Météo : {len(rejected_data)} lignes rejetées dans {filename}.")
+        if len(rejected_data) > 0:
+            logger.warning(f"Exemple motif : {rejected_data[0].get('rejection_reason')}")
+
+    logger.info(f"Transformation {filename} : {len(valid_data)} documents valides.")
+    return valid_data
+
+
+def convert_weather_frame(df: pd.DataFrame, base_date) -> pd.DataFrame:
+    """
+    Conversions d'un DataFrame Weather Underground brut (colonnes '_airbyte_data') :
+    renommage, unités, timestamps (date d'observation base_date), lignes sans heure retirées.
+    """
     # 1. Mapping des colonnes brutes
     column_mapping = {
         'Time': 'time_str',
@@ -137,29 +308,28 @@ def transform_weather_data(file_path: str, filename: str) -> list:
         'Precip. Rate.': 'precip_rate',
         'Precip. Accum.': 'precip_accum'
     }
-    df.rename(columns=column_mapping, inplace=True)
+    df = df.rename(columns=column_mapping)
 
     # 2. Conversions d'unités
     if 'temp_raw' in df.columns:
-        df['temperature_celsius'] = df['temp_raw'].apply(clean_value).apply(fahrenheit_to_celsius)
+        df['temperature_celsius'] = clean_series(df['temp_raw'], fahrenheit_to_celsius)
     if 'wind_speed_raw' in df.columns:
-        df['wind_speed_kmh'] = df['wind_speed_raw'].apply(clean_value).apply(mph_to_kmh)
+        df['wind_speed_kmh'] = clean_series(df['wind_speed_raw'], mph_to_kmh)
     if 'humidity_percent' in df.columns:
-        df['humidity_percent'] = df['humidity_percent'].apply(clean_value)
+        df['humidity_percent'] = clean_series(df['humidity_percent'])
     if 'pressure_inHg' in df.columns:
-        df['pressure_hpa'] = df['pressure_inHg'].apply(clean_value).apply(inHg_to_hPa)
+        df['pressure_hpa'] = clean_series(df['pressure_inHg'], inHg_to_hPa)
 
-    # 3. Construction du timestamp
-    today_str = pd.Timestamp.now().strftime('%Y-%m-%d')
+    # 3. Construction du timestamp (date d'observation du fichier + heure du relevé)
     if 'time_str' in df.columns:
-        df['timestamp'] = pd.to_datetime(today_str + ' ' + df['time_str'].astype(str), errors='coerce')
-        # Ajout d'un offset pour différencier les relevés de même heure
-        df['timestamp'] = df['timestamp'] + pd.to_timedelta(df.index, unit='s')
+        df['timestamp'] = build_timestamps(df['time_str'], base_date)
 
     # 4. Filtrer les lignes sans timestamp
-    df = df.dropna(subset=['timestamp'])
+    return df.dropna(subset=['timestamp'])
+
 
-    # 5. Construction des documents au format unifié
+def _build_measurement_documents(df: pd.DataFrame, meta: dict) -> list:
+    """Construit les documents 'measurement' (schéma unifié) à partir du DataFrame converti."""
     documents = []
     for _, row in df.iterrows():
         doc = {
@@ -177,17 +347,35 @@ def transform_weather_data(file_path: str, filename: str) -> list:
             }
         }
         documents.append(doc)
+    return documents
 
-    # 6. Validation Pydantic
-    valid_data, rejected_data = validate_weather_data(documents)
-    
-    if rejected_data:
-        logger.warning(f"Validation Météo : {len(rejected_data)} lignes rejetées dans {filename}.")
-        if len(rejected_data) > 0:
-            logger.warning(f"Exemple motif : {rejected_data[0].get('rejection_reason')}")
 
-    logger.info(f"Transformation {filename} : {len(valid_data)} documents valides.")
-    return valid_data
+def load_infoclimat_rows(file_path: str) -> list:
+    """
+    Lit le fichier InfoClimat et retourne la liste brute des stations.
+    Utilise le cache de staging si le fichier n'a pas changé.
+    """
+    cache = get_staging_cache()
+    cache_key = cache.key_for(file_path, "infoclimat_rows") if cache else None
+    if cache_key:
+        cached = cache.get_records(cache_key)
+        if cached is not None:
+            return cached
+
+    data_rows = []
+    for record in iter_jsonl_records(file_path, skip_malformed=False):
+        airbyte_data = record.get('_airbyte_data', {})
+        
+        # Cas 1 : Structure liste 'stations'
+        if 'stations' in airbyte_data:
+            data_rows.extend(airbyte_data['stations'])
+        # Cas 2 : Structure directe
+        elif 'id' in airbyte_data and 'name' in airbyte_data:
+            data_rows.append(airbyte_data)
+
+    if cache_key and data_rows:
+        cache.put_records(cache_key, data_rows)
+    return data_rows
 
 
 def transform_infoclimat(file_path: str) -> list:
@@ -196,18 +384,10 @@ def transform_infoclimat(file_path: str) -> list:
     Retourne une liste de documents prêts pour MongoDB (schéma unifié).
     """
     try:
-        data_rows = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                record = json.loads(line)
-                airbyte_data = record.get('_airbyte_data', {})
-                
-                # Cas 1 : Structure liste 'stations'
-                if 'stations' in airbyte_data:
-                    data_rows.extend(airbyte_data['stations'])
-                # Cas 2 : Structure directe
-                elif 'id' in airbyte_data and 'name' in airbyte_data:
-                    data_rows.append(airbyte_data)
+        with span("transform.load", file=os.path.basename(file_path)) as s:
+            data_rows = load_infoclimat_rows(file_path)
+            s["rows"] = len(data_rows)
+        metrics.inc("etl_rows_parsed_total", len(data_rows), source="infoclimat")
         
         if not data_rows:
             return []
@@ -241,7 +421,9 @@ def transform_infoclimat(file_path: str) -> list:
             documents.append(doc)
         
         # Validation Pydantic
-        valid_data, rejected_data = validate_station_data(documents)
+        with span("transform.validate", file=os.path.basename(file_path)) as s:
+            valid_data, rejected_data = validate_station_data(documents)
+            s["rows"] = len(documents)
         
         if rejected_data:
             logger.warning(f"Validation Stations : {len(rejected_data)} lignes rejetées.")
@@ -250,20 +432,46 @@ def transform_infoclimat(file_path: str) -> list:
         return valid_data
 
     except Exception as e:
-        logger.error(f"Erreur InfoClimat: {e}")
+        transform_failed(f"Erreur InfoClimat: {e}", e)
         return []
 
 
-def process_file(file_path: str, filename: str) -> list:
+def process_file(file_path: str, filename: str, strict: bool = False) -> list:
     """
     Routeur principal.
     Aiguille le fichier vers la bonne fonction de transformation.
     Retourne une liste de documents au format unifié.
+
+    INGEST_MODE=typed active le décodage msgspec direct (src.processing.typed_ingest).
+    COMPACT_RECORDS=true (défaut) : mesures renvoyées en MeasurementBatch.
+
+    strict=True : une erreur de lecture ou de conversion lève TransformError au lieu
+    de renvoyer une liste vide (le fichier n'est alors pas marqué comme traité).
     """
+    token = _strict_errors.set(strict)
+    try:
+        return _route_file(file_path, filename)
+    finally:
+        _strict_errors.reset(token)
+
+
+def _route_file(file_path: str, filename: str) -> list:
+    typed = False
+    if os.getenv("INGEST_MODE", "dataframe").lower() == "typed":
+        from src.processing import typed_ingest
+        typed = typed_ingest.is_available()
+        if not typed:
+            logger.warning("INGEST_MODE=typed mais msgspec absent -> voie DataFrame.")
+
     if "info_climat" in filename or "stations" in filename:
+        if typed:
+            return typed_ingest.transform_infoclimat_typed(file_path)
         return transform_infoclimat(file_path)
         
     elif "station_" in filename:
-        return transform_weather_data(file_path, filename)
+        if typed:
+            return typed_ingest.transform_weather_data_typed(file_path, filename)
+        compact = os.getenv("COMPACT_RECORDS", "true").lower() != "false"
+        return transform_weather_data(file_path, filename, compact=compact)
     
     return []
@@ -0,0 +1,124 @@
+"""
+Variables explicatives par station pour l'entraînement des modèles de prévision.
+
+Les Data Scientists calculaient retards, moyennes glissantes et différences dans
+les notebooks, document par document. Ici, les mesures sont traitées en colonnes
+(DataFrame trié par station puis timestamp, voir arrow_reader) et chaque famille
+de variables est calculée pour toutes les stations à la fois, sans boucle Python
+par station ni par ligne :
+- retards (lag_n) et différence première (diff_1) : décalage du tableau, masqué
+  là où la station change
+- moyennes glissantes sur fenêtres temporelles (mean_1h, mean_24h...) : sommes
+  cumulées et recherche dichotomique du début de fenêtre sur la clé
+  (station, timestamp) ; fenêtre ]t - w, t], valeurs manquantes ignorées
+  (même résultat que groupby().rolling(w, on="timestamp").mean())
+- calendrier : heure, jour de la semaine, mois, jour de l'année, encodage
+  cyclique de l'heure
+
+Le calcul incrémental (seule la fin des séries est recalculée après un
+chargement) est assuré par src.connectors.feature_store.
+"""
+
+import numpy as np
+import pandas as pd
+
+FEATURE_FIELDS = ["temperature_celsius", "humidity_percent", "wind_speed_kmh", "pressure_hpa"]
+DEFAULT_WINDOWS = ("1h", "3h", "24h")
+DEFAULT_LAGS = (1, 2, 3, 6, 12)
+
+
+def parse_windows(value: str) -> tuple:
+    """'1h,3h,24h' -> ('1h', '3h', '24h')"""
+    return tuple(part.strip() for part in value.split(",") if part.strip())
+
+
+def parse_lags(value: str) -> tuple:
+    """'1,2,3' -> (1, 2, 3)"""
+    return tuple(int(part) for part in value.split(",") if part.strip())
+
+
+def max_window(windows) -> pd.Timedelta:
+    return max((pd.Timedelta(window) for window in windows), default=pd.Timedelta(0))
+
+
+def _group_starts(codes: np.ndarray) -> np.ndarray:
+    """Booléen : première ligne de chaque station (tableau trié par station)."""
+    starts = np.ones(len(codes), dtype=bool)
+    starts[1:] = codes[1:] != codes[:-1]
+    return starts
+
+
+def _lag(values: np.ndarray, codes: np.ndarray, n: int) -> np.ndarray:
+    result = np.full(len(values), np.nan)
+    if n < len(values):
+        result[n:] = values[:-n]
+        result[n:][codes[n:] != codes[:-n]] = np.nan
+    return result
+
+
+def _rolling_mean(values: np.ndarray, keys: np.ndarray, window_ms: int) -> np.ndarray:
+    """Moyenne sur ]t - w, t] de la même station (clés triées station * base + timestamp)."""
+    present = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    starts = np.searchsorted(keys, keys - window_ms, side="right")
+    ends = np.arange(1, len(values) + 1)
+    window_counts = counts[ends] - counts[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, (sums[ends] - sums[starts]) / window_counts, np.nan)
+
+
+def build_features(df: pd.DataFrame, windows=DEFAULT_WINDOWS, lags=DEFAULT_LAGS,
+                   fields: list = None) -> pd.DataFrame:
+    """
+    Calcule les variables de toutes les stations.
+
+    Args:
+        df: station_id, timestamp (datetime64) et colonnes de mesures
+            (read_measurements_frame) ; trié ici si besoin
+        windows: fenêtres des moyennes glissantes (durées pandas : '1h', '30min'...)
+        lags: retards en nombre d'observations
+
+    Returns:
+        pd.DataFrame: station_id, timestamp, mesures et variables, trié par (station_id, timestamp),
+                      une ligne par (station_id, timestamp) : les mesures en double
+                      (aucun index unique sur weather_data) ne sont comptées qu'une fois
+    """
+    fields = [field for field in (fields or FEATURE_FIELDS) if field in df.columns]
+    df = (df.sort_values(["station_id", "timestamp"], kind="stable")
+            .drop_duplicates(["station_id", "timestamp"], keep="last", ignore_index=True))
+    out = {"station_id": df["station_id"], "timestamp": df["timestamp"]}
+    if df.empty:
+        return pd.DataFrame(out)
+
+    codes = pd.factorize(df["station_id"], sort=True)[0].astype(np.int64)
+    millis = df["timestamp"].to_numpy(dtype="datetime64[ms]").astype(np.int64)
+    # Clé triée (station, timestamp) : l'écart entre stations dépasse toute fenêtre
+    span = int(millis.max() - millis.min()) + max((int(pd.Timedelta(w).total_seconds() * 1000) for w in windows),
+                                                   default=0) + 1
+    keys = codes * span + (millis - millis.min())
+    first_rows = _group_starts(codes)
+
+    for field in fields:
+        values = df[field].to_numpy(dtype=np.float64)
+        out[field] = values
+        for n in lags:
+            out[f"{field}_lag_{n}"] = _lag(values, codes, n)
+        diff = np.empty(len(values))
+        diff[1:] = values[1:] - values[:-1]
+        diff[first_rows] = np.nan
+        out[f"{field}_diff_1"] = diff
+        for window in windows:
+            window_ms = int(pd.Timedelta(window).total_seconds() * 1000)
+            out[f"{field}_mean_{window}"] = _rolling_mean(values, keys, window_ms)
+
+    timestamps = df["timestamp"].dt
+    hours = timestamps.hour + timestamps.minute / 60
+    out["hour"] = timestamps.hour.astype(np.int8)
+    out["day_of_week"] = timestamps.dayofweek.astype(np.int8)
+    out["month"] = timestamps.month.astype(np.int8)
+    out["day_of_year"] = timestamps.dayofyear.astype(np.int16)
+    out["hour_sin"] = np.sin(2 * np.pi * hours / 24)
+    out["hour_cos"] = np.cos(2 * np.pi * hours / 24)
+
+    return pd.DataFrame(out)
@@ -0,0 +1,190 @@
+"""
+Représentation compacte des mesures entre transformation et chargement.
+
+Chaque mesure validée était conservée sous forme de dictionnaire imbriqué qui
+répète le sous-document 'location', le nom de la station et la source : plusieurs
+centaines d'octets d'objets Python par relevé, tous gardés en mémoire jusqu'à
+l'insertion. MeasurementBatch les range en colonnes (struct-of-arrays) :
+- une colonne NumPy par mesure (float64, NaN pour une mesure absente)
+- les timestamps en datetime64[ms]
+- un code de station (int32) vers la liste des stations du lot, dont les
+  métadonnées ne sont stockées qu'une fois
+
+Les documents MongoDB ne sont reconstruits qu'au moment de l'insertion,
+batch par batch (documents(start, stop)). MeasurementRow donne un accès
+ligne à ligne sans matérialiser de dictionnaire.
+"""
+
+import bson
+import numpy as np
+
+MEASUREMENT_FIELDS = ("temperature_celsius", "humidity_percent", "wind_speed_kmh", "pressure_hpa")
+
+# Documents encodés pour estimer une taille BSON (statistique bytes_saved de la déduplication)
+SIZE_SAMPLE = 32
+
+
+def sample_indices(indices: list, sample: int = SIZE_SAMPLE) -> list:
+    """Au plus 'sample' indices régulièrement espacés."""
+    indices = sorted(indices)
+    return indices[::max(len(indices) // sample, 1)][:sample]
+
+
+class MeasurementRow:
+    """Vue sur une ligne d'un MeasurementBatch (aucune copie des valeurs)."""
+
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch: "MeasurementBatch", index: int):
+        self.batch = batch
+        self.index = index
+
+    @property
+    def station_id(self) -> str:
+        return self.batch.stations[self.batch.station_codes[self.index]]["station_id"]
+
+    @property
+    def timestamp(self):
+        return self.batch.timestamps[self.index].astype("datetime64[ms]").item()
+
+    def get(self, field: str):
+        value = self.batch.columns[field][self.index]
+        return None if np.isnan(value) else float(value)
+
+    def to_document(self) -> dict:
+        return self.batch.documents(self.index, self.index + 1)[0]
+
+
+class MeasurementBatch:
+    """
+    Mesures d'une ou plusieurs stations rangées en colonnes.
+
+    Attributs:
+        stations: métadonnées par station (station_id, station_name, source, location)
+        station_codes: indice de la station de chaque ligne (int32)
+        timestamps: datetime64[ms]
+        columns: {mesure: np.ndarray float64}
+    """
+
+    __slots__ = ("stations", "station_codes", "timestamps", "columns")
+
+    def __init__(self, stations: list, station_codes: np.ndarray, timestamps: np.ndarray, columns: dict):
+        self.stations = stations
+        self.station_codes = station_codes
+        self.timestamps = timestamps
+        self.columns = columns
+
+    @classmethod
+    def from_documents(cls, documents: list) -> "MeasurementBatch":
+        """Range des documents 'measurement' validés (schéma unifié) en colonnes."""
+        stations, codes_by_id = [], {}
+        codes = np.empty(len(documents), dtype=np.int32)
+        timestamps = np.empty(len(documents), dtype="datetime64[ms]")
+        columns = {field: np.empty(len(documents), dtype=np.float64) for field in MEASUREMENT_FIELDS}
+
+        for i, doc in enumerate(documents):
+            station_id = doc.get("station_id")
+            code = codes_by_id.get(station_id)
+            if code is None:
+                code = codes_by_id[station_id] = len(stations)
+                stations.append({"station_id": station_id, "station_name": doc.get("station_name"),
+                                 "source": doc.get("source"), "location": doc.get("location")})
+            codes[i] = code
+            timestamps[i] = doc.get("timestamp") or np.datetime64("NaT")
+            values = doc.get("measurements") or {}
+            for field in MEASUREMENT_FIELDS:
+                value = values.get(field)
+                columns[field][i] = np.nan if value is None else value
+
+        return cls(stations, codes, timestamps, columns)
+
+    @classmethod
+    def concat(cls, batches: list) -> "MeasurementBatch":
+        """Concatène plusieurs lots (stations fusionnées par station_id)."""
+        stations, codes_by_id, codes = [], {}, []
+        for batch in batches:
+            remap = np.empty(len(batch.stations), dtype=np.int32)
+            for code, station in enumerate(batch.stations):
+                new_code = codes_by_id.get(station["station_id"])
+                if new_code is None:
+                    new_code = codes_by_id[station["station_id"]] = len(stations)
+                    stations.append(station)
+                remap[code] = new_code
+            codes.append(remap[batch.station_codes] if len(batch) else batch.station_codes)
+
+        if not batches:
+            return cls.from_documents([])
+        return cls(stations, np.concatenate(codes),
+                   np.concatenate([batch.timestamps for batch in batches]),
+                   {field: np.concatenate([batch.columns[field] for batch in batches])
+                    for field in MEASUREMENT_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.station_codes)
+
+    def __getitem__(self, index: int) -> MeasurementRow:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return MeasurementRow(self, index % len(self))
+
+    def __iter__(self):
+        return (MeasurementRow(self, i) for i in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        return (self.station_codes.nbytes + self.timestamps.nbytes
+                + sum(column.nbytes for column in self.columns.values()))
+
+    def count_by_type(self) -> dict:
+        return {"measurement": len(self)} if len(self) else {}
+
+    # ─────────────────────────────────────────────────────────────
+    # SÉLECTION / MATÉRIALISATION
+    # ─────────────────────────────────────────────────────────────
+
+    def select(self, indices) -> "MeasurementBatch":
+        """Sous-lot des lignes aux indices donnés (ordre conservé)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return MeasurementBatch(self.stations, self.station_codes[indices], self.timestamps[indices],
+                                {field: column[indices] for field, column in self.columns.items()})
+
+    def measurement_keys(self) -> list:
+        """(index, station_id, timestamp) des lignes datées (déduplication)."""
+        station_ids = [station["station_id"] for station in self.stations]
+        timestamps = self.timestamps.tolist()
+        return [(i, station_ids[code], timestamp)
+                for i, (code, timestamp) in enumerate(zip(self.station_codes.tolist(), timestamps))
+                if timestamp is not None]
+
+    def encoded_size(self, indices, sample: int = SIZE_SAMPLE) -> int:
+        """
+        Taille BSON estimée des documents aux indices donnés : seuls 'sample' documents
+        régulièrement espacés sont reconstruits et encodés (taille moyenne x nombre).
+        """
+        indices = list(indices)
+        if not indices:
+            return 0
+        sizes = [len(bson.encode(doc)) for doc in self.select(sample_indices(indices, sample)).documents()]
+        return round(len(indices) * sum(sizes) / len(sizes))
+
+    def documents(self, start: int = 0, stop: int = None) -> list:
+        """Documents MongoDB (schéma unifié) des lignes [start, stop)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        codes = self.station_codes[start:stop].tolist()
+        timestamps = self.timestamps[start:stop].tolist()
+        values = {field: column[start:stop].tolist() for field, column in self.columns.items()}
+
+        documents = []
+        for j, code in enumerate(codes):
+            station = self.stations[code]
+            documents.append({
+                "record_type": "measurement",
+                "station_id": station["station_id"],
+                "station_name": station["station_name"],
+                "source": station["source"],
+                "location": dict(station["location"]) if station["location"] is not None else None,
+                "timestamp": timestamps[j],
+                "measurements": {field: (None if values[field][j] != values[field][j] else values[field][j])
+                                 for field in MEASUREMENT_FIELDS}
+            })
+        return documents
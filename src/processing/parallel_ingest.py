@@ -0,0 +1,262 @@
+"""
+Parallélisme intra-fichier pour les gros fichiers Weather Underground.
+
+Un fichier de plusieurs Go reste traité sur un seul cœur même quand les fichiers
+sont répartis entre processus. Ici, le fichier est projeté en mémoire (mmap) et
+découpé en N plages d'octets alignées sur les fins de ligne ; chaque plage est
+confiée à un processus qui exécute la même chaîne que transform_weather_data
+(parsing JSON → conversions → documents → validation Pydantic).
+
+Les résultats sont fusionnés dans l'ordre du fichier. Les timestamps dépendent
+des lignes précédentes (passage au jour suivant, rang dans la minute) : chaque
+segment est daté localement puis décalé d'après l'état de bord des segments
+précédents, ce qui donne exactement les timestamps d'un traitement séquentiel.
+
+Les processus fils renvoient le même type que le traitement séquentiel :
+lots compacts (MeasurementBatch, colonnes NumPy peu coûteuses à transmettre)
+si COMPACT_RECORDS, dictionnaires sinon. Une erreur dans un processus fils
+est traitée comme une erreur de lecture du fichier (transform_failed) : fichier
+ignoré, ou TransformError en mode strict.
+
+Activé automatiquement par transform_weather_data au-delà de
+PARALLEL_SPLIT_MIN_MB (voir should_split).
+"""
+
+import logging
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from src.monitoring import metrics
+from src.monitoring.spans import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPLIT_MIN_MB = 256
+
+
+def get_worker_count() -> int:
+    """Nombre de processus (INGEST_WORKERS, défaut : nombre de cœurs)."""
+    workers = int(os.getenv("INGEST_WORKERS", "0"))
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def should_split(file_path: str) -> bool:
+    """Découpage utile si plusieurs cœurs et fichier d'au moins PARALLEL_SPLIT_MIN_MB."""
+    min_bytes = float(os.getenv("PARALLEL_SPLIT_MIN_MB", DEFAULT_SPLIT_MIN_MB)) * 1024 * 1024
+    return get_worker_count() > 1 and os.path.getsize(file_path) >= min_bytes
+
+
+# =============================================================================
+# DÉCOUPAGE
+# =============================================================================
+
+def split_byte_ranges(file_path: str, parts: int) -> list:
+    """
+    Découpe le fichier en plages [start, end) alignées sur les fins de ligne.
+
+    Returns:
+        list: tuples (start, end), dans l'ordre, sans plage vide
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+    parts = max(1, min(parts, size))
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        cuts = [0]
+        for i in range(1, parts):
+            target = max(size * i // parts, cuts[-1])
+            newline = mm.find(b"\n", target)
+            if newline == -1:
+                break
+            if newline + 1 > cuts[-1]:
+                cuts.append(newline + 1)
+        if cuts[-1] < size:
+            cuts.append(size)
+
+    return [(start, end) for start, end in zip(cuts, cuts[1:]) if end > start]
+
+
+def read_range_records(file_path: str, start: int, end: int) -> list:
+    """Contenus '_airbyte_data' des lignes de la plage (lignes mal formées ignorées)."""
+    from src.processing.cleaner import decode_jsonl_block, get_json_backend
+
+    _, loads, decode_lines = get_json_backend()
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        block = mm[start:end]
+    return [record["_airbyte_data"] for record in decode_jsonl_block(block, loads, decode_lines)
+            if isinstance(record, dict) and "_airbyte_data" in record]
+
+
+# =============================================================================
+# TRAITEMENT D'UNE PLAGE (PROCESSUS FILS)
+# =============================================================================
+
+def transform_range(file_path: str, start: int, end: int, meta: dict, base_date,
+                    encode: bool = False, compact: bool = False) -> dict:
+    """
+    Chaîne de transform_weather_data sur une plage d'octets.
+
+    Args:
+        encode: Documents renvoyés encodés en BSON (EncodedBatch) plutôt qu'en dictionnaires
+        compact: Mesures renvoyées en colonnes (MeasurementBatch)
+
+    Returns:
+        dict: {leading, rest, rows, rejected, boundary, counters}
+              leading : documents valides issus de la série de tête (même minute que la
+              première ligne datée), à décaler de quelques secondes lors de la fusion
+    """
+    from src.processing.cleaner import _build_measurement_documents, convert_weather_frame
+    from src.processing.timestamps import segment_boundary, time_of_day_seconds
+    from src.processing.validator import validate_weather_data
+
+    # Le pool réutilise ses processus : seuls les compteurs de cette plage sont transmis
+    counters_before = metrics.get_registry().counter_values()
+
+    df = pd.DataFrame(read_range_records(file_path, start, end))
+    result = {"leading": [], "rest": [], "rows": len(df), "rejected": 0,
+              "boundary": segment_boundary(np.array([]))}
+    if df.empty:
+        return result
+
+    if "Time" in df.columns:
+        result["boundary"] = segment_boundary(*time_of_day_seconds(df["Time"], with_precision=True))
+    df = convert_weather_frame(df, base_date)
+    documents = _build_measurement_documents(df, meta)
+
+    # Les lignes sans heure sont retirées par convert_weather_frame : la série de
+    # tête correspond aux premiers documents construits
+    split = result["boundary"]["leading_run"]
+    result["leading"], rejected_leading = validate_weather_data(documents[:split])
+    result["rest"], rejected_rest = validate_weather_data(documents[split:])
+    result["rejected"] = len(rejected_leading) + len(rejected_rest)
+    if rejected_leading or rejected_rest:
+        result["example_reason"] = (rejected_leading or rejected_rest)[0].get("rejection_reason")
+
+    if encode:
+        from src.connectors.bson_batches import EncodedBatch
+        result["leading"] = EncodedBatch.from_documents(result["leading"])
+        result["rest"] = EncodedBatch.from_documents(result["rest"])
+    elif compact:
+        from src.processing.measurement_batch import MeasurementBatch
+        result["leading"] = MeasurementBatch.from_documents(result["leading"])
+        result["rest"] = MeasurementBatch.from_documents(result["rest"])
+
+    result["counters"] = _counter_delta(counters_before, metrics.get_registry().counter_values())
+    return result
+
+
+def _counter_delta(before: dict, after: dict) -> dict:
+    delta = {}
+    for name, series in after.items():
+        previous = before.get(name, {})
+        changed = {key: value - previous.get(key, 0) for key, value in series.items()
+                   if value != previous.get(key, 0)}
+        if changed:
+            delta[name] = changed
+    return delta
+
+
+# =============================================================================
+# FUSION
+# =============================================================================
+
+def _apply_shift(documents: list, delta: timedelta):
+    if not delta:
+        return
+    for doc in documents:
+        doc["timestamp"] = doc["timestamp"] + delta
+
+
+def merge_segments(results: list):
+    """
+    Concatène les documents des segments (dans l'ordre) en recalant leurs timestamps.
+
+    Returns:
+        list | EncodedBatch | MeasurementBatch: selon le type des segments
+    """
+    from src.connectors.bson_batches import EncodedBatch
+    from src.processing.measurement_batch import MeasurementBatch
+    from src.processing.timestamps import segment_shifts
+
+    shifts = segment_shifts([r["boundary"] for r in results])
+    encoded = any(isinstance(r["leading"], EncodedBatch) for r in results)
+    compact = any(isinstance(r["leading"], MeasurementBatch) for r in results)
+    parts = []
+    for result, (days, rank_seconds) in zip(results, shifts):
+        metrics.get_registry().merge_counters(result.get("counters", {}))
+        if isinstance(result["leading"], EncodedBatch):
+            # Valeurs int64 (ms) réécrites directement dans les tampons BSON
+            result["leading"].shift_timestamps((days * 86400 + rank_seconds) * 1000)
+            result["rest"].shift_timestamps(days * 86400 * 1000)
+        elif isinstance(result["leading"], MeasurementBatch):
+            result["leading"].timestamps += np.timedelta64((days * 86400 + rank_seconds) * 1000, "ms")
+            result["rest"].timestamps += np.timedelta64(days * 86400 * 1000, "ms")
+        else:
+            _apply_shift(result["leading"], timedelta(days=days, seconds=rank_seconds))
+            _apply_shift(result["rest"], timedelta(days=days))
+        parts.extend([result["leading"], result["rest"]])
+
+    if encoded:
+        return EncodedBatch.concat(parts)
+    if compact:
+        return MeasurementBatch.concat(parts)
+    return [doc for part in parts for doc in part]
+
+
+def transform_weather_data_parallel(file_path: str, filename: str, meta: dict, workers: int = None,
+                                    compact: bool = False):
+    """
+    Transforme un fichier Weather Underground en parallèle sur plusieurs processus.
+
+    Returns:
+        list | MeasurementBatch: Documents valides, dans l'ordre du fichier (mêmes documents
+              et même type que transform_weather_data en séquentiel) ; liste vide si un
+              processus fils échoue (TransformError en mode strict)
+    """
+    from src.processing.cleaner import transform_failed
+    from src.processing.timestamps import resolve_observation_date
+
+    workers = workers or get_worker_count()
+    base_date = resolve_observation_date(file_path, filename, meta.get("timezone"))
+
+    with span("transform.split", file=filename) as s:
+        ranges = split_byte_ranges(file_path, workers)
+        s["rows"] = len(ranges)
+    logger.info(f"⚡ {filename} : {len(ranges)} segments sur {workers} processus")
+
+    with span("transform.parallel", file=filename) as s:
+        # spawn : processus fils propres (pas de fork d'un processus multi-thread)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            futures = [pool.submit(transform_range, file_path, start, end, meta, base_date, compact=compact)
+                       for start, end in ranges]
+            try:
+                results = [future.result() for future in futures]
+            except Exception as e:
+                for future in futures:
+                    future.cancel()
+                # Même traitement qu'une erreur de lecture en séquentiel : fichier ignoré
+                transform_failed(f"Erreur traitement parallèle {file_path}: {e}", e)
+                return []
+        s["rows"] = sum(r["rows"] for r in results)
+
+    with span("transform.merge", file=filename) as s:
+        documents = merge_segments(results)
+        s["rows"] = len(documents)
+
+    metrics.inc("etl_rows_parsed_total", sum(r["rows"] for r in results), source="weather_underground")
+
+    rejected = sum(r["rejected"] for r in results)
+    if rejected:
+        logger.warning(f"Validation Météo : {rejected} lignes rejetées dans {filename}.")
+        reason = next((r["example_reason"] for r in results if r.get("example_reason")), None)
+        logger.warning(f"Exemple motif : {reason}")
+
+    logger.info(f"Transformation {filename} : {len(documents)} documents valides.")
+    return documents
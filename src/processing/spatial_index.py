@@ -0,0 +1,263 @@
+"""
+Index spatial des stations de référence (recherche des stations les plus proches).
+
+Chaque station Weather Underground est comparée aux stations de référence
+InfoClimat voisines. Les positions n'étaient que des flottants (STATION_METADATA,
+documents station_reference) : chaque recherche parcourait toutes les stations.
+
+StationIndex range les stations dans une grille régulière latitude/longitude
+(cellules de cell_deg degrés), triées par cellule : les stations d'une ligne
+de la grille sur une plage de longitudes sont contiguës en mémoire. Une
+recherche ne lit que les cellules de la boîte englobant le cercle de recherche
+(une tranche par ligne, passage de l'antiméridien et pôles gérés), puis calcule
+les distances haversine (NumPy) sur ces seuls candidats :
+- within_radius : stations à moins de radius_km
+- nearest : k plus proches (rayon doublé jusqu'à trouver k stations, résultat exact)
+- pair_stations : appariement en lot de chaque station de mesure
+
+load_reference_index construit l'index depuis les documents station_reference
+et le garde en cache dans le processus : il n'est reconstruit que si les
+empreintes (content_hash) des stations ont changé.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_CELL_DEG = 0.5
+DEFAULT_CACHE_TTL_S = 3600
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en km (degrés, diffusion NumPy)."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _coordinates(doc: dict) -> tuple:
+    location = doc.get("location") or {}
+    return location.get("latitude"), location.get("longitude")
+
+
+class StationIndex:
+    """
+    Grille latitude/longitude des stations (tableaux NumPy triés par cellule).
+
+    Attributs:
+        station_ids: identifiants, dans l'ordre des cellules
+        latitudes, longitudes: degrés (float64)
+        starts: début de chaque cellule dans les tableaux (rows * cols + 1 valeurs)
+    """
+
+    def __init__(self, station_ids: list, latitudes, longitudes, cell_deg: float = DEFAULT_CELL_DEG):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes) & (np.abs(latitudes) <= 90)
+        if not valid.all():
+            logger.warning(f"Index spatial : {int((~valid).sum())} station(s) sans coordonnées ignorée(s)")
+
+        self.cell_deg = cell_deg
+        self.rows = int(math.ceil(180 / cell_deg))
+        self.cols = int(math.ceil(360 / cell_deg))
+
+        latitudes, longitudes = latitudes[valid], ((longitudes[valid] + 180) % 360) - 180
+        cells = self._row(latitudes) * self.cols + self._col(longitudes)
+        order = np.argsort(cells, kind="stable")
+
+        self.station_ids = [station_ids[i] for i in np.flatnonzero(valid)[order]]
+        self.latitudes = latitudes[order]
+        self.longitudes = longitudes[order]
+        self.starts = np.searchsorted(cells[order], np.arange(self.rows * self.cols + 1))
+
+        self._lat_rad = np.radians(self.latitudes)
+        self._lon_rad = np.radians(self.longitudes)
+        self._cos_lat = np.cos(self._lat_rad)
+
+    @classmethod
+    def from_documents(cls, documents, cell_deg: float = DEFAULT_CELL_DEG) -> "StationIndex":
+        """Index depuis des documents {station_id, location: {latitude, longitude}}."""
+        ids, latitudes, longitudes = [], [], []
+        for doc in documents:
+            latitude, longitude = _coordinates(doc)
+            ids.append(doc.get("station_id"))
+            latitudes.append(np.nan if latitude is None else latitude)
+            longitudes.append(np.nan if longitude is None else longitude)
+        return cls(ids, latitudes, longitudes, cell_deg)
+
+    def __len__(self) -> int:
+        return len(self.station_ids)
+
+    def _row(self, latitudes):
+        return np.minimum(((np.asarray(latitudes) + 90) // self.cell_deg).astype(np.int64), self.rows - 1)
+
+    def _col(self, longitudes):
+        return ((np.asarray(longitudes) + 180) // self.cell_deg).astype(np.int64) % self.cols
+
+    # ─────────────────────────────────────────────────────────────
+    # CANDIDATS ET DISTANCES
+    # ─────────────────────────────────────────────────────────────
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Indices des stations des cellules couvrant le cercle (sur-ensemble du résultat)."""
+        lon = ((lon + 180) % 360) - 180
+        angle = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angle)
+        row_lo = min(int((max(lat - dlat, -90.0) + 90) // self.cell_deg), self.rows - 1)
+        row_hi = min(int((min(lat + dlat, 90.0) + 90) // self.cell_deg), self.rows - 1)
+
+        # Demi-largeur en longitude du cercle ; toute la ligne si le cercle contient un pôle
+        sin_ratio = math.sin(min(angle, math.pi / 2)) / max(math.cos(math.radians(lat)), 1e-12)
+        if lat - dlat <= -90 or lat + dlat >= 90 or angle >= math.pi / 2 or sin_ratio >= 1:
+            spans = [(0, self.cols - 1)]
+        else:
+            dlon = math.degrees(math.asin(sin_ratio))
+            col_lo = int(math.floor((lon - dlon + 180) / self.cell_deg))
+            col_hi = int(math.floor((lon + dlon + 180) / self.cell_deg))
+            if col_hi - col_lo + 1 >= self.cols:
+                spans = [(0, self.cols - 1)]
+            elif col_lo < 0:
+                spans = [(0, col_hi), (col_lo % self.cols, self.cols - 1)]
+            elif col_hi >= self.cols:
+                spans = [(col_lo, self.cols - 1), (0, col_hi % self.cols)]
+            else:
+                spans = [(col_lo, col_hi)]
+
+        # Une tranche contiguë par ligne de la grille et par plage de longitudes
+        bases = np.arange(row_lo, row_hi + 1) * self.cols
+        lows = np.concatenate([self.starts[bases + col_lo] for col_lo, _ in spans])
+        highs = np.concatenate([self.starts[bases + col_hi + 1] for _, col_hi in spans])
+        counts = highs - lows
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Concaténation des plages [low, high) sans boucle Python
+        offsets = np.repeat(lows - np.cumsum(counts) + counts, counts)
+        return np.arange(total) + offsets
+
+    def _distances(self, lat: float, lon: float, indices: np.ndarray) -> np.ndarray:
+        lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+        a = (np.sin((self._lat_rad[indices] - lat_rad) / 2) ** 2
+             + math.cos(lat_rad) * self._cos_lat[indices] * np.sin((self._lon_rad[indices] - lon_rad) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def _result(self, indices: np.ndarray, distances: np.ndarray) -> list:
+        order = np.argsort(distances, kind="stable")
+        return [(self.station_ids[i], float(d)) for i, d in zip(indices[order], distances[order])]
+
+    # ─────────────────────────────────────────────────────────────
+    # REQUÊTES
+    # ─────────────────────────────────────────────────────────────
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> list:
+        """
+        Stations à moins de radius_km.
+
+        Returns:
+            list: (station_id, distance_km), de la plus proche à la plus lointaine
+        """
+        indices = self._candidates(lat, lon, radius_km)
+        distances = self._distances(lat, lon, indices)
+        keep = distances <= radius_km
+        return self._result(indices[keep], distances[keep])
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_radius_km: float = None) -> list:
+        """
+        k stations les plus proches (éventuellement limitées à max_radius_km).
+
+        Returns:
+            list: (station_id, distance_km), de la plus proche à la plus lointaine
+        """
+        if not len(self) or k <= 0:
+            return []
+        half_circumference = math.pi * EARTH_RADIUS_KM
+        limit = min(max_radius_km or half_circumference, half_circumference)
+        radius = min(self.cell_deg * 111.2, limit)
+
+        while True:
+            indices = self._candidates(lat, lon, radius)
+            distances = self._distances(lat, lon, indices)
+            keep = distances <= radius
+            # Au moins k stations dans le cercle : aucune station hors du cercle n'est plus proche
+            if keep.sum() >= k or radius >= limit:
+                indices, distances = indices[keep], distances[keep]
+                if len(indices) > k:
+                    top = np.argpartition(distances, k - 1)[:k]
+                    indices, distances = indices[top], distances[top]
+                return self._result(indices, distances)
+            radius = min(radius * 2, limit)
+
+    def pair_stations(self, stations, k: int = 3, max_radius_km: float = None) -> dict:
+        """
+        Apparie chaque station de mesure à ses k stations de référence les plus proches.
+
+        Args:
+            stations: documents {station_id, location} (STATION_METADATA, station_latest...)
+
+        Returns:
+            dict: {station_id: [(station_id de référence, distance_km), ...]}
+        """
+        pairs = {}
+        for doc in stations:
+            latitude, longitude = _coordinates(doc)
+            if latitude is None or longitude is None:
+                pairs[doc.get("station_id")] = []
+                continue
+            pairs[doc.get("station_id")] = self.nearest(latitude, longitude, k, max_radius_km)
+        return pairs
+
+
+# =============================================================================
+# INDEX DES STATIONS DE RÉFÉRENCE (CACHE)
+# =============================================================================
+
+_cache = {}
+
+
+def _signature(documents: list) -> str:
+    digest = hashlib.sha1()
+    for doc in sorted(documents, key=lambda d: (str(d.get("station_id")), str(d.get("source")))):
+        digest.update(f"{doc.get('station_id')}|{doc.get('source')}|{doc.get('content_hash')}\n".encode())
+    return digest.hexdigest()
+
+
+def load_reference_index(collection, cell_deg: float = None, max_age_s: float = None) -> StationIndex:
+    """
+    Index des stations de référence de la collection, mis en cache dans le processus.
+
+    Pendant max_age_s (SPATIAL_INDEX_TTL_S), l'index en cache est rendu sans requête ;
+    ensuite, les empreintes content_hash sont relues (une requête projetée) et
+    l'index n'est reconstruit que si elles ont changé.
+    """
+    cell_deg = cell_deg or float(os.getenv("SPATIAL_INDEX_CELL_DEG", DEFAULT_CELL_DEG))
+    max_age_s = max_age_s if max_age_s is not None else float(os.getenv("SPATIAL_INDEX_TTL_S", DEFAULT_CACHE_TTL_S))
+    key = (collection.database.name, collection.name, cell_deg)
+
+    cached = _cache.get(key)
+    if cached and time.monotonic() - cached["loaded_at"] < max_age_s:
+        return cached["index"]
+
+    projection = {"_id": 0, "station_id": 1, "source": 1, "content_hash": 1,
+                  "location.latitude": 1, "location.longitude": 1}
+    documents = list(collection.find({"record_type": "station_reference"}, projection))
+    signature = _signature(documents)
+
+    if cached and cached["signature"] == signature:
+        cached["loaded_at"] = time.monotonic()
+        return cached["index"]
+
+    index = StationIndex.from_documents(documents, cell_deg)
+    _cache[key] = {"index": index, "signature": signature, "loaded_at": time.monotonic()}
+    logger.info(f"🗺️  Index spatial : {len(index)} station(s) de référence (cellules de {cell_deg}°)")
+    return index
+
+
+def clear_cache():
+    _cache.clear()
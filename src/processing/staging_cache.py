@@ -0,0 +1,243 @@
+"""
+Cache de staging "brut → colonnaire".
+
+Le contenu '_airbyte_data' parsé d'un fichier JSONL est stocké au format
+Feather (Arrow IPC) dans data/staging, indexé par le hash SHA-256 du fichier.
+Un fichier inchangé est ensuite relu en mémoire mappée, sans json.loads :
+utile pour rejouer les transformations après un changement des règles
+de nettoyage.
+
+- Éviction LRU (date de dernier accès = mtime du fichier de cache)
+- Taille maximale configurable (STAGING_CACHE_MAX_MB)
+- Compteurs hits / misses pour le résumé du pipeline
+
+Variables d'environnement :
+    STAGING_CACHE_ENABLED  : "false" pour désactiver (défaut "true")
+    STAGING_CACHE_DIR      : dossier du cache (défaut "data/staging")
+    STAGING_CACHE_MAX_MB   : taille maximale du cache en Mo (défaut 1024)
+"""
+
+import hashlib
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter si le format des données mises en cache change
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = "data/staging"
+DEFAULT_MAX_MB = 1024
+
+# Colonne des clés explicitement nulles de chaque enregistrement (chemins depuis la racine)
+NULL_KEYS_FIELD = "__null_keys__"
+
+
+def file_sha256(file_path: str, chunk_size: int = 4 * 1024 * 1024) -> str:
+    """Hash SHA-256 du contenu d'un fichier (lecture par blocs)."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _null_paths(value, path: tuple = ()):
+    """Chemins (clés, indices de liste en texte) des clés dont la valeur est explicitement None."""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if v is None:
+                yield [*path, k]
+            else:
+                yield from _null_paths(v, (*path, k))
+    elif isinstance(value, list):
+        for i, v in enumerate(value):
+            yield from _null_paths(v, (*path, str(i)))
+
+
+def _strip_nulls(value, keep: set = None, path: tuple = ()):
+    """
+    Retire récursivement les clés à None (colonnes ajoutées par l'unification Arrow),
+    sauf celles de keep (clés nulles dans l'enregistrement d'origine).
+    """
+    if not keep:
+        if isinstance(value, dict):
+            return {k: _strip_nulls(v) for k, v in value.items() if v is not None}
+        if isinstance(value, list):
+            return [_strip_nulls(v) for v in value]
+        return value
+    if isinstance(value, dict):
+        return {k: _strip_nulls(v, keep, (*path, k)) for k, v in value.items()
+                if v is not None or (*path, k) in keep}
+    if isinstance(value, list):
+        return [_strip_nulls(v, keep, (*path, str(i))) for i, v in enumerate(value)]
+    return value
+
+
+class StagingCache:
+    """
+    Cache LRU de DataFrames parsés, indexé par hash de contenu.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    # ─────────────────────────────────────────────────────────────
+    # CLÉS ET CHEMINS
+    # ─────────────────────────────────────────────────────────────
+
+    def key_for(self, file_path: str, kind: str) -> str:
+        """Clé de cache : type de contenu + version du format + hash du fichier."""
+        return f"{kind}-v{CACHE_FORMAT_VERSION}-{file_sha256(file_path)}"
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.feather")
+
+    # ─────────────────────────────────────────────────────────────
+    # LECTURE / ÉCRITURE
+    # ─────────────────────────────────────────────────────────────
+
+    def get_table(self, key: str):
+        """Retourne la table Arrow mise en cache (mémoire mappée) ou None."""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            self.stats["misses"] += 1
+            return None
+
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except Exception as e:
+            logger.warning(f"Cache staging illisible ({path}) : {e}")
+            self.stats["errors"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        # Mise à jour de la date d'accès (LRU)
+        os.utime(path, None)
+        self.stats["hits"] += 1
+        return table
+
+    def get(self, key: str):
+        """Retourne le DataFrame mis en cache ou None."""
+        table = self.get_table(key)
+        return table.to_pandas() if table is not None else None
+
+    def get_records(self, key: str):
+        """Retourne les enregistrements mis en cache (liste de dicts) ou None."""
+        table = self.get_table(key)
+        if table is None:
+            return None
+        records = []
+        for row in table.to_pylist():
+            keep = {tuple(path) for path in row.pop(NULL_KEYS_FIELD, None) or ()}
+            records.append(_strip_nulls(row, keep))
+        return records
+
+    def put_table(self, key: str, table: pa.Table) -> bool:
+        """Écrit une table Arrow dans le cache (écriture atomique)."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = path + ".tmp"
+        try:
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Écriture cache staging impossible ({key}) : {e}")
+            self.stats["errors"] += 1
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        self.stats["writes"] += 1
+        self.evict()
+        return True
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """Met en cache un DataFrame (ignoré si non convertible en Arrow)."""
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            logger.debug(f"DataFrame non convertible en Arrow, pas de mise en cache : {e}")
+            return False
+        return self.put_table(key, table)
+
+    def put_records(self, key: str, records: list) -> bool:
+        """
+        Met en cache une liste de dicts (structures imbriquées conservées).
+
+        Arrow ne distingue pas une clé absente d'une clé à None : les chemins des
+        clés explicitement nulles sont stockés à part (NULL_KEYS_FIELD) pour que
+        get_records restitue les mêmes enregistrements qu'une lecture à froid.
+        """
+        null_keys = [list(_null_paths(record)) for record in records]
+        if any(null_keys):
+            records = [dict(record, **{NULL_KEYS_FIELD: paths}) for record, paths in zip(records, null_keys)]
+        try:
+            # pa.array infère le schéma sur toutes les lignes (from_pylist : première ligne seulement)
+            table = pa.Table.from_struct_array(pa.array(records))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            logger.debug(f"Enregistrements non convertibles en Arrow, pas de mise en cache : {e}")
+            return False
+        return self.put_table(key, table)
+
+    # ─────────────────────────────────────────────────────────────
+    # ÉVICTION
+    # ─────────────────────────────────────────────────────────────
+
+    def entries(self) -> list:
+        """Liste (chemin, taille, dernier accès) des fichiers du cache."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        result = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".feather"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            result.append((path, stat.st_size, stat.st_mtime))
+        return result
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes."""
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.max_bytes:
+            path, size, _ = entries.pop(0)
+            os.remove(path)
+            total -= size
+            self.stats["evictions"] += 1
+            logger.info(f"Cache staging : éviction de {os.path.basename(path)}")
+
+    def report(self) -> dict:
+        """Statistiques du cache pour le résumé du pipeline."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(
+            self.stats,
+            hit_rate=(self.stats["hits"] / lookups * 100) if lookups else 0.0,
+            size_mb=sum(size for _, size, _ in self.entries()) / 1024 / 1024
+        )
+
+
+_cache = None
+
+
+def get_staging_cache():
+    """
+    Retourne le cache partagé du processus, ou None si désactivé
+    (STAGING_CACHE_ENABLED=false).
+    """
+    global _cache
+    if os.getenv("STAGING_CACHE_ENABLED", "true").lower() in ("false", "0", "no"):
+        return None
+    if _cache is None:
+        _cache = StagingCache(
+            cache_dir=os.getenv("STAGING_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv("STAGING_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+        )
+    return _cache
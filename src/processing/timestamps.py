@@ -0,0 +1,245 @@
+"""
+Construction des timestamps des relevés Weather Underground.
+
+Les lignes brutes ne portent que l'heure ("12:04 AM"). Le timestamp est
+reconstruit à partir :
+- d'une date d'observation propre au fichier (et non de la date du jour),
+  pour que deux exécutions sur le même fichier produisent les mêmes timestamps
+- de l'heure, analysée avec un format explicite, une seule fois par valeur distincte
+- d'un passage au jour suivant quand l'heure recule de plus de 12 h
+  (fichiers multi-jours) ; un léger recul (ligne désordonnée, bruit) reste
+  dans le même jour au lieu de décaler tout le reste du fichier de 24 h
+- d'un rang en secondes pour les relevés consécutifs d'une même minute
+  (0, 1, 2...), déterministe car fonction du seul contenu du fichier
+  (< 60 doublons par minute) ; uniquement pour les heures à la minute
+  ("12:04 AM") : une heure à la seconde est gardée telle quelle, le rang
+  la ferait tomber sur la seconde réelle suivante
+
+Un fichier découpé en segments (src.processing.parallel_ingest) obtient les
+mêmes timestamps : chaque segment est daté localement, puis décalé d'après
+l'état de bord des segments précédents (segment_boundary / segment_shifts).
+"""
+
+import json
+import logging
+import os
+import re
+from datetime import datetime, date
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Formats d'heure acceptés (le premier couvre les exports Weather Underground)
+TIME_FORMATS = ("%I:%M %p", "%I:%M:%S %p", "%H:%M", "%H:%M:%S")
+
+# Recul de l'heure au-delà duquel la ligne passe au jour suivant
+DAY_ROLLOVER_S = 12 * 3600
+
+# Date dans le nom de fichier : station_x_2025-12-01.jsonl ou station_x_20251201.jsonl
+DATE_IN_FILENAME = re.compile(r"(?<!\d)(\d{4})-?(\d{2})-?(\d{2})(?!\d)")
+# Même date avec son séparateur, retirée pour retrouver le nom de fichier de la station
+DATED_SUFFIX = re.compile(r"[_-]?(?<!\d)\d{4}-?\d{2}-?\d{2}(?!\d)")
+
+# Fuseau des stations sans "timezone" dans leurs métadonnées
+DEFAULT_TIMEZONE = "Europe/Paris"
+
+
+@lru_cache(maxsize=4096)
+def _parse_time(text: str) -> tuple:
+    """(secondes depuis minuit, heure à la minute près), (None, False) si invalide."""
+    text = text.strip()
+    for fmt in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 3600 + parsed.minute * 60 + parsed.second, "%S" not in fmt
+    return None, False
+
+
+def parse_time_of_day(text: str):
+    """Secondes depuis minuit pour une heure brute ("12:04 AM" → 240), None si invalide."""
+    return _parse_time(text)[0]
+
+
+def time_of_day_seconds(time_values: pd.Series, with_precision: bool = False):
+    """
+    Version vectorisée de parse_time_of_day (NaN si absente ou invalide).
+
+    with_precision=True : renvoie aussi le booléen "heure à la minute près" de chaque ligne.
+    """
+    codes, uniques = pd.factorize(time_values, use_na_sentinel=True)
+    parsed = [_parse_time(u) if isinstance(u, str) else (None, False) for u in uniques]
+    lookup = np.array([np.nan if v is None else v for v, _ in parsed] + [np.nan], dtype=np.float64)
+    if not with_precision:
+        return lookup[codes]
+    minute = np.array([m for _, m in parsed] + [False], dtype=bool)
+    return lookup[codes], minute[codes]
+
+
+def _first_emitted_at(file_path: str):
+    """'_airbyte_emitted_at' (ms epoch) de la première ligne valide du fichier."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    emitted_at = json.loads(line).get("_airbyte_emitted_at")
+                except (ValueError, AttributeError):
+                    continue
+                return emitted_at
+    except OSError:
+        return None
+    return None
+
+
+def undated_filename(filename: str) -> str:
+    """Nom de fichier sans sa date : 'station_x_2025-12-01.jsonl' -> 'station_x.jsonl'."""
+    return DATED_SUFFIX.sub("", filename, count=1)
+
+
+def resolve_observation_date(file_path: str, filename: str = None, timezone_name: str = None) -> date:
+    """
+    Date d'observation de la première ligne du fichier, par ordre de priorité :
+    1. date présente dans le nom du fichier
+    2. date de synchronisation Airbyte ('_airbyte_emitted_at' de la première ligne),
+       dans le fuseau de la station (timezone_name, défaut DEFAULT_TIMEZONE) : un
+       relevé synchronisé peu après minuit heure locale reste sur le bon jour
+    3. date de modification du fichier (repli, instable si le fichier est retéléchargé)
+    """
+    match = DATE_IN_FILENAME.search(filename or os.path.basename(file_path))
+    if match:
+        try:
+            return date(*(int(part) for part in match.groups()))
+        except ValueError:
+            pass
+
+    emitted_at = _first_emitted_at(file_path)
+    if isinstance(emitted_at, (int, float)):
+        return datetime.fromtimestamp(emitted_at / 1000, tz=ZoneInfo(timezone_name or DEFAULT_TIMEZONE)).date()
+
+    logger.warning(f"Date d'observation introuvable pour {filename or file_path} : "
+                   "date de modification du fichier utilisée.")
+    return datetime.fromtimestamp(os.path.getmtime(file_path)).date()
+
+
+def build_timestamps(time_values: pd.Series, base_date: date = None) -> pd.Series:
+    """
+    Construit les timestamps à partir des heures brutes ("12:04 AM").
+
+    Args:
+        time_values: Heures brutes, dans l'ordre du fichier
+        base_date: Date de la première ligne (défaut : date du jour, à éviter)
+
+    Returns:
+        pd.Series: datetime64 (NaT pour les heures invalides), même index
+    """
+    seconds, minute_precision = time_of_day_seconds(time_values, with_precision=True)
+    return timestamps_from_seconds(seconds, base_date, index=time_values.index,
+                                   minute_precision=minute_precision)
+
+
+def _day_offsets(valid_seconds: np.ndarray) -> np.ndarray:
+    """Secondes depuis minuit du premier jour (jour suivant à chaque recul de plus de 12 h)."""
+    day = np.zeros(len(valid_seconds), dtype=np.int64)
+    day[1:] = np.cumsum(np.diff(valid_seconds) < -DAY_ROLLOVER_S)
+    return day * 86400 + valid_seconds
+
+
+def timestamps_from_seconds(seconds: np.ndarray, base_date: date = None, index=None,
+                            minute_precision: np.ndarray = None) -> pd.Series:
+    """
+    build_timestamps à partir des secondes déjà extraites (time_of_day_seconds).
+
+    minute_precision : lignes à la minute près, seules à recevoir un rang (toutes par défaut).
+    """
+    if base_date is None:
+        base_date = date.today()
+
+    valid = ~np.isnan(seconds)
+    result = np.full(len(seconds), np.datetime64("NaT"), dtype="datetime64[s]")
+
+    if valid.any():
+        offsets = _day_offsets(seconds[valid].astype(np.int64))
+
+        # Rang du relevé dans sa série de valeurs égales consécutives
+        # (rang = position - début de la série)
+        positions = np.arange(len(offsets))
+        run_starts = np.r_[True, np.diff(offsets) != 0]
+        rank = positions - np.maximum.accumulate(np.where(run_starts, positions, 0))
+        if minute_precision is not None:
+            rank = np.where(minute_precision[valid], rank, 0)
+        result[valid] = np.datetime64(base_date, "s") + (offsets + rank).astype("timedelta64[s]")
+
+    return pd.Series(result.astype("datetime64[ns]"), index=index, name="timestamp")
+
+
+# =============================================================================
+# DÉCOUPAGE D'UN FICHIER EN SEGMENTS
+# =============================================================================
+
+def segment_boundary(seconds: np.ndarray, minute_precision: np.ndarray = None) -> dict:
+    """
+    État de bord d'un segment de fichier traité isolément (heures valides seulement).
+
+    Returns:
+        dict: {first, last, days, leading_run, trailing_run, rows, ranked} (first/last None si vide ;
+              ranked : la série de tête reçoit un rang, heure à la minute près)
+    """
+    valid = ~np.isnan(seconds)
+    valid_seconds = seconds[valid].astype(np.int64)
+    if not len(valid_seconds):
+        return {"first": None, "last": None, "days": 0, "leading_run": 0, "trailing_run": 0, "rows": 0,
+                "ranked": False}
+
+    offsets = _day_offsets(valid_seconds)
+    changes = np.flatnonzero(np.diff(offsets) != 0)
+    rows = len(offsets)
+    return {
+        "first": int(valid_seconds[0]),
+        "last": int(valid_seconds[-1]),
+        "days": int(offsets[-1] // 86400),
+        "leading_run": int(changes[0] + 1) if len(changes) else rows,
+        "trailing_run": int(rows - 1 - changes[-1]) if len(changes) else rows,
+        "rows": rows,
+        "ranked": bool(minute_precision[valid][0]) if minute_precision is not None else True
+    }
+
+
+def segment_shifts(boundaries: list) -> list:
+    """
+    Décalages à appliquer aux timestamps de chaque segment pour retrouver ceux
+    d'un traitement du fichier entier (segments dans l'ordre du fichier).
+
+    Returns:
+        list: tuples (jours à ajouter, secondes à ajouter à la série de tête)
+    """
+    shifts = []
+    day = 0
+    last = None
+    trailing = 0
+    for boundary in boundaries:
+        if boundary["first"] is None:
+            shifts.append((0, 0))
+            continue
+
+        start_day = day
+        rank_shift = 0
+        if last is not None:
+            if boundary["first"] < last - DAY_ROLLOVER_S:
+                start_day += 1
+            elif boundary["first"] == last and boundary.get("ranked", True):
+                # Même minute que la fin du segment précédent : le rang continue
+                rank_shift = trailing
+        shifts.append((start_day, rank_shift))
+
+        single_run = boundary["leading_run"] == boundary["rows"]
+        trailing = boundary["trailing_run"] + (rank_shift if single_run else 0)
+        day = start_day + boundary["days"]
+        last = boundary["last"]
+    return shifts
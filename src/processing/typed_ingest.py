@@ -0,0 +1,251 @@
+"""
+Ingestion typée des fichiers Airbyte avec msgspec.
+
+Variante de transform_weather_data / transform_infoclimat : le contenu
+'_airbyte_data' est décodé directement dans des msgspec.Struct (stockage
+compact à slots, hors GC) au lieu de passer par un dict générique,
+un DataFrame et le renommage des colonnes.
+
+Activation : INGEST_MODE=typed (nécessite msgspec, sinon repli automatique
+sur la voie DataFrame de cleaner.py).
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Optional, Union
+
+import pandas as pd
+
+from src.processing.cleaner import (
+    station_metadata,
+    clean_value,
+    fahrenheit_to_celsius,
+    mph_to_kmh,
+    inHg_to_hPa,
+    iter_jsonl_blocks,
+    transform_failed,
+)
+from src.processing.timestamps import build_timestamps, resolve_observation_date
+from src.processing.validator import validate_weather_data, validate_station_data
+from src.monitoring import metrics
+from src.monitoring.spans import span
+
+try:
+    import msgspec
+    from msgspec import Struct, field
+except ImportError:
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+# Valeur brute Weather Underground : "57.0 °F" ou nombre
+RawValue = Optional[Union[str, float]]
+
+
+def is_available() -> bool:
+    """Indique si msgspec est installé."""
+    return msgspec is not None
+
+
+if msgspec is not None:
+
+    # =========================================================================
+    # SCHÉMAS WEATHER UNDERGROUND
+    # =========================================================================
+
+    class WURawRow(Struct, gc=False):
+        """Ligne brute Weather Underground (noms de champs Airbyte d'origine)."""
+        time: Optional[str] = field(name="Time", default=None)
+        temperature: RawValue = field(name="Temperature", default=None)
+        dew_point: RawValue = field(name="Dew Point", default=None)
+        humidity: RawValue = field(name="Humidity", default=None)
+        wind: RawValue = field(name="Wind", default=None)
+        speed: RawValue = field(name="Speed", default=None)
+        gust: RawValue = field(name="Gust", default=None)
+        pressure: RawValue = field(name="Pressure", default=None)
+        precip_rate: RawValue = field(name="Precip. Rate.", default=None)
+        precip_accum: RawValue = field(name="Precip. Accum.", default=None)
+
+    class WUAirbyteRecord(Struct, gc=False):
+        """Enveloppe Airbyte d'une ligne Weather Underground."""
+        data: Optional[WURawRow] = field(name="_airbyte_data", default=None)
+        emitted_at: Optional[int] = field(name="_airbyte_emitted_at", default=None)
+
+    # =========================================================================
+    # SCHÉMAS INFOCLIMAT
+    # =========================================================================
+
+    class ICLicense(Struct, gc=False):
+        license: Optional[str] = None
+        url: Optional[str] = None
+        metadonnees: Optional[str] = None
+
+    class ICStation(Struct, gc=False):
+        """Station InfoClimat."""
+        id: Optional[Union[str, int]] = None
+        name: Optional[str] = None
+        latitude: Optional[Union[float, str]] = None
+        longitude: Optional[Union[float, str]] = None
+        elevation: Optional[Union[int, float, str]] = None
+        type: Optional[str] = None
+        license: Optional[ICLicense] = None
+
+    class ICPayload(ICStation, gc=False):
+        """'_airbyte_data' InfoClimat : liste 'stations' ou station directe."""
+        stations: Optional[List[ICStation]] = None
+
+    class ICAirbyteRecord(Struct, gc=False):
+        data: Optional[ICPayload] = field(name="_airbyte_data", default=None)
+
+
+def _decode_typed(file_path: str, record_type, skip_malformed: bool = True):
+    """
+    Décode un fichier JSONL directement en Structs.
+    Les lignes mal formées (ou de types inattendus) sont ignorées si skip_malformed.
+    """
+    decoder = msgspec.json.Decoder(record_type)
+
+    for block in iter_jsonl_blocks(file_path):
+        try:
+            yield from decoder.decode_lines(block)
+            continue
+        except msgspec.DecodeError:
+            pass
+
+        for line in block.split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                yield decoder.decode(line)
+            except msgspec.DecodeError:
+                if not skip_malformed:
+                    raise
+
+
+# =============================================================================
+# TRANSFORMATIONS TYPÉES
+# =============================================================================
+
+def transform_weather_data_typed(file_path: str, filename: str) -> list:
+    """
+    Équivalent de transform_weather_data sans dict intermédiaire ni DataFrame.
+    Retourne une liste de documents prêts pour MongoDB (schéma unifié).
+    """
+    meta = station_metadata(filename)
+
+    if not meta:
+        logger.warning(f"Pas de métadonnées trouvées pour {filename}")
+        return []
+
+    try:
+        with span("transform.load", file=filename) as s:
+            rows = [record.data for record in _decode_typed(file_path, WUAirbyteRecord)
+                    if record.data is not None]
+            s["rows"] = len(rows)
+        metrics.inc("etl_rows_parsed_total", len(rows), source="weather_underground")
+    except Exception as e:
+        transform_failed(f"Erreur lecture JSONL {file_path}: {e}", e)
+        return []
+
+    if not rows:
+        return []
+
+    with span("transform.build", file=filename) as s:
+        documents = _build_documents(rows, meta, resolve_observation_date(file_path, filename, meta.get("timezone")))
+        s["rows"] = len(documents)
+
+    with span("transform.validate", file=filename) as s:
+        valid_data, rejected_data = validate_weather_data(documents)
+        s["rows"] = len(documents)
+
+    if rejected_data:
+        logger.warning(f"Validation Météo : {len(rejected_data)} lignes rejetées dans {filename}.")
+        logger.warning(f"Exemple motif : {rejected_data[0].get('rejection_reason')}")
+
+    logger.info(f"Transformation {filename} (typée) : {len(valid_data)} documents valides.")
+    return valid_data
+
+
+def _build_documents(rows: list, meta: dict, base_date=None) -> list:
+    """Construit les documents 'measurement' directement depuis les Structs."""
+    # Timestamps (logique partagée avec la voie DataFrame)
+    timestamps = build_timestamps(pd.Series([row.time for row in rows], dtype=object), base_date)
+
+    documents = []
+    for row, ts in zip(rows, timestamps):
+        if pd.isna(ts):
+            continue
+        documents.append({
+            "record_type": "measurement",
+            "station_id": meta.get("station_id"),
+            "station_name": meta.get("station_name"),
+            "source": meta.get("source", "weather_underground"),
+            "location": meta.get("location", {}),
+            "timestamp": ts.to_pydatetime(),
+            "measurements": {
+                "temperature_celsius": fahrenheit_to_celsius(clean_value(row.temperature)),
+                "humidity_percent": clean_value(row.humidity),
+                "wind_speed_kmh": mph_to_kmh(clean_value(row.speed)),
+                "pressure_hpa": inHg_to_hPa(clean_value(row.pressure))
+            }
+        })
+    return documents
+
+
+def transform_infoclimat_typed(file_path: str) -> list:
+    """
+    Équivalent de transform_infoclimat avec décodage direct en Structs.
+    """
+    try:
+        stations = []
+        for record in _decode_typed(file_path, ICAirbyteRecord, skip_malformed=False):
+            payload = record.data
+            if payload is None:
+                continue
+            # Cas 1 : Structure liste 'stations'
+            if payload.stations is not None:
+                stations.extend(payload.stations)
+            # Cas 2 : Structure directe
+            elif payload.id is not None and payload.name is not None:
+                stations.append(payload)
+
+        metrics.inc("etl_rows_parsed_total", len(stations), source="infoclimat")
+        if not stations:
+            return []
+
+        now = datetime.now()
+        documents = []
+        for station in stations:
+            license_data = station.license or ICLicense()
+            documents.append({
+                "record_type": "station_reference",
+                "station_id": str(station.id if station.id is not None else ''),
+                "station_name": station.name or '',
+                "source": "infoclimat",
+                "location": {
+                    "city": station.name or '',
+                    "country": "FR",
+                    "latitude": float(station.latitude) if station.latitude else None,
+                    "longitude": float(station.longitude) if station.longitude else None,
+                    "elevation": int(station.elevation) if station.elevation else None
+                },
+                "station_type": station.type or 'static',
+                "license": {
+                    "name": license_data.license or '',
+                    "url": license_data.url or '',
+                    "source_url": license_data.metadonnees or ''
+                },
+                "timestamp": now
+            })
+
+        valid_data, rejected_data = validate_station_data(documents)
+
+        if rejected_data:
+            logger.warning(f"Validation Stations : {len(rejected_data)} lignes rejetées.")
+
+        logger.info(f"InfoClimat (typé) : {len(valid_data)} stations extraites.")
+        return valid_data
+
+    except Exception as e:
+        transform_failed(f"Erreur InfoClimat: {e}", e)
+        return []
@@ -10,8 +10,12 @@ Collection unique : weather_data
 from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 from typing import Optional, Literal
 from datetime import datetime
+import hashlib
+import json
 import pandas as pd
 
+from src.monitoring import metrics
+
 
 # =============================================================================
 # MODÈLES IMBRIQUÉS (sous-documents)
@@ -105,6 +109,8 @@ class StationReference(BaseModel):
     station_type: Optional[str] = "static"
     license: Optional[License] = None
     timestamp: datetime
+    # Empreinte des champs significatifs (hors timestamp) : stations inchangées non réécrites
+    content_hash: Optional[str] = None
 
     @field_validator('station_id', mode='before')
     @classmethod
@@ -113,6 +119,36 @@ class StationReference(BaseModel):
             raise ValueError("station_id est requis")
         return str(v).strip()
 
+    @model_validator(mode='after')
+    def compute_content_hash(self):
+        """Calcule l'empreinte du contenu (le timestamp change à chaque exécution)."""
+        self.content_hash = station_content_hash(self.model_dump(exclude={"timestamp", "content_hash"}))
+        return self
+
+
+def station_content_hash(fields: dict) -> str:
+    """Empreinte SHA-1 stable (clés triées) des champs d'une station de référence."""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# MÉTRIQUES DE VALIDATION
+# =============================================================================
+
+def _count_rejection_rules(record_type: str, errors: list):
+    """Compte chaque erreur Pydantic par champ et type de règle (ex: less_than_equal)."""
+    for err in errors:
+        field = ".".join(str(part) for part in err['loc']) or "__root__"
+        metrics.inc("etl_rejections_by_rule_total", record_type=record_type,
+                    field=field, rule=err['type'])
+
+
+def _count_validation(record_type: str, total: int, rejected: int):
+    metrics.inc("etl_rows_validated_total", total, record_type=record_type)
+    if rejected:
+        metrics.inc("etl_rows_rejected_total", rejected, record_type=record_type)
+
 
 # =============================================================================
 # FONCTIONS DE VALIDATION
@@ -130,6 +166,7 @@ def validate_weather_data(records: list) -> tuple:
     """
     valid_records = []
     rejected_records = []
+    record_type = "measurement"
 
     for record in records:
         try:
@@ -139,11 +176,14 @@ def validate_weather_data(records: list) -> tuple:
             
         except ValidationError as e:
             # Capture des erreurs précises
-            error_messages = [f"{err['loc']}: {err['msg']}" for err in e.errors()]
+            errors = e.errors()
+            error_messages = [f"{err['loc']}: {err['msg']}" for err in errors]
+            _count_rejection_rules(record_type, errors)
             record_copy = record.copy() if isinstance(record, dict) else {"data": str(record)}
             record_copy['rejection_reason'] = "; ".join(error_messages)
             rejected_records.append(record_copy)
 
+    _count_validation(record_type, len(records), len(rejected_records))
     return valid_records, rejected_records
 
 
@@ -159,6 +199,7 @@ def validate_station_data(records: list) -> tuple:
     """
     valid_records = []
     rejected_records = []
+    record_type = "station_reference"
 
     for record in records:
         try:
@@ -168,11 +209,14 @@ def validate_station_data(records: list) -> tuple:
             
         except ValidationError as e:
             # Capture des erreurs précises
-            error_messages = [f"{err['loc']}: {err['msg']}" for err in e.errors()]
+            errors = e.errors()
+            error_messages = [f"{err['loc']}: {err['msg']}" for err in errors]
+            _count_rejection_rules(record_type, errors)
             record_copy = record.copy() if isinstance(record, dict) else {"data": str(record)}
             record_copy['rejection_reason'] = "; ".join(error_messages)
             rejected_records.append(record_copy)
 
+    _count_validation(record_type, len(records), len(rejected_records))
     return valid_records, rejected_records
 
 
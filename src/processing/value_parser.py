@@ -0,0 +1,82 @@
+"""
+Module de nettoyage des valeurs brutes Weather Underground.
+
+Les relevés bruts ("57.0 °F", "87 %", "29.48 in") proviennent d'un petit
+ensemble de chaînes distinctes qui se répètent sur tout le fichier :
+- motif regex précompilé
+- cache mémoire borné chaîne brute → float
+- variante vectorisée pour les Series (une seule analyse par valeur distincte)
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Premier nombre de la chaîne : "57.0 °F" → 57.0, "-3 °C" → -3.0
+NUMBER_PATTERN = re.compile(r"[-+]?\d*\.\d+|\d+")
+
+# Nombre maximal de chaînes distinctes mémorisées
+CLEAN_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=CLEAN_CACHE_SIZE)
+def parse_number(text: str):
+    """Extrait le premier nombre d'une chaîne (None si aucun)."""
+    match = NUMBER_PATTERN.search(text)
+    if match:
+        return float(match.group())
+    return None
+
+
+def clean_value(val):
+    """
+    Nettoie une valeur brute.
+    Extrait les nombres des chaînes (ex: "57.0 °F" → 57.0)
+    """
+    # Cas fréquents traités sans pd.isna
+    value_type = type(val)
+    if value_type is str:
+        return parse_number(val) if val != "" else None
+    if value_type is float:
+        return None if val != val else val
+    if value_type is int:
+        return float(val)
+    if val is None:
+        return None
+
+    # Cas génériques (types NumPy, NaT...)
+    if pd.isna(val) or val == "":
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+    return parse_number(str(val))
+
+
+def clean_series(series: pd.Series, convert=None) -> pd.Series:
+    """
+    Version vectorisée de clean_value (+ conversion optionnelle) pour une Series.
+    Chaque valeur distincte n'est analysée et convertie qu'une seule fois.
+
+    Args:
+        series: Valeurs brutes
+        convert: Fonction de conversion appliquée au float nettoyé (ex: fahrenheit_to_celsius)
+
+    Returns:
+        pd.Series: float64 (NaN pour les valeurs absentes ou non numériques)
+    """
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    except TypeError:
+        # Valeurs non hachables (listes, dicts) : repli ligne à ligne
+        cleaned = series.apply(clean_value)
+        return (cleaned.apply(convert) if convert else cleaned).astype(float)
+
+    values = [clean_value(u) for u in uniques]
+    if convert is not None:
+        values = [convert(v) for v in values]
+
+    # Dernière case = NaN, utilisée par le code -1 (valeur manquante)
+    lookup = np.array([np.nan if v is None else v for v in values] + [np.nan], dtype=np.float64)
+    return pd.Series(lookup[codes], index=series.index, name=series.name)
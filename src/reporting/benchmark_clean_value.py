@@ -0,0 +1,109 @@
+"""
+Micro-benchmark de clean_value sur une distribution réaliste de valeurs
+Weather Underground (chaînes répétées "57.0 °F", "87 %", valeurs vides,
+nombres déjà typés...).
+
+Compare :
+- l'implémentation historique (re.search non compilé + pd.isna à chaque cellule)
+- clean_value (regex précompilée + cache borné)
+- clean_series (vectorisée, une analyse par valeur distincte)
+
+Usage:
+    python -m src.reporting.benchmark_clean_value
+    python -m src.reporting.benchmark_clean_value --rows 5000000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.processing.value_parser import clean_value, clean_series, parse_number
+
+
+def legacy_clean_value(val):
+    """Implémentation d'origine (référence)."""
+    if pd.isna(val) or val == "":
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+    match = re.search(r"[-+]?\d*\.\d+|\d+", str(val))
+    if match:
+        return float(match.group())
+    return None
+
+
+def generate_values(rows: int, seed: int = 42) -> list:
+    """
+    Distribution réaliste d'une colonne brute :
+    ~90% chaînes avec unité (ensemble restreint), ~5% nombres, ~5% vides / None / texte.
+    """
+    rng = random.Random(seed)
+    units = ["°F", "%", "mph", "in"]
+    values = []
+    for _ in range(rows):
+        draw = rng.random()
+        if draw < 0.90:
+            values.append(f"{rng.randint(200, 900) / 10:.1f} {rng.choice(units)}")
+        elif draw < 0.95:
+            values.append(rng.uniform(0, 100))
+        elif draw < 0.97:
+            values.append("")
+        elif draw < 0.99:
+            values.append(None)
+        else:
+            values.append("--")
+    return values
+
+
+def timed(label: str, func, rows: int) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:32} : {elapsed * 1000:9.1f} ms | {rows / elapsed:>12.0f} valeurs/s")
+    return elapsed
+
+
+def run_benchmark(rows: int) -> dict:
+    values = generate_values(rows)
+    series = pd.Series(values, dtype=object)
+
+    print("=" * 60)
+    print(f"📊 MICRO-BENCHMARK clean_value ({rows} valeurs, "
+          f"{series.nunique()} distinctes)")
+    print("=" * 60)
+
+    # Vérification d'équivalence avant mesure
+    legacy = [legacy_clean_value(v) for v in values[:10000]]
+    fast = [clean_value(v) for v in values[:10000]]
+    assert legacy == fast, "clean_value diverge de l'implémentation historique"
+
+    parse_number.cache_clear()
+    results = {
+        "legacy": timed("Historique (re.search + isna)", lambda: series.apply(legacy_clean_value), rows),
+        "cached": timed("clean_value (compilée + cache)", lambda: series.apply(clean_value), rows),
+        "vectorized": timed("clean_series (vectorisée)", lambda: clean_series(series), rows),
+    }
+
+    print(f"\n   Gain clean_value  : x{results['legacy'] / results['cached']:.1f}")
+    print(f"   Gain clean_series : x{results['legacy'] / results['vectorized']:.1f}")
+    info = parse_number.cache_info()
+    print(f"   Cache regex       : {info.hits} hits / {info.misses} misses")
+    print("=" * 60)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark de clean_value")
+    parser.add_argument("--rows", type=int, default=1000000, help="Nombre de valeurs")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run_benchmark(parse_args().rows)
@@ -0,0 +1,98 @@
+"""
+Benchmark des décodeurs JSON pour l'ingestion des fichiers Airbyte JSONL.
+
+Génère un fichier Weather Underground synthétique (1 Go par défaut, avec
+quelques lignes mal formées), puis mesure chaque backend disponible
+(json / orjson / msgspec) via iter_jsonl_records, ainsi que la lecture
+historique ligne à ligne (json.loads sur chaque ligne texte).
+
+Usage:
+    python -m src.reporting.benchmark_json
+    python -m src.reporting.benchmark_json --size-mb 100
+    python -m src.reporting.benchmark_json --file data/downloaded/station_ichtegem_BE.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.processing import cleaner
+from src.reporting.synthetic_data import write_weather_underground_file
+
+
+def legacy_line_by_line(file_path: str) -> int:
+    """Lecture historique : json.loads ligne par ligne en mode texte."""
+    count = 0
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if "_airbyte_data" in record:
+                    count += 1
+            except json.JSONDecodeError:
+                continue
+    return count
+
+
+def backend_records(file_path: str, backend: str) -> int:
+    count = 0
+    for record in cleaner.iter_jsonl_records(file_path, backend=backend):
+        if isinstance(record, dict) and "_airbyte_data" in record:
+            count += 1
+    return count
+
+
+def run_benchmark(file_path: str) -> dict:
+    size_mb = os.path.getsize(file_path) / 1024 / 1024
+
+    print("=" * 60)
+    print("📊 BENCHMARK DÉCODAGE JSONL")
+    print("=" * 60)
+    print(f"   Fichier : {file_path} ({size_mb:.0f} Mo)")
+
+    candidates = [("legacy (json ligne à ligne)", lambda: legacy_line_by_line(file_path))]
+    for backend in ["json", "orjson", "msgspec"]:
+        name, _, _ = cleaner.get_json_backend(backend)
+        if name == backend:
+            candidates.append((f"{backend} (blocs)", lambda b=backend: backend_records(file_path, b)))
+        else:
+            print(f"   ⚪ {backend} non installé")
+
+    results = {}
+    for label, func in candidates:
+        start = time.perf_counter()
+        records = func()
+        elapsed = time.perf_counter() - start
+        results[label] = {"records": records, "seconds": elapsed, "mb_per_sec": size_mb / elapsed}
+        print(f"   {label:28} : {records:>10} enr. | {elapsed:7.2f}s | {size_mb / elapsed:7.1f} Mo/s "
+              f"| {records / elapsed:>10.0f} enr./s")
+
+    counts = {r["records"] for r in results.values()}
+    print("\n   " + ("✅ Même nombre d'enregistrements pour tous les backends" if len(counts) == 1
+                     else f"❌ Nombres d'enregistrements différents : {counts}"))
+    print("=" * 60)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des décodeurs JSON")
+    parser.add_argument("--size-mb", type=int, default=1024, help="Taille du fichier synthétique (Mo)")
+    parser.add_argument("--file", default=None, help="Fichier JSONL existant (pas de génération)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.file:
+        run_benchmark(args.file)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "station_synthetic.jsonl")
+            print(f"🧪 Génération d'un fichier synthétique de {args.size_mb} Mo...")
+            write_weather_underground_file(path, size_mb=args.size_mb)
+            run_benchmark(path)
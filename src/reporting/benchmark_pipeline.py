@@ -0,0 +1,241 @@
+"""
+Benchmark de débit du pipeline de bout en bout (fichiers Airbyte synthétiques).
+
+Génère un fichier Weather Underground bruité (voir synthetic_data) puis mesure
+séparément chaque étape et la chaîne complète :
+- load      : load_airbyte_jsonl (cache de staging désactivé)
+- transform : transform_weather_data (détail convert / build / validate par spans)
+- validate  : validate_weather_data sur les documents transformés
+- insert    : MongoConnector.insert_documents (mongomock, ou serveur réel avec --mongo)
+- end_to_end: process_file + insert_documents dans une collection vide
+
+Résultats (lignes/s, durée, pic RSS) écrits en JSON dans logs/benchmarks/.
+Avec --baseline, comparaison au fichier de référence : code retour 1 si une
+étape perd plus de --tolerance de débit.
+
+Usage:
+    python -m src.reporting.benchmark_pipeline --rows 100000
+    python -m src.reporting.benchmark_pipeline --rows 1000000 --mongo --baseline logs/benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from src.monitoring.spans import SpanRecorder, peak_rss_mb, set_recorder
+from src.reporting.synthetic_data import write_weather_underground_file
+
+# Nom connu de STATION_METADATA (documents construits comme en production)
+BENCH_FILENAME = "station_la_madelaine_FR.jsonl"
+BENCH_DB_NAME = "greenandcoop_benchmark"
+DEFAULT_OUTPUT_DIR = "logs/benchmarks"
+STAGES = ("load", "transform", "validate", "insert", "end_to_end")
+
+
+# =============================================================================
+# MESURES
+# =============================================================================
+
+def _measure(rows_in: int, func):
+    """Exécute func() et retourne (résultat, mesures de l'étape)."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    return result, {
+        "rows": rows_in,
+        "wall_s": round(elapsed, 4),
+        "rows_per_s": round(rows_in / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(peak_rss_mb() or 0, 1)
+    }
+
+
+def _open_collection(use_mongo: bool):
+    """Connecteur prêt à l'emploi sur une collection de benchmark vide."""
+    from src.connectors.mongo_connector import MongoConnector
+
+    connector = MongoConnector()
+    if use_mongo:
+        connector.db_name = os.getenv("BENCHMARK_DB_NAME", BENCH_DB_NAME)
+        connector.connect()
+        connector.db.drop_collection(MongoConnector.COLLECTION_NAME)
+        connector.init_db(force=True)
+    else:
+        import mongomock
+        # Pas d'index : mongomock ignore les filtres partiels de l'index unique des stations
+        connector.client = mongomock.MongoClient()
+        connector.db = connector.client[BENCH_DB_NAME]
+        connector.indexes_verified = True
+    return connector
+
+
+def _reset_collection(connector):
+    from src.connectors.mongo_connector import MongoConnector
+    connector.db[MongoConnector.COLLECTION_NAME].delete_many({})
+
+
+def run_benchmark(rows: int, use_mongo: bool = False, noise: float = 0.02, work_dir: str = None) -> dict:
+    """
+    Génère les données et mesure chaque étape.
+
+    Returns:
+        dict: {"config": ..., "stages": {nom: {rows, wall_s, rows_per_s, peak_rss_mb}}, "spans": ...}
+    """
+    # Cache de staging désactivé
+    overrides = {"STAGING_CACHE_ENABLED": "false"}
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        return _run_stages(rows, use_mongo, noise, work_dir)
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _run_stages(rows: int, use_mongo: bool, noise: float, work_dir: str) -> dict:
+    from src.processing.cleaner import load_airbyte_jsonl, process_file, transform_weather_data
+    from src.processing.validator import validate_weather_data
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="benchmark_pipeline_")
+    path = os.path.join(work_dir, BENCH_FILENAME)
+
+    print(f"📝 Génération de {rows} lignes synthétiques -> {path}")
+    generated = write_weather_underground_file(path, rows=rows, noise=noise)
+    stages = {}
+
+    _, stages["load"] = _measure(generated, lambda: load_airbyte_jsonl(path))
+
+    recorder = SpanRecorder()
+    set_recorder(recorder)
+    documents, stages["transform"] = _measure(generated, lambda: transform_weather_data(path, BENCH_FILENAME))
+    set_recorder(SpanRecorder())
+
+    _, stages["validate"] = _measure(len(documents), lambda: validate_weather_data(documents))
+
+    connector = _open_collection(use_mongo)
+    try:
+        _, stages["insert"] = _measure(len(documents), lambda: connector.insert_documents(documents))
+        _reset_collection(connector)
+
+        def end_to_end():
+            return connector.insert_documents(process_file(path, BENCH_FILENAME))
+
+        inserted, stages["end_to_end"] = _measure(generated, end_to_end)
+        stages["end_to_end"]["inserted"] = inserted
+        if use_mongo:
+            connector.db.drop_collection(connector.COLLECTION_NAME)
+    finally:
+        connector.close()
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "config": {
+            "rows": generated,
+            "valid_documents": len(documents),
+            "noise": noise,
+            "backend": "mongod" if use_mongo else "mongomock",
+            "python": sys.version.split()[0]
+        },
+        "stages": stages,
+        "spans": recorder.summary()
+    }
+
+
+# =============================================================================
+# COMPARAISON
+# =============================================================================
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = 0.10) -> list:
+    """
+    Compare les débits à ceux de la référence.
+
+    Returns:
+        list: dicts {stage, baseline, current, ratio, regression}
+    """
+    comparison = []
+    for stage in STAGES:
+        current = (results["stages"].get(stage) or {}).get("rows_per_s")
+        reference = (baseline.get("stages", {}).get(stage) or {}).get("rows_per_s")
+        if not current or not reference:
+            continue
+        ratio = current / reference
+        comparison.append({
+            "stage": stage,
+            "baseline": reference,
+            "current": current,
+            "ratio": round(ratio, 3),
+            "regression": ratio < 1 - tolerance
+        })
+    return comparison
+
+
+def write_results(results: dict, output_dir: str = DEFAULT_OUTPUT_DIR) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def print_results(results: dict, comparison: list = None):
+    config = results["config"]
+    print("\n" + "=" * 72)
+    print(f"📊 BENCHMARK PIPELINE - {config['rows']} lignes ({config['backend']})")
+    print("=" * 72)
+    for stage, entry in results["stages"].items():
+        print(f"   {stage:12} : {entry['rows']:>10} lignes | {entry['wall_s']:8.3f}s | "
+              f"{entry['rows_per_s'] or 0:>12.0f} lignes/s | RSS {entry['peak_rss_mb']:.0f} Mo")
+
+    if comparison:
+        print("\n   Comparaison à la référence :")
+        for entry in comparison:
+            flag = "❌" if entry["regression"] else "✅"
+            print(f"   {flag} {entry['stage']:12} : {entry['current']:>12.0f} vs "
+                  f"{entry['baseline']:>12.0f} lignes/s (x{entry['ratio']:.2f})")
+    print("=" * 72)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de débit du pipeline ETL")
+    parser.add_argument("--rows", type=int, default=100000, help="Lignes synthétiques (10k à 10M)")
+    parser.add_argument("--noise", type=float, default=0.02, help="Part de relevés bruités")
+    parser.add_argument("--mongo", action="store_true",
+                        help="Serveur MongoDB réel (config/.env, base BENCHMARK_DB_NAME) au lieu de mongomock")
+    parser.add_argument("--baseline", help="Fichier JSON de référence")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Perte de débit tolérée (0.10 = 10 %%)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Dossier des résultats")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.mongo:
+        from dotenv import load_dotenv
+        load_dotenv("config/.env")
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_pipeline_") as work_dir:
+        results = run_benchmark(args.rows, use_mongo=args.mongo, noise=args.noise, work_dir=work_dir)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            comparison = compare_to_baseline(results, json.load(f), args.tolerance)
+        results["baseline"] = {"path": args.baseline, "tolerance": args.tolerance, "stages": comparison}
+
+    print_results(results, comparison)
+    print(f"\n💾 Résultats : {write_results(results, args.output_dir)}")
+
+    if comparison and any(entry["regression"] for entry in comparison):
+        print("❌ Régression de débit détectée.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Benchmark de lecture MongoDB → pandas.
+Compare la voie "dictionnaires" (list(find) + pd.json_normalize) à la
+lecture colonnaire de src.connectors.arrow_reader (débit et pic mémoire).
+
+Usage:
+    python -m src.reporting.benchmark_reader
+    python -m src.reporting.benchmark_reader --parallelism 4 --splits 4
+    python -m src.reporting.benchmark_reader --mongomock --rows 200000
+
+En mode --mongomock, seul le pic mémoire est représentatif
+(le filtrage mongomock est en Python pur et domine le temps de lecture).
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+load_dotenv("config/.env")
+
+from src.connectors.arrow_reader import read_measurements_frame
+
+COLLECTION_NAME = "weather_data"
+
+
+def get_mongo_client():
+    """Crée un client MongoDB (Atlas ou Local)."""
+    atlas_uri = os.getenv("MONGO_URI")
+
+    if atlas_uri:
+        print("📡 Mode : MongoDB Atlas")
+        return MongoClient(atlas_uri, serverSelectionTimeoutMS=30000)
+
+    user = os.getenv("MONGO_INITDB_ROOT_USERNAME")
+    pwd = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
+    host = os.getenv("MONGO_HOST", "localhost")
+    port = os.getenv("MONGO_PORT", "27017")
+    rs_name = os.getenv("MONGO_REPLICA_SET")
+
+    if rs_name:
+        uri = f"mongodb://{user}:{pwd}@{host}:{port}/?authSource=admin&replicaSet={rs_name}"
+        print(f"📡 Mode : ReplicaSet Local")
+    else:
+        uri = f"mongodb://{user}:{pwd}@{host}:{port}/?authSource=admin&directConnection=true"
+        print(f"📡 Mode : Standalone Local")
+
+    return MongoClient(uri, serverSelectionTimeoutMS=30000)
+
+
+def seed_mongomock(rows: int):
+    """Crée une collection mongomock remplie de mesures synthétiques."""
+    import mongomock
+
+    print(f"🧪 Mode : mongomock ({rows} mesures synthétiques)")
+    collection = mongomock.MongoClient().db[COLLECTION_NAME]
+    start = datetime(2025, 1, 1)
+    stations = ["ILAMAD25", "IICHTE19", "STATION03", "STATION04"]
+    collection.insert_many([{
+        "record_type": "measurement",
+        "station_id": stations[i % len(stations)],
+        "station_name": "Synthetic",
+        "source": "weather_underground",
+        "location": {"city": "Test", "country": "FR", "latitude": 50.6, "longitude": 3.0, "elevation": 20},
+        "timestamp": start + timedelta(minutes=5 * i),
+        "measurements": {
+            "temperature_celsius": 10.0 + (i % 100) / 10,
+            "humidity_percent": 50.0 + i % 50,
+            "wind_speed_kmh": float(i % 30),
+            "pressure_hpa": 1000.0 + i % 40
+        }
+    } for i in range(rows)])
+    return collection
+
+
+def measure(label: str, func):
+    """Exécute func en mesurant le temps et le pic mémoire Python."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rows = len(df)
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"   {label:28} : {rows:>9} lignes | {elapsed:7.2f}s | {rate:>10.0f} lignes/s | "
+          f"pic {peak / 1024 / 1024:7.1f} Mo")
+    return {"rows": rows, "seconds": elapsed, "rows_per_sec": rate, "peak_mb": peak / 1024 / 1024}
+
+
+def dict_route(collection):
+    """Voie historique : curseur → liste de dicts → DataFrame."""
+    docs = list(collection.find({"record_type": "measurement"}))
+    return pd.json_normalize(docs)
+
+
+def run_benchmark(collection, parallelism: int = 1, splits: int = 1) -> dict:
+    print("=" * 60)
+    print("📊 BENCHMARK LECTURE MongoDB → pandas")
+    print("=" * 60)
+
+    results = {
+        "dict_route": measure("Dictionnaires (json_normalize)", lambda: dict_route(collection)),
+        "columnar": measure("Colonnaire (séquentiel)", lambda: read_measurements_frame(collection)),
+    }
+    if parallelism > 1 or splits > 1:
+        results["columnar_parallel"] = measure(
+            f"Colonnaire (x{parallelism}, {splits} plages)",
+            lambda: read_measurements_frame(collection, parallelism=parallelism, splits_per_station=splits)
+        )
+
+    base = results["dict_route"]
+    best = results.get("columnar_parallel", results["columnar"])
+    if base["rows_per_sec"] and base["peak_mb"]:
+        print(f"\n   Gain débit   : x{best['rows_per_sec'] / base['rows_per_sec']:.1f}")
+        print(f"   Mémoire      : {best['peak_mb'] / base['peak_mb'] * 100:.0f}% de la voie dictionnaires")
+    print("=" * 60)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lecture colonnaire MongoDB")
+    parser.add_argument("--mongomock", action="store_true", help="Utilise une base simulée")
+    parser.add_argument("--rows", type=int, default=100000, help="Lignes synthétiques (mongomock)")
+    parser.add_argument("--parallelism", type=int, default=1, help="Lectures simultanées")
+    parser.add_argument("--splits", type=int, default=1, help="Plages temporelles par station")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mongomock:
+        coll = seed_mongomock(args.rows)
+    else:
+        client = get_mongo_client()
+        coll = client[os.getenv("MONGO_DB_NAME", "greenandcoop_weather")][COLLECTION_NAME]
+    run_benchmark(coll, parallelism=args.parallelism, splits=args.splits)
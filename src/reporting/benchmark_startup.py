@@ -0,0 +1,110 @@
+"""
+Mesure du temps de démarrage du point d'entrée ETL (python -X importtime).
+
+Lance N interpréteurs frais, analyse la sortie -X importtime et affiche :
+- le temps d'import cumulé du module (médiane)
+- les modules les plus coûteux (temps cumulé)
+- les dépendances lourdes chargées à l'import (pandas, boto3, pymongo...)
+
+Usage:
+    python -m src.reporting.benchmark_startup
+    python -m src.reporting.benchmark_startup --module src.processing.cleaner --runs 5
+    python -m src.reporting.benchmark_startup --budget-ms 150   # code retour 1 si dépassé
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+# Dépendances qui ne doivent être chargées que dans l'étape qui les utilise
+HEAVY_MODULES = ("pandas", "numpy", "boto3", "botocore", "pymongo", "pydantic", "pyarrow", "openpyxl")
+
+# "import time:   self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(output: str) -> list:
+    """
+    Analyse la sortie stderr de -X importtime.
+
+    Returns:
+        list: dicts {module, self_us, cumulative_us, depth}
+    """
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            "module": module,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(indent) - 1) // 2
+        })
+    return entries
+
+
+def measure_import(module: str = "src.main") -> dict:
+    """
+    Importe le module dans un interpréteur frais et mesure son coût.
+
+    Returns:
+        dict: {module, total_ms, entries, heavy_loaded}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    entries = parse_importtime(result.stderr)
+    total_us = next((e["cumulative_us"] for e in entries if e["module"] == module and e["depth"] == 0), 0)
+    loaded = {e["module"].split(".")[0] for e in entries}
+    return {
+        "module": module,
+        "total_ms": total_us / 1000,
+        "entries": entries,
+        "heavy_loaded": sorted(m for m in HEAVY_MODULES if m in loaded)
+    }
+
+
+def run_benchmark(module: str = "src.main", runs: int = 5, top: int = 10) -> dict:
+    measures = [measure_import(module) for _ in range(runs)]
+    totals = [m["total_ms"] for m in measures]
+    median_ms = statistics.median(totals)
+
+    print("=" * 60)
+    print(f"🚀 TEMPS DE DÉMARRAGE : import {module} ({runs} exécutions)")
+    print("=" * 60)
+    print(f"   Médiane : {median_ms:8.1f} ms (min {min(totals):.1f} / max {max(totals):.1f})")
+
+    print(f"\n   Top {top} (cumulé, dernière exécution) :")
+    last = sorted(measures[-1]["entries"], key=lambda e: e["cumulative_us"], reverse=True)
+    for entry in last[:top]:
+        print(f"   - {entry['module']:40} {entry['cumulative_us'] / 1000:8.1f} ms")
+
+    heavy = measures[-1]["heavy_loaded"]
+    print(f"\n   Dépendances lourdes chargées : {', '.join(heavy) if heavy else 'aucune ✅'}")
+    print("=" * 60)
+    return {"module": module, "median_ms": median_ms, "heavy_loaded": heavy}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du temps d'import du point d'entrée")
+    parser.add_argument("--module", default="src.main", help="Module à importer")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre d'interpréteurs lancés")
+    parser.add_argument("--top", type=int, default=10, help="Nombre de modules affichés")
+    parser.add_argument("--budget-ms", type=float, help="Budget (ms) : code retour 1 si dépassé")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run_benchmark(args.module, args.runs, args.top)
+    if args.budget_ms is not None and result["median_ms"] > args.budget_ms:
+        print(f"❌ Budget dépassé : {result['median_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+        sys.exit(1)
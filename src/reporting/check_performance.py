@@ -173,6 +173,24 @@ def measure_access_time():
         print(f"   ⏱️  Temps : {elapsed:.2f} ms")
         print(f"   {'✅ Excellent' if elapsed < 100 else '⚠️ Acceptable' if elapsed < 500 else '❌ Lent'}")
         
+        # ─────────────────────────────────────────────────────────────
+        # TEST 6 : Dernière mesure de chaque station (station_latest)
+        # ─────────────────────────────────────────────────────────────
+        print("\n" + "-" * 60)
+        print("🔍 Test 6 : Dernière mesure par station (collection station_latest)")
+        
+        start = time.perf_counter()
+        latest = list(db["station_latest"].find({}).sort("_id", 1))
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        if latest:
+            results.append(("Dernières mesures", elapsed))
+            print(f"   Stations: {len(latest)}")
+            print(f"   ⏱️  Temps : {elapsed:.2f} ms")
+            print(f"   {'✅ Excellent' if elapsed < 50 else '⚠️ Acceptable' if elapsed < 100 else '❌ Lent'}")
+        else:
+            print("   ⚠️ Collection vide : python -m src.connectors.latest_readings --rebuild")
+        
         # ─────────────────────────────────────────────────────────────
         # RÉSUMÉ
         # ─────────────────────────────────────────────────────────────
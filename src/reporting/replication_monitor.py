@@ -0,0 +1,454 @@
+"""
+Moniteur continu de réplication MongoDB.
+Version "monitoring" de test_replication : au lieu d'un seul document de test,
+envoie une série de sondes et mesure la distribution de la latence
+écriture PRIMARY → visibilité SECONDARY, ainsi que le retard d'optime
+(replSetGetStatus) de chaque membre, avec ou sans charge d'écriture.
+
+Les métriques sont produites en JSON pour dimensionner la taille des batchs
+et le write concern du chargement ETL.
+
+Usage:
+    python -m src.reporting.replication_monitor
+    python -m src.reporting.replication_monitor --probes 200 --interval 0.2
+    python -m src.reporting.replication_monitor --load synthetic --batch-size 1000 --write-concern majority
+    python -m src.reporting.replication_monitor --load pipeline --output logs/replication_metrics.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
+from pymongo.write_concern import WriteConcern
+from dotenv import load_dotenv
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(PROJECT_ROOT)
+load_dotenv("config/.env")
+
+# Collection technique utilisée pour les sondes et la charge synthétique
+PROBE_COLLECTION = "test_collection"
+LOAD_COLLECTION = "replication_load"
+# Collection alimentée par le pipeline (charge "pipeline")
+PIPELINE_COLLECTION = "weather_data"
+PIPELINE_COMMAND = [sys.executable, "-m", "src.main"]
+
+
+# =============================================================================
+# CONNEXIONS
+# =============================================================================
+
+def get_mongo_client():
+    """Crée un client MongoDB vers le PRIMARY (Atlas ou Local)."""
+    atlas_uri = os.getenv("MONGO_URI")
+
+    if atlas_uri:
+        return MongoClient(atlas_uri, serverSelectionTimeoutMS=30000)
+
+    user = os.getenv("MONGO_INITDB_ROOT_USERNAME")
+    pwd = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
+    host = os.getenv("MONGO_HOST", "localhost")
+    port = os.getenv("MONGO_PORT", "27017")
+    rs_name = os.getenv("MONGO_REPLICA_SET")
+
+    if rs_name:
+        uri = f"mongodb://{user}:{pwd}@{host}:{port}/?authSource=admin&replicaSet={rs_name}"
+    else:
+        uri = f"mongodb://{user}:{pwd}@{host}:{port}/?authSource=admin&directConnection=true"
+
+    return MongoClient(uri, serverSelectionTimeoutMS=30000)
+
+
+def get_secondary_client():
+    """
+    Crée un client qui lit sur un SECONDARY.
+    - Atlas : readPreference=secondary
+    - Local : connexion directe au nœud mongo2 (port 27018 par défaut)
+    """
+    atlas_uri = os.getenv("MONGO_URI")
+
+    if atlas_uri:
+        return MongoClient(atlas_uri, serverSelectionTimeoutMS=30000, readPreference='secondary')
+
+    user = os.getenv("MONGO_INITDB_ROOT_USERNAME")
+    pwd = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
+    host = os.getenv("MONGO_SECONDARY_HOST", "localhost")
+    port = os.getenv("MONGO_SECONDARY_PORT", "27018")
+    uri = f"mongodb://{user}:{pwd}@{host}:{port}/?authSource=admin&directConnection=true"
+
+    return MongoClient(uri, serverSelectionTimeoutMS=10000, readPreference='secondaryPreferred')
+
+
+# =============================================================================
+# CALCULS DES MÉTRIQUES
+# =============================================================================
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Percentile par interpolation linéaire sur une liste déjà triée."""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize_latencies(values: list) -> dict:
+    """
+    Résume une série de latences (ms) en distribution.
+
+    Returns:
+        dict: count, min, mean, p50, p90, p95, p99, max (arrondis à 0.01)
+    """
+    if not values:
+        return {"count": 0}
+
+    ordered = sorted(values)
+    summary = {
+        "count": len(ordered),
+        "min": ordered[0],
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1],
+    }
+    return {k: (round(v, 2) if isinstance(v, float) else v) for k, v in summary.items()}
+
+
+def compute_member_lag(status: dict) -> list:
+    """
+    Calcule le retard d'optime de chaque membre par rapport au PRIMARY.
+
+    Args:
+        status: Réponse de la commande replSetGetStatus
+
+    Returns:
+        list: [{name, state, health, lag_seconds}] (lag None pour les arbitres)
+    """
+    members = status.get("members", [])
+    primary = next((m for m in members if m.get("stateStr") == "PRIMARY"), None)
+    primary_optime = primary.get("optimeDate") if primary else None
+
+    lags = []
+    for member in members:
+        optime = member.get("optimeDate")
+        lag = None
+        if primary_optime is not None and optime is not None and member.get("stateStr") != "ARBITER":
+            lag = max((primary_optime - optime).total_seconds(), 0.0)
+        lags.append({
+            "name": member.get("name"),
+            "state": member.get("stateStr"),
+            "health": member.get("health"),
+            "lag_seconds": lag
+        })
+    return lags
+
+
+def aggregate_member_lag(samples: list) -> dict:
+    """
+    Agrège plusieurs échantillons de compute_member_lag par membre.
+
+    Returns:
+        dict: {name: {state, samples, last, mean, max}}
+    """
+    by_member = {}
+    for sample in samples:
+        for member in sample:
+            entry = by_member.setdefault(member["name"], {"state": member["state"], "values": []})
+            entry["state"] = member["state"]
+            if member["lag_seconds"] is not None:
+                entry["values"].append(member["lag_seconds"])
+
+    result = {}
+    for name, entry in by_member.items():
+        values = entry["values"]
+        result[name] = {
+            "state": entry["state"],
+            "samples": len(values),
+            "last": values[-1] if values else None,
+            "mean": round(sum(values) / len(values), 3) if values else None,
+            "max": max(values) if values else None
+        }
+    return result
+
+
+# =============================================================================
+# SONDES ET ÉCHANTILLONNAGE
+# =============================================================================
+
+def probe_visibility(primary_coll, secondary_coll, monitor_id: str, seq: int,
+                     timeout_s: float = 10.0, poll_s: float = 0.005):
+    """
+    Insère un document sur le PRIMARY puis mesure le délai avant
+    qu'il soit lisible sur le SECONDARY.
+
+    Returns:
+        float | None: Latence en ms, None si non visible avant timeout
+    """
+    doc = {
+        "type": "replication_probe",
+        "monitor_id": monitor_id,
+        "seq": seq,
+        "timestamp": datetime.now()
+    }
+    start = time.perf_counter()
+    doc_id = primary_coll.insert_one(doc).inserted_id
+    deadline = start + timeout_s
+
+    while time.perf_counter() < deadline:
+        try:
+            if secondary_coll.find_one({"_id": doc_id}, {"_id": 1}) is not None:
+                return (time.perf_counter() - start) * 1000
+        except PyMongoError:
+            pass
+        time.sleep(poll_s)
+    return None
+
+
+def sample_member_lag(client):
+    """Lit replSetGetStatus ; retourne None si le serveur n'est pas un ReplicaSet."""
+    try:
+        status = client.admin.command("replSetGetStatus")
+    except OperationFailure:
+        return None
+    return compute_member_lag(status)
+
+
+class LoadGenerator(threading.Thread):
+    """
+    Génère une charge d'écriture pendant la mesure.
+    - "synthetic" : insert_many(ordered=False) de mesures factices, comme le chargeur ETL
+    - "pipeline"  : exécute le vrai pipeline dans un sous-processus (python -m src.main),
+      interrompu (SIGTERM) par stop() s'il tourne encore à la fin des sondes ; les
+      documents chargés sont comptés par différence sur weather_data (approximatif si
+      d'autres écritures ont lieu en même temps). Un run interrompu reprend à
+      l'exécution suivante depuis ses points de reprise.
+    """
+
+    def __init__(self, client, db_name: str, mode: str, batch_size: int, write_concern):
+        super().__init__(daemon=True)
+        self.client = client
+        self.db_name = db_name
+        self.mode = mode
+        self.batch_size = batch_size
+        self.write_concern = write_concern
+        self.stop_event = threading.Event()
+        self.batch_latencies = []
+        self.documents = 0
+        self.errors = 0
+        self.interrupted = False
+
+    def _synthetic_batch(self, batch_no: int) -> list:
+        now = datetime.now()
+        return [{
+            "record_type": "measurement",
+            "station_id": "LOADTEST",
+            "source": "replication_monitor",
+            "timestamp": now,
+            "seq": batch_no * self.batch_size + i,
+            "measurements": {"temperature_celsius": 15.0, "humidity_percent": 80.0}
+        } for i in range(self.batch_size)]
+
+    def _run_pipeline(self):
+        collection = self.client[self.db_name][PIPELINE_COLLECTION]
+        before = collection.estimated_document_count()
+        process = subprocess.Popen(PIPELINE_COMMAND, cwd=PROJECT_ROOT)
+        try:
+            while process.poll() is None and not self.stop_event.wait(0.5):
+                pass
+            if process.poll() is None:
+                self.interrupted = True
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+        if process.returncode != 0 and not self.interrupted:
+            self.errors += 1
+        self.documents = collection.estimated_document_count() - before
+
+    def run(self):
+        if self.mode == "pipeline":
+            self._run_pipeline()
+            return
+
+        collection = self.client[self.db_name][LOAD_COLLECTION].with_options(
+            write_concern=WriteConcern(w=self.write_concern)
+        )
+        batch_no = 0
+        while not self.stop_event.is_set():
+            batch = self._synthetic_batch(batch_no)
+            start = time.perf_counter()
+            try:
+                collection.insert_many(batch, ordered=False)
+                self.documents += len(batch)
+            except PyMongoError:
+                self.errors += 1
+            self.batch_latencies.append((time.perf_counter() - start) * 1000)
+            batch_no += 1
+
+    def stop(self):
+        self.stop_event.set()
+
+    def cleanup(self):
+        if self.mode == "synthetic":
+            self.client[self.db_name][LOAD_COLLECTION].drop()
+
+
+# =============================================================================
+# MONITEUR
+# =============================================================================
+
+def parse_write_concern(value: str):
+    """'majority' reste une chaîne, sinon conversion en entier (w=1, w=2...)."""
+    return value if value == "majority" else int(value)
+
+
+def run_monitor(probes: int = 50, interval: float = 0.5, timeout: float = 10.0,
+                load: str = "none", batch_size: int = 1000, write_concern: str = "1",
+                output: str = None) -> dict:
+    """
+    Exécute la campagne de mesure et retourne les métriques JSON.
+    """
+    db_name = os.getenv("MONGO_DB_NAME", "greenandcoop_weather")
+    monitor_id = uuid.uuid4().hex
+    w = parse_write_concern(write_concern)
+
+    print("=" * 60)
+    print("🔄 MONITEUR DE RÉPLICATION - GreenAndCoop Forecast 2.0")
+    print("=" * 60)
+    print(f"📅 Début : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"   Sondes : {probes} (intervalle {interval}s) | Charge : {load}")
+
+    client_primary = get_mongo_client()
+    client_secondary = get_secondary_client()
+    primary_coll = client_primary[db_name][PROBE_COLLECTION].with_options(
+        write_concern=WriteConcern(w=w)
+    )
+    secondary_coll = client_secondary[db_name][PROBE_COLLECTION]
+
+    generator = None
+    if load != "none":
+        generator = LoadGenerator(client_primary, db_name, load, batch_size, w)
+        generator.start()
+
+    latencies = []
+    timed_out = 0
+    lag_samples = []
+
+    try:
+        for seq in range(probes):
+            latency = probe_visibility(primary_coll, secondary_coll, monitor_id, seq, timeout_s=timeout)
+            if latency is None:
+                timed_out += 1
+                print(f"   ⏳ Sonde {seq + 1}/{probes} : non visible après {timeout}s")
+            else:
+                latencies.append(latency)
+
+            lag = sample_member_lag(client_primary)
+            if lag is not None:
+                lag_samples.append(lag)
+
+            time.sleep(interval)
+    finally:
+        if generator is not None:
+            generator.stop()
+            generator.join(timeout=60)
+            generator.cleanup()
+        client_primary[db_name][PROBE_COLLECTION].delete_many({"monitor_id": monitor_id})
+        client_primary.close()
+        client_secondary.close()
+
+    metrics = {
+        "generated_at": datetime.now().isoformat(),
+        "mode": "Atlas" if os.getenv("MONGO_URI") else "Local",
+        "config": {
+            "probes": probes,
+            "interval_s": interval,
+            "timeout_s": timeout,
+            "write_concern": w,
+            "load": load,
+            "batch_size": batch_size if load == "synthetic" else None
+        },
+        "visibility_latency_ms": summarize_latencies(latencies),
+        "probes": {"sent": probes, "visible": len(latencies), "timed_out": timed_out},
+        "member_lag_seconds": aggregate_member_lag(lag_samples) if lag_samples else None
+    }
+    if generator is not None:
+        metrics["load"] = {
+            "documents": generator.documents,
+            "batches": len(generator.batch_latencies),
+            "errors": generator.errors,
+            "interrupted": generator.interrupted,
+            "batch_insert_latency_ms": summarize_latencies(generator.batch_latencies)
+        }
+
+    # ─────────────────────────────────────────────────────────────
+    # RÉSUMÉ
+    # ─────────────────────────────────────────────────────────────
+    vis = metrics["visibility_latency_ms"]
+    print("\n" + "=" * 60)
+    print("📋 RÉSUMÉ")
+    print("=" * 60)
+    if vis["count"]:
+        print(f"   Latence visibilité : p50={vis['p50']}ms p95={vis['p95']}ms "
+              f"p99={vis['p99']}ms max={vis['max']}ms")
+    print(f"   Sondes visibles    : {len(latencies)}/{probes}")
+    if metrics["member_lag_seconds"]:
+        for name, lag in metrics["member_lag_seconds"].items():
+            print(f"   - {name} ({lag['state']}) : lag max={lag['max']}s")
+    else:
+        print("   ⚠️ replSetGetStatus indisponible (Standalone ou droits insuffisants)")
+    print("=" * 60)
+
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=2, default=str)
+        print(f"💾 Métriques écrites dans {output}")
+    else:
+        print(json.dumps(metrics, indent=2, default=str))
+
+    return metrics
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Moniteur de latence de réplication MongoDB")
+    parser.add_argument("--probes", type=int, default=50, help="Nombre de sondes")
+    parser.add_argument("--interval", type=float, default=0.5, help="Pause entre sondes (s)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Délai max de visibilité (s)")
+    parser.add_argument("--load", choices=["none", "synthetic", "pipeline"], default="none",
+                        help="Charge d'écriture concurrente pendant la mesure")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des batchs synthétiques")
+    parser.add_argument("--write-concern", default="1", help="Write concern (1, 2, majority...)")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_monitor(
+        probes=args.probes,
+        interval=args.interval,
+        timeout=args.timeout,
+        load=args.load,
+        batch_size=args.batch_size,
+        write_concern=args.write_concern,
+        output=args.output
+    )
@@ -0,0 +1,151 @@
+"""
+Générateur de fichiers Airbyte JSONL synthétiques pour les benchmarks.
+
+Produit des fichiers au format des exports réels :
+- Weather Underground : un relevé toutes les 5 minutes (fichiers multi-jours),
+  valeurs avec unités ("57.0 °F"), bruit (valeurs absentes, hors plage,
+  doublons de minute) et lignes JSON mal formées
+- InfoClimat : un enregistrement 'stations' listant N stations de référence
+
+Usage:
+    python -m src.reporting.synthetic_data --rows 1000000 --output data/synthetic
+"""
+
+import argparse
+import json
+import os
+import random
+
+# Début des séries générées (1er décembre 2025, minuit UTC) en ms epoch
+EMITTED_AT_START = 1764547200000
+
+WIND_DIRECTIONS = ["North", "NNE", "NE", "East", "SE", "South", "SW", "West", "NW", "Calm"]
+
+
+def _time_label(minute_of_day: int) -> str:
+    hour = minute_of_day // 60
+    return f"{hour % 12 or 12}:{minute_of_day % 60:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def weather_underground_record(rng: random.Random, index: int, minute: int, noise: float) -> dict:
+    """Enregistrement Airbyte d'un relevé Weather Underground."""
+    data = {
+        "Time": _time_label(minute % 1440),
+        "Temperature": f"{rng.uniform(25, 85):.1f} °F",
+        "Dew Point": f"{rng.uniform(20, 60):.1f} °F",
+        "Humidity": f"{rng.randint(30, 100)} %",
+        "Wind": rng.choice(WIND_DIRECTIONS),
+        "Speed": f"{rng.uniform(0, 30):.1f} mph",
+        "Gust": f"{rng.uniform(0, 40):.1f} mph",
+        "Pressure": f"{rng.uniform(29.2, 30.6):.2f} in",
+        "Precip. Rate.": f"{rng.choice([0, 0, 0, 0.01, 0.05]):.2f} in",
+        "Precip. Accum.": "0.00 in",
+        "UV": str(rng.randint(0, 8)),
+        "Solar": f"{rng.uniform(0, 800):.1f} w/m²"
+    }
+
+    if noise and rng.random() < noise:
+        kind = rng.random()
+        if kind < 0.4:
+            # Capteur absent
+            data[rng.choice(["Temperature", "Humidity", "Speed", "Pressure"])] = rng.choice(["", "--", None])
+        elif kind < 0.7:
+            # Valeur hors plage (rejet Pydantic)
+            data["Humidity"] = f"{rng.randint(101, 150)} %"
+        else:
+            # Relevé sans aucune mesure exploitable (rejet Pydantic)
+            for field in ("Temperature", "Humidity", "Speed", "Pressure"):
+                data[field] = "--"
+
+    return {
+        "_airbyte_ab_id": f"{index:012d}",
+        "_airbyte_emitted_at": EMITTED_AT_START + index * 1000,
+        "_airbyte_data": data
+    }
+
+
+def write_weather_underground_file(path: str, rows: int = None, size_mb: int = None, noise: float = 0.02,
+                                   duplicate_rate: float = 0.01, bad_line_every: int = 10000,
+                                   seed: int = 42) -> int:
+    """
+    Écrit un fichier Weather Underground synthétique.
+
+    Args:
+        rows: Nombre de lignes à écrire (ou size_mb)
+        size_mb: Taille cible du fichier en Mo
+        noise: Part des relevés bruités (valeurs absentes / hors plage)
+        duplicate_rate: Part des relevés répétant la minute précédente
+        bad_line_every: Une ligne JSON mal formée toutes les N lignes (0 : aucune)
+
+    Returns:
+        int: Nombre de lignes écrites (mal formées comprises)
+    """
+    if rows is None and size_mb is None:
+        raise ValueError("rows ou size_mb requis")
+
+    target_bytes = size_mb * 1024 * 1024 if size_mb else None
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    written = 0
+    lines = 0
+    minute = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while (lines < rows) if rows is not None else (written < target_bytes):
+            if bad_line_every and lines % bad_line_every == bad_line_every - 1:
+                line = '{"_airbyte_data": {"Time": "12:04 AM", "Temperature": \n'
+            else:
+                if not (duplicate_rate and rng.random() < duplicate_rate):
+                    minute += 5
+                record = weather_underground_record(rng, lines, minute, noise)
+                line = json.dumps(record, ensure_ascii=False) + "\n"
+            f.write(line)
+            written += len(line.encode("utf-8"))
+            lines += 1
+
+    return lines
+
+
+def write_infoclimat_file(path: str, stations: int = 50, seed: int = 42) -> int:
+    """
+    Écrit un fichier InfoClimat synthétique (un enregistrement 'stations').
+
+    Returns:
+        int: Nombre de stations écrites
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {"stations": [{
+        "id": f"{i:05d}",
+        "name": f"Station {i}",
+        "latitude": round(rng.uniform(49.0, 51.1), 4),
+        "longitude": round(rng.uniform(1.5, 4.3), 4),
+        "elevation": rng.randint(0, 250),
+        "type": rng.choice(["static", "synop"]),
+        "license": {"license": "CC BY", "url": "https://creativecommons.org/licenses/by/4.0/",
+                    "metadonnees": "https://www.infoclimat.fr"}
+    } for i in range(stations)]}
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"_airbyte_emitted_at": EMITTED_AT_START, "_airbyte_data": payload},
+                           ensure_ascii=False) + "\n")
+    return stations
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Génère des fichiers Airbyte synthétiques")
+    parser.add_argument("--rows", type=int, default=100000, help="Lignes Weather Underground")
+    parser.add_argument("--stations", type=int, default=50, help="Stations InfoClimat")
+    parser.add_argument("--noise", type=float, default=0.02, help="Part de relevés bruités")
+    parser.add_argument("--output", default="data/synthetic", help="Dossier de sortie")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    wu_path = os.path.join(args.output, "station_la_madelaine_FR.jsonl")
+    ic_path = os.path.join(args.output, "info_climat_stations.jsonl")
+    rows = write_weather_underground_file(wu_path, rows=args.rows, noise=args.noise)
+    write_infoclimat_file(ic_path, stations=args.stations)
+    print(f"✅ {rows} lignes -> {wu_path}")
+    print(f"✅ {args.stations} stations -> {ic_path}")
@@ -0,0 +1,150 @@
+"""
+Tests du contrôleur d'écritures adaptatives (AIMD).
+"""
+
+import mongomock
+import pytest
+from pymongo import errors
+
+from src.connectors.adaptive_writer import AdaptiveWriteController, is_transient_error
+from src.connectors.mongo_connector import MongoConnector
+
+
+@pytest.fixture
+def controller():
+    return AdaptiveWriteController(batch_size=1000, min_batch=500, max_batch=3000,
+                                   max_concurrency=4, target_latency_s=1.0)
+
+
+class TestAdaptiveWriteController:
+    """Augmentation additive, diminution multiplicative, bornes."""
+
+    def test_additive_increase_within_bounds(self, controller):
+        for _ in range(10):
+            controller.record_success(0.2)
+        assert controller.batch_size == 3000
+        assert controller.concurrency == 4
+
+    def test_slow_batch_halves_size_and_concurrency(self, controller):
+        for _ in range(6):
+            controller.record_success(0.2)
+        assert (controller.batch_size, controller.concurrency) == (3000, 3)
+
+        controller.record_success(2.5)
+        assert (controller.batch_size, controller.concurrency) == (1500, 1)
+        controller.record_failure()
+        controller.record_failure()
+        assert controller.batch_size == 500
+        assert controller.stats["errors"] == 2
+
+    def test_error_rate_blocks_concurrency_increase(self, controller):
+        controller.record_failure()
+        for _ in range(6):
+            controller.record_success(0.2)
+        # 1 erreur sur 7 batchs : au-dessus du seuil de 10 %
+        assert controller.concurrency == 1
+
+    def test_fixed_controller_never_adapts(self):
+        fixed = AdaptiveWriteController.fixed(2)
+        fixed.record_success(0.0)
+        fixed.record_failure()
+        assert (fixed.batch_size, fixed.concurrency, fixed.adaptive) == (2, 1, False)
+
+    def test_transient_errors(self):
+        assert is_transient_error(errors.AutoReconnect("reset"))
+        assert is_transient_error(errors.NetworkTimeout("timeout"))
+        assert not is_transient_error(errors.BulkWriteError({"writeErrors": [], "nInserted": 0}))
+        assert not is_transient_error(errors.WTimeoutError("waiting for replication timed out"))
+        assert not is_transient_error(ValueError())
+
+
+class FlakyCollection:
+    """Collection dont les premiers insert_many échouent (connexion perdue)."""
+
+    def __init__(self, failures: int):
+        self.inner = mongomock.MongoClient()["test"]["weather_data"]
+        self.failures = failures
+
+    def insert_many(self, documents, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise errors.AutoReconnect("connection reset")
+        return self.inner.insert_many(documents, ordered=ordered)
+
+
+class PartialWriteCollection(FlakyCollection):
+    """Premier insert_many appliqué à moitié par le serveur avant la perte de connexion."""
+
+    def __init__(self):
+        super().__init__(failures=0)
+        self.partial = True
+
+    def insert_many(self, documents, ordered=True):
+        if self.partial:
+            self.partial = False
+            self.inner.insert_many(documents[:len(documents) // 2], ordered=ordered)
+            raise errors.AutoReconnect("connection reset after write")
+        return self.inner.insert_many(documents, ordered=ordered)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+class TestAdaptiveInsert:
+    """Insertion concurrente avec nouvel essai des batchs en erreur transitoire."""
+
+    def test_retries_and_backs_off(self, monkeypatch):
+        monkeypatch.setenv("MONGO_INSERT_BATCH_SIZE", "10")
+        monkeypatch.setenv("MONGO_BATCH_MIN", "5")
+        monkeypatch.setenv("MONGO_BATCH_MAX", "40")
+        monkeypatch.setattr("src.connectors.mongo_connector.time.sleep", lambda seconds: None)
+
+        collection = FlakyCollection(failures=2)
+        connector = MongoConnector()
+        connector.db = {MongoConnector.COLLECTION_NAME: collection}
+
+        inserted = connector.insert_documents([{"n": i} for i in range(1000)])
+
+        assert inserted == 1000
+        assert collection.inner.count_documents({}) == 1000
+        assert connector.write_controller.stats["errors"] == 2
+        assert connector.write_controller.stats["peak_concurrency"] > 1
+
+    def test_retry_skips_documents_already_written(self, monkeypatch):
+        """Nouvel essai d'un batch appliqué en partie : aucune mesure dupliquée."""
+        from datetime import datetime, timedelta
+
+        monkeypatch.setattr("src.connectors.mongo_connector.time.sleep", lambda seconds: None)
+        monkeypatch.setenv("MAINTAIN_LATEST", "false")
+        start = datetime(2025, 12, 1)
+        documents = [{"record_type": "measurement", "station_id": "ILAMAD25",
+                      "timestamp": start + timedelta(minutes=5 * i)} for i in range(20)]
+
+        collection = PartialWriteCollection()
+        connector = MongoConnector()
+        connector.db = {MongoConnector.COLLECTION_NAME: collection}
+
+        assert connector.insert_documents(documents, batch_size=20) == 20
+        assert collection.inner.count_documents({}) == 20
+
+    def test_each_batch_recorded_as_span(self, monkeypatch):
+        """Chaque batch inséré apparaît dans le chronométrage (span load.insert_batch)."""
+        from src.monitoring.spans import SpanRecorder, set_recorder, get_recorder
+
+        monkeypatch.setenv("MAINTAIN_LATEST", "false")
+        previous = get_recorder()
+        recorder = SpanRecorder()
+        set_recorder(recorder)
+        try:
+            connector = MongoConnector()
+            connector.db = mongomock.MongoClient()["test"]
+            with recorder.span("load.insert"):
+                connector.insert_documents([{"n": i} for i in range(95)], batch_size=10)
+        finally:
+            set_recorder(previous)
+
+        batches = [record for record in recorder.spans if record["name"] == "load.insert_batch"]
+        assert len(batches) == 10
+        assert sum(record["rows"] for record in batches) == 95
+        assert all(record["parent"] == "load.insert" for record in batches)
+        assert recorder.summary()["load.insert_batch"]["rows"] == 95
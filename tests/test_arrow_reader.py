@@ -0,0 +1,70 @@
+"""
+Tests de la lecture colonnaire MongoDB → pandas (mongomock).
+
+Usage:
+    pytest tests/test_arrow_reader.py -v
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+mongomock = pytest.importorskip("mongomock")
+
+from src.connectors.arrow_reader import read_measurements_frame, plan_partitions
+
+
+@pytest.fixture
+def collection():
+    coll = mongomock.MongoClient().db.weather_data
+    start = datetime(2025, 12, 24, 0, 0, 0)
+    docs = []
+    for station in ["ILAMAD25", "IICHTE19"]:
+        for i in range(10):
+            docs.append({
+                "record_type": "measurement",
+                "station_id": station,
+                "timestamp": start + timedelta(minutes=5 * i),
+                "measurements": {
+                    "temperature_celsius": float(i),
+                    "humidity_percent": None if i == 0 else 80.0,
+                    "wind_speed_kmh": 10.0,
+                    "pressure_hpa": 1010.0
+                }
+            })
+    docs.append({"record_type": "station_reference", "station_id": "00052", "timestamp": start})
+    coll.insert_many(docs)
+    return coll
+
+
+class TestArrowReader:
+    """Tests pour le lecteur colonnaire."""
+
+    def test_column_types(self, collection):
+        """Vérifie les types : catégorie, datetime64 et float64 avec NaN."""
+        df = read_measurements_frame(collection)
+
+        assert len(df) == 20
+        assert str(df["station_id"].dtype) == "category"
+        assert str(df["timestamp"].dtype).startswith("datetime64")
+        assert df["temperature_celsius"].dtype == "float64"
+        assert df["humidity_percent"].isna().sum() == 2
+
+    def test_filters(self, collection):
+        """Vérifie le filtre station + période."""
+        df = read_measurements_frame(
+            collection, station_ids=["ILAMAD25"], start=datetime(2025, 12, 24, 0, 20)
+        )
+
+        assert len(df) == 6
+        assert set(df["station_id"]) == {"ILAMAD25"}
+
+    def test_partitioned_read_matches_sequential(self, collection):
+        """Vérifie que la lecture parallèle par plages ne perd ni ne duplique de lignes."""
+        assert len(plan_partitions(collection, splits_per_station=3)) == 6
+
+        sequential = read_measurements_frame(collection)
+        parallel = read_measurements_frame(collection, parallelism=3, splits_per_station=3)
+
+        assert len(parallel) == len(sequential)
+        assert parallel["timestamp"].tolist() == sequential["timestamp"].tolist()
+        assert parallel["temperature_celsius"].tolist() == sequential["temperature_celsius"].tolist()
@@ -0,0 +1,61 @@
+"""
+Tests du générateur synthétique et du benchmark de débit du pipeline.
+"""
+
+import json
+
+from src.reporting.benchmark_pipeline import compare_to_baseline, run_benchmark
+from src.reporting.synthetic_data import write_infoclimat_file, write_weather_underground_file
+
+
+class TestSyntheticData:
+    """Tests du générateur de fichiers Airbyte."""
+
+    def test_weather_underground_rows_and_bad_lines(self, tmp_path):
+        """Nombre de lignes exact, lignes mal formées incluses."""
+        path = tmp_path / "wu.jsonl"
+        assert write_weather_underground_file(str(path), rows=250, bad_line_every=100) == 250
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        invalid = 0
+        for line in lines:
+            try:
+                json.loads(line)
+            except ValueError:
+                invalid += 1
+        assert len(lines) == 250
+        assert invalid == 2
+
+    def test_generation_is_deterministic(self, tmp_path):
+        """Même graine -> même fichier (benchmarks comparables)."""
+        first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+        write_weather_underground_file(str(first), rows=100, seed=7)
+        write_weather_underground_file(str(second), rows=100, seed=7)
+        assert first.read_bytes() == second.read_bytes()
+
+    def test_infoclimat_stations(self, tmp_path):
+        path = tmp_path / "ic.jsonl"
+        write_infoclimat_file(str(path), stations=3)
+        record = json.loads(path.read_text(encoding="utf-8"))
+        assert len(record["_airbyte_data"]["stations"]) == 3
+
+
+class TestBenchmarkPipeline:
+    """Tests du benchmark par étape et de la comparaison à la référence."""
+
+    def test_run_benchmark_mongomock(self, tmp_path):
+        """Chaque étape est mesurée ; le bout en bout insère les documents valides."""
+        results = run_benchmark(500, noise=0.05, work_dir=str(tmp_path))
+
+        assert set(results["stages"]) == {"load", "transform", "validate", "insert", "end_to_end"}
+        assert results["stages"]["load"]["rows"] == 500
+        assert results["stages"]["end_to_end"]["inserted"] == results["config"]["valid_documents"]
+        assert all(stage["rows_per_s"] for stage in results["stages"].values())
+
+    def test_compare_to_baseline_flags_regression(self):
+        baseline = {"stages": {"load": {"rows_per_s": 1000}, "insert": {"rows_per_s": 1000}}}
+        results = {"stages": {"load": {"rows_per_s": 950}, "insert": {"rows_per_s": 700}}}
+
+        comparison = {c["stage"]: c for c in compare_to_baseline(results, baseline, tolerance=0.10)}
+        assert not comparison["load"]["regression"]
+        assert comparison["insert"]["regression"]
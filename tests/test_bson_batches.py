@@ -0,0 +1,116 @@
+"""
+Tests des lots pré-encodés en BSON (EncodedBatch).
+"""
+
+from datetime import datetime, timedelta
+
+import bson
+import mongomock
+import pytest
+from bson.raw_bson import RawBSONDocument
+
+from src.connectors.bson_batches import EncodedBatch
+from src.connectors.dedup import filter_new_documents
+from src.connectors.mongo_connector import MongoConnector
+from src.processing import cleaner
+from src.processing.parallel_ingest import merge_segments, split_byte_ranges, transform_range
+from src.processing.timestamps import resolve_observation_date
+from src.reporting.synthetic_data import write_weather_underground_file
+
+START = datetime(2025, 12, 1, 8, 0)
+FILENAME = "station_la_madelaine_FR.jsonl"
+
+
+def make_documents(count: int) -> list:
+    documents = [{"record_type": "measurement", "station_id": "ILAMAD25",
+                  "timestamp": START + timedelta(minutes=5 * i),
+                  "measurements": {"temperature_celsius": 10.0 + i}} for i in range(count)]
+    documents.append({"record_type": "station_reference", "station_id": "07015", "station_name": "Lille"})
+    return documents
+
+
+def decode_all(batch: EncodedBatch) -> list:
+    return [bson.decode(doc.raw) for doc in batch.raw_documents()]
+
+
+class FakeCollection:
+    """Collection capturant les documents reçus par insert_many."""
+
+    name = "weather_data"
+
+    def __init__(self):
+        self.received = []
+
+    def insert_many(self, documents, ordered=False):
+        self.received.extend(documents)
+        # Comme pymongo : aucun _id relevé pour les RawBSONDocument
+        ids = [doc.get("_id") for doc in documents if not isinstance(doc, RawBSONDocument)]
+        return type("Result", (), {"inserted_ids": ids})()
+
+
+class TestEncodedBatch:
+    """Tests de l'encodage, du recalage des timestamps et de la sélection."""
+
+    def test_round_trip_and_keys(self):
+        documents = make_documents(3)
+        batch = EncodedBatch.from_documents(documents)
+
+        assert decode_all(batch) == documents
+        assert batch.keys()[1] == ("ILAMAD25", START + timedelta(minutes=5))
+        assert batch.keys()[-1] == ("07015", None)
+        assert batch.count_by_type() == {"measurement": 3, "station_reference": 1}
+
+    def test_shift_timestamps_in_place(self):
+        batch = EncodedBatch.from_documents(make_documents(3))
+        batch.shift_timestamps(86400 * 1000, start=1)
+
+        timestamps = [doc.get("timestamp") for doc in decode_all(batch)]
+        assert timestamps[0] == START
+        assert timestamps[1] == START + timedelta(days=1, minutes=5)
+
+    def test_select_and_concat(self):
+        batch = EncodedBatch.from_documents(make_documents(4))
+        merged = EncodedBatch.concat([batch.select([3, 0]), batch.select([4])])
+
+        assert [doc.get("timestamp") for doc in decode_all(merged)] == [
+            START + timedelta(minutes=15), START, None]
+        merged.shift_timestamps(1000)
+        assert merged.keys()[1] == ("ILAMAD25", START + timedelta(seconds=1))
+
+
+class TestEncodedLoad:
+    """Déduplication et insertion sans décodage ni ré-encodage."""
+
+    def test_dedup_on_encoded_batch(self):
+        collection = mongomock.MongoClient()["test"]["weather_data"]
+        documents = make_documents(4)
+        collection.insert_many([dict(doc) for doc in documents[:2]])
+
+        kept, stats = filter_new_documents(collection, EncodedBatch.from_documents(documents))
+        assert stats["skipped"] == 2
+        assert stats["bytes_saved"] == sum(len(bson.encode(doc)) for doc in documents[:2])
+        assert decode_all(kept) == documents[2:]
+
+    def test_insert_sends_raw_bytes(self):
+        batch = EncodedBatch.from_documents(make_documents(5))
+        connector = MongoConnector()
+        collection = FakeCollection()
+        connector.db = {MongoConnector.COLLECTION_NAME: collection}
+
+        assert connector.insert_documents(batch, batch_size=2) == 6
+        assert b"".join(doc.raw for doc in collection.received) == bytes(batch.buffer)
+
+    def test_encoded_segments_match_sequential(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+        path = str(tmp_path / FILENAME)
+        write_weather_underground_file(path, rows=800, duplicate_rate=0.4, bad_line_every=97)
+        expected = cleaner.transform_weather_data(path, FILENAME)
+
+        meta = cleaner.STATION_METADATA[FILENAME]
+        base_date = resolve_observation_date(path, FILENAME)
+        results = [transform_range(path, start, end, meta, base_date, encode=True)
+                   for start, end in split_byte_ranges(path, 6)]
+
+        merged = merge_segments(results)
+        assert isinstance(merged, EncodedBatch)
+        assert decode_all(merged) == [dict(doc) for doc in expected]
@@ -0,0 +1,148 @@
+"""
+Tests du consommateur de change stream (état dérivé incrémental).
+
+Les tests unitaires simulent les événements ; le test d'intégration
+nécessite un ReplicaSet local (une seule instance suffit) :
+
+    docker run -d -p 27017:27017 mongo:7 --replSet rs0
+    docker exec <id> mongosh --eval 'rs.initiate()'
+    CHANGE_STREAM_TEST_URI="mongodb://localhost:27017/?directConnection=true" \\
+        pytest tests/test_change_stream.py -v
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.connectors.change_stream import (
+    ChangeStreamConsumer, HourlyRollupHandler, QualityCountersHandler, ResumeTokenStore
+)
+
+START = datetime(2024, 10, 1, 12, 0)
+
+
+def measurement(minutes, temperature, station_id="ILAMAD25"):
+    return {
+        "record_type": "measurement",
+        "station_id": station_id,
+        "location": {"latitude": 50.659, "longitude": 3.07},
+        "timestamp": START + timedelta(minutes=minutes),
+        "measurements": {"temperature_celsius": temperature, "humidity_percent": None}
+    }
+
+
+def insert_event(doc, token=None):
+    event = {"operationType": "insert", "fullDocument": doc}
+    if token is not None:
+        event["_id"] = {"_data": f"82{token:08X}"}
+    return event
+
+
+class TestDerivedState:
+    """Tests des handlers alimentés par les événements d'insertion."""
+
+    def test_hourly_rollups_incremental(self):
+        """Vérifie que deux lots successifs cumulent count / sum / min / max."""
+        db = mongomock.MongoClient()["test"]
+        consumer = ChangeStreamConsumer(None, [HourlyRollupHandler(db)])
+
+        first = [measurement(0, 10.0), measurement(30, 14.0)]
+        db["weather_data"].insert_many([dict(doc) for doc in first])
+        consumer.process_events([insert_event(doc) for doc in first])
+        second = [measurement(45, 8.0), measurement(70, 20.0)]
+        db["weather_data"].insert_many([dict(doc) for doc in second])
+        consumer.process_events([insert_event(doc) for doc in second])
+
+        first_hour = db["weather_hourly"].find_one({"station_id": "ILAMAD25", "hour": START})
+        assert first_hour["count"] == 3
+        assert first_hour["temperature_celsius"] == {"sum": 32.0, "n": 3, "min": 8.0, "max": 14.0}
+        assert "humidity_percent" not in first_hour
+        assert db["weather_hourly"].count_documents({}) == 2
+
+    def test_quality_counters(self, tmp_path):
+        """Vérifie les compteurs de règles et leur persistance."""
+        path = str(tmp_path / "quality.json")
+        consumer = ChangeStreamConsumer(None, [QualityCountersHandler(path)])
+
+        consumer.process_events([insert_event(measurement(0, 12.0)), insert_event(measurement(5, 75.0)),
+                                 {"operationType": "delete"}])
+
+        counters = QualityCountersHandler(path).counters["measurement"]
+        assert counters["total"] == 2
+        assert counters["rules"] == {"temperature_out_of_range": 1}
+        assert counters["stations"]["ILAMAD25"]["last_timestamp"] == (START + timedelta(minutes=5)).isoformat()
+
+    def test_replayed_batch_not_counted_twice(self, tmp_path):
+        """Lot rejoué après redémarrage (token non sauvegardé) : état dérivé inchangé."""
+        db = mongomock.MongoClient()["test"]
+        path = str(tmp_path / "quality.json")
+        docs = [measurement(0, 10.0), measurement(10, 75.0)]
+        db["weather_data"].insert_many([dict(doc) for doc in docs])
+        events = [insert_event(doc, token=i + 1) for i, doc in enumerate(docs)]
+
+        ChangeStreamConsumer(None, [HourlyRollupHandler(db), QualityCountersHandler(path)]).process_events(events)
+        restarted = ChangeStreamConsumer(None, [HourlyRollupHandler(db), QualityCountersHandler(path)])
+        restarted.process_events(events + [insert_event(measurement(20, 90.0), token=3)])
+
+        assert db["weather_hourly"].find_one({"hour": START})["count"] == 2
+        counters = QualityCountersHandler(path).counters["measurement"]
+        assert counters["total"] == 3
+        assert counters["rules"] == {"temperature_out_of_range": 2}
+
+    def test_parquet_replay_ignored(self, tmp_path):
+        """Le token du dernier lot exporté est gardé dans le manifeste : un rejeu n'ajoute aucune ligne."""
+        from src.connectors.change_stream import ParquetHandler
+        from src.connectors.parquet_exporter import ParquetExporter, read_parquet_export
+
+        events = [insert_event(measurement(i * 10, 10.0), token=i + 1) for i in range(3)]
+        ChangeStreamConsumer(None, [ParquetHandler(ParquetExporter(None, str(tmp_path)))]).process_events(events)
+        ChangeStreamConsumer(None, [ParquetHandler(ParquetExporter(None, str(tmp_path)))]).process_events(events)
+
+        assert len(read_parquet_export(str(tmp_path))) == 3
+
+    def test_resume_token_roundtrip(self, tmp_path):
+        """Vérifie la persistance du resume token (JSON étendu)."""
+        store = ResumeTokenStore(str(tmp_path / "token.json"))
+        assert store.load() is None
+
+        store.save({"_data": "8265F1A2B3000000012B022C0100296E5A1004"})
+        assert store.load() == {"_data": "8265F1A2B3000000012B022C0100296E5A1004"}
+
+
+@pytest.mark.skipif(not os.getenv("CHANGE_STREAM_TEST_URI"),
+                    reason="ReplicaSet local requis (CHANGE_STREAM_TEST_URI)")
+class TestChangeStreamIntegration:
+    """Test d'intégration sur un ReplicaSet à un nœud."""
+
+    def test_tail_and_resume(self, tmp_path):
+        """Vérifie le suivi des insertions puis la reprise sans rejouer le lot traité."""
+        from pymongo import MongoClient
+
+        client = MongoClient(os.environ["CHANGE_STREAM_TEST_URI"])
+        db = client["change_stream_test"]
+        db.drop_collection("weather_data")
+        db.drop_collection("weather_hourly")
+        store = ResumeTokenStore(str(tmp_path / "token.json"))
+
+        def run_consumer(inserts):
+            consumer = ChangeStreamConsumer(db["weather_data"], [HourlyRollupHandler(db)],
+                                            token_store=store, max_wait_s=0.2)
+            thread = threading.Thread(target=consumer.run)
+            thread.start()
+            time.sleep(0.5)
+            inserts()
+            time.sleep(1.5)
+            consumer.stop()
+            thread.join(10)
+
+        run_consumer(lambda: db["weather_data"].insert_many([measurement(0, 10.0), measurement(10, 12.0)]))
+        db["weather_data"].insert_one(measurement(20, 14.0))      # pendant l'arrêt
+        run_consumer(lambda: None)
+
+        rollup = db["weather_hourly"].find_one({"hour": START})
+        assert rollup["count"] == 3
+        client.drop_database("change_stream_test")
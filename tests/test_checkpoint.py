@@ -0,0 +1,172 @@
+"""
+Tests des points de reprise du chargement (CheckpointStore).
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.connectors.checkpoint import CheckpointStore, file_fingerprint, load_with_checkpoints
+from src.connectors.mongo_connector import MongoConnector
+
+START = datetime(2025, 12, 1, 8, 0)
+
+
+def make_documents(count: int) -> list:
+    return [{"record_type": "measurement", "station_id": "ILAMAD25",
+             "timestamp": START + timedelta(minutes=5 * i),
+             "measurements": {"temperature_celsius": 10.0}} for i in range(count)]
+
+
+@pytest.fixture
+def mongo():
+    connector = MongoConnector()
+    connector.client = mongomock.MongoClient()
+    connector.db = connector.client["test"]
+    return connector
+
+
+class TaskKilled(Exception):
+    """Arrêt brutal simulé de la tâche pendant l'insertion."""
+
+
+class TestCheckpointStore:
+    """Tests du cycle de vie d'une exécution."""
+
+    def test_successful_run_is_not_resumed(self, tmp_path, mongo):
+        store = CheckpointStore(str(tmp_path / "run.json"), mongo.db["etl_runs"])
+        first = store.start_run()
+        store.commit_file("a.jsonl", "v1")
+        store.finish("success")
+
+        assert CheckpointStore(str(tmp_path / "run.json")).start_run() != first
+
+    def test_resume_from_mongo_when_local_file_lost(self, tmp_path, mongo):
+        """Nouvelle tâche (conteneur vierge) : l'état est relu depuis etl_runs."""
+        path = str(tmp_path / "run.json")
+        store = CheckpointStore(path, mongo.db["etl_runs"])
+        run_id = store.start_run()
+        store.commit_file("station_la_madelaine_FR.jsonl", "etag-1")
+        os.remove(path)
+
+        resumed = CheckpointStore(path, mongo.db["etl_runs"])
+        assert resumed.start_run() == run_id
+        assert resumed.state["attempts"] == 2
+        assert resumed.is_committed("station_la_madelaine_FR.jsonl", "etag-1")
+        assert not resumed.is_committed("station_la_madelaine_FR.jsonl", "etag-2")
+
+    def test_fingerprint_changes_with_content(self, tmp_path):
+        path = tmp_path / "f.jsonl"
+        path.write_bytes(b"a" * 200000)
+        before = file_fingerprint(str(path))
+        path.write_bytes(b"a" * 199999 + b"b")
+        assert file_fingerprint(str(path)) != before
+
+
+class TestLoadWithCheckpoints:
+    """Reprise d'un chargement interrompu au milieu d'un fichier."""
+
+    def test_restart_loads_only_remaining_batches(self, tmp_path, mongo, monkeypatch):
+        documents = make_documents(250)
+        path = str(tmp_path / "run.json")
+        store = CheckpointStore(path, mongo.db["etl_runs"])
+        store.start_run()
+
+        calls = []
+        real_insert = mongo.insert_documents
+
+        def insert_then_die(chunk, *args, **kwargs):
+            calls.append(len(chunk))
+            if len(calls) == 3:
+                raise TaskKilled()
+            return real_insert(chunk, *args, **kwargs)
+
+        monkeypatch.setattr(mongo, "insert_documents", insert_then_die)
+        with pytest.raises(TaskKilled):
+            load_with_checkpoints(mongo, store, "f.jsonl", "v1", documents, checkpoint_rows=100)
+        monkeypatch.setattr(mongo, "insert_documents", real_insert)
+
+        # Redémarrage : mêmes documents, seule la dernière tranche est envoyée
+        restarted = CheckpointStore(path, mongo.db["etl_runs"])
+        restarted.start_run()
+        result = load_with_checkpoints(mongo, restarted, "f.jsonl", "v1", documents, checkpoint_rows=100)
+
+        assert result["resumed_from"] == 200
+        assert result["inserted"] == 50
+        assert mongo.db[MongoConnector.COLLECTION_NAME].count_documents({}) == 250
+        assert restarted.is_committed("f.jsonl", "v1")
+
+    def test_failed_insert_not_committed(self, tmp_path, mongo, monkeypatch):
+        """Connexion perdue en cours de tranche : ni la tranche ni le fichier ne sont validés."""
+        from pymongo.errors import OperationFailure
+
+        documents = make_documents(250)
+        store = CheckpointStore(str(tmp_path / "run.json"), mongo.db["etl_runs"])
+        store.start_run()
+
+        real_batch = MongoConnector._insert_batch
+        calls = []
+
+        def batch_then_fail(collection, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise OperationFailure("connexion perdue", code=6)
+            return real_batch(collection, batch)
+
+        monkeypatch.setattr(MongoConnector, "_insert_batch", staticmethod(batch_then_fail))
+        with pytest.raises(OperationFailure):
+            load_with_checkpoints(mongo, store, "f.jsonl", "v1", documents, checkpoint_rows=100)
+
+        assert store.committed_offset("f.jsonl", "v1") == 100
+        assert not store.is_committed("f.jsonl", "v1")
+
+
+class TestPipelineFailedFiles:
+    """Fichier non transformable pendant une exécution avec points de reprise."""
+
+    def test_failed_file_skipped_and_others_loaded(self, tmp_path, mongo, monkeypatch):
+        """Un fichier InfoClimat mal formé est marqué en échec, les autres fichiers sont chargés."""
+        import json
+
+        from src import main as pipeline
+        from src.connectors import mongo_connector, s3_connector
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("S3_BUCKET_NAME", "bucket")
+        monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+        monkeypatch.setenv("CHECKPOINT_PATH", str(tmp_path / "run.json"))
+
+        good = tmp_path / "station_la_madelaine_FR.jsonl"
+        good.write_text("".join(json.dumps({"_airbyte_data": {"Time": f"12:0{i} AM", "Temperature": "57.0 °F"}})
+                                + "\n" for i in range(3)), encoding="utf-8")
+        bad = tmp_path / "info_climat_export.jsonl"
+        bad.write_text("{mal formé\n", encoding="utf-8")
+
+        class FakeS3:
+            last_versions = {}
+
+            def download_files(self, local_dir, skip=None):
+                return [str(bad), str(good)]
+
+        class FakeMongo(MongoConnector):
+            def connect(self):
+                self.client, self.db = mongo.client, mongo.db
+                self.indexes_verified = True
+
+            def close(self):
+                FakeMongo.closed = True
+
+        monkeypatch.setattr(s3_connector, "S3Connector", FakeS3)
+        monkeypatch.setattr(mongo_connector, "MongoConnector", FakeMongo)
+
+        pipeline.run_pipeline()
+
+        store = CheckpointStore(str(tmp_path / "run.json"))
+        store.state = store._load_local()
+        assert store.state["status"] == "success"
+        assert store.state["files"]["info_climat_export.jsonl"]["status"] == "failed"
+        assert store.state["files"]["station_la_madelaine_FR.jsonl"]["status"] == "committed"
+        assert mongo.db[MongoConnector.COLLECTION_NAME].count_documents({"record_type": "measurement"}) == 3
+        assert FakeMongo.closed
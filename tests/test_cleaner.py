@@ -0,0 +1,241 @@
+"""
+Tests unitaires du module de transformation (cleaner).
+
+Usage:
+    pytest tests/test_cleaner.py -v
+"""
+
+import math
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.processing import cleaner
+from src.processing.cleaner import (iter_jsonl_records, load_airbyte_jsonl, fahrenheit_to_celsius,
+                                    transform_weather_data)
+from src.processing.value_parser import clean_value, clean_series
+from src.processing.timestamps import build_timestamps, resolve_observation_date
+
+
+# =============================================================================
+# TESTS : Nettoyage des valeurs
+# =============================================================================
+
+class TestCleanValue:
+    """Tests pour clean_value / clean_series."""
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("57.0 °F", 57.0),
+        ("87 %", 87.0),
+        ("-3.5 °C", -3.5),
+        (".5 in", 0.5),
+        ("--", None),
+        ("", None),
+        (None, None),
+        (float("nan"), None),
+        (12, 12.0),
+        (np.float64(4.5), 4.5),
+        (np.int64(7), 7.0),
+    ])
+    def test_clean_value(self, raw, expected):
+        """Vérifie l'extraction numérique sur les formats rencontrés."""
+        assert clean_value(raw) == expected
+
+    def test_clean_series_matches_scalar(self):
+        """Vérifie que la version vectorisée équivaut à apply(clean_value).apply(convert)."""
+        series = pd.Series(["57.0 °F", "57.0 °F", None, "", 60.0, "--", "32 °F"], dtype=object)
+
+        result = clean_series(series, fahrenheit_to_celsius)
+        expected = [fahrenheit_to_celsius(clean_value(v)) for v in series]
+
+        for got, want in zip(result, expected):
+            assert (math.isnan(got) and want is None) or got == want
+
+
+# =============================================================================
+# TESTS : Décodage JSONL
+# =============================================================================
+
+JSONL_CONTENT = (
+    b'{"_airbyte_data": {"Time": "12:04 AM", "Temperature": "57.0 \xc2\xb0F"}}\n'
+    b'\n'
+    b'{"_airbyte_data": {"Time": "12:09 AM", \n'
+    b'{"_airbyte_data": {"Time": "12:14 AM", "Temperature": "56.8 \xc2\xb0F"}}\n'
+    b'{"other": 1}\n'
+    b'{"_airbyte_data": {"Time": "12:19 AM", "Temperature": "56.5 \xc2\xb0F"}}'
+)
+
+
+@pytest.fixture
+def jsonl_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+    path = tmp_path / "station_test.jsonl"
+    path.write_bytes(JSONL_CONTENT)
+    return str(path)
+
+
+class TestJsonlDecoding:
+    """Tests pour les backends de décodage JSONL."""
+
+    @pytest.mark.parametrize("backend", ["json", "orjson", "msgspec"])
+    def test_malformed_lines_skipped(self, jsonl_file, backend):
+        """Vérifie que chaque backend ignore les lignes mal formées de la même façon."""
+        name, _, _ = cleaner.get_json_backend(backend)
+        if name != backend:
+            pytest.skip(f"{backend} non installé")
+
+        records = list(iter_jsonl_records(jsonl_file, backend=backend))
+
+        assert len(records) == 4
+        assert records[0]["_airbyte_data"]["Temperature"] == "57.0 °F"
+        assert records[-1]["_airbyte_data"]["Time"] == "12:19 AM"
+
+    def test_small_blocks(self, jsonl_file):
+        """Vérifie le découpage correct quand les lignes chevauchent les blocs."""
+        records = list(iter_jsonl_records(jsonl_file, backend="json", block_size=7))
+
+        assert [r.get("_airbyte_data", {}).get("Time") for r in records] == [
+            "12:04 AM", "12:14 AM", None, "12:19 AM"
+        ]
+
+    def test_strict_mode_raises(self, jsonl_file):
+        """Vérifie que skip_malformed=False propage l'erreur de décodage."""
+        with pytest.raises(ValueError):
+            list(iter_jsonl_records(jsonl_file, backend="json", skip_malformed=False))
+
+    def test_load_airbyte_jsonl(self, jsonl_file):
+        """Vérifie l'extraction de '_airbyte_data' en DataFrame."""
+        df = load_airbyte_jsonl(jsonl_file)
+
+        assert len(df) == 3
+        assert list(df["Time"]) == ["12:04 AM", "12:14 AM", "12:19 AM"]
+
+
+# =============================================================================
+# TESTS : Ingestion typée (msgspec)
+# =============================================================================
+
+WU_LINES = [
+    '{"_airbyte_data": {"Time": "12:04 AM", "Temperature": "57.0 °F", "Humidity": "87 %", '
+    '"Speed": "8.2 mph", "Pressure": "29.48 in", "Wind": "WSW"}}',
+    '{"_airbyte_data": {"Time": "12:04 AM", "Temperature": 56.5, "Humidity": "88 %"}}',
+    '{"_airbyte_data": {"Time": "12:09 AM", "Temperature": "200.0 °F"}}',
+    'not json',
+    '{"_airbyte_data": {"Temperature": "50.0 °F"}}'
+]
+
+IC_LINES = [
+    '{"_airbyte_data": {"stations": [{"id": "00052", "name": "Armentières", "latitude": 50.689, '
+    '"longitude": 2.877, "elevation": 16, "type": "static", '
+    '"license": {"license": "CC BY", "url": "https://x", "metadonnees": "https://y"}}]}}',
+    '{"_airbyte_data": {"id": 7015, "name": "Lille-Lesquin", "latitude": "50.57", "longitude": "3.10"}}'
+]
+
+
+class TestTypedIngest:
+    """Vérifie que la voie msgspec produit les mêmes documents que la voie DataFrame."""
+
+    @pytest.fixture(autouse=True)
+    def require_msgspec(self, monkeypatch):
+        pytest.importorskip("msgspec")
+        monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+
+    def test_weather_data_equivalence(self, tmp_path):
+        from src.processing.typed_ingest import transform_weather_data_typed
+
+        path = tmp_path / "station_ichtegem_BE.jsonl"
+        path.write_text("\n".join(WU_LINES) + "\n", encoding="utf-8")
+
+        expected = cleaner.transform_weather_data(str(path), "station_ichtegem_BE.jsonl")
+        typed = transform_weather_data_typed(str(path), "station_ichtegem_BE.jsonl")
+
+        assert len(typed) == 2
+        assert typed == expected
+
+    def test_infoclimat_equivalence(self, tmp_path):
+        from src.processing.typed_ingest import transform_infoclimat_typed
+
+        path = tmp_path / "info_climat.jsonl"
+        path.write_text("\n".join(IC_LINES) + "\n", encoding="utf-8")
+
+        expected = cleaner.transform_infoclimat(str(path))
+        typed = transform_infoclimat_typed(str(path))
+
+        strip = lambda docs: [{k: v for k, v in d.items() if k != "timestamp"} for d in docs]
+        assert len(typed) == 2
+        assert strip(typed) == strip(expected)
+
+
+# =============================================================================
+# TESTS : Construction des timestamps
+# =============================================================================
+
+class TestBuildTimestamps:
+    """Tests pour build_timestamps / resolve_observation_date."""
+
+    def test_explicit_date_and_same_minute_rank(self):
+        """Vérifie la date fournie et le rang en secondes des relevés d'une même minute."""
+        times = pd.Series(["12:04 AM", "12:04 AM", "12:09 AM", "bad", None])
+        result = build_timestamps(times, date(2025, 12, 1))
+
+        assert list(result[:3]) == [pd.Timestamp("2025-12-01 00:04:00"),
+                                    pd.Timestamp("2025-12-01 00:04:01"),
+                                    pd.Timestamp("2025-12-01 00:09:00")]
+        assert result[3:].isna().all()
+
+    def test_multi_day_rollover(self):
+        """Vérifie le passage au jour suivant quand l'heure recule."""
+        times = pd.Series(["11:50 PM", "11:55 PM", "12:00 AM", "12:05 AM", "11:50 PM"])
+        result = build_timestamps(times, date(2025, 12, 1))
+
+        assert [ts.day for ts in result] == [1, 1, 2, 2, 2]
+        assert result.is_monotonic_increasing
+
+    def test_seconds_precision_not_ranked(self):
+        """Vérifie qu'une heure à la seconde n'est pas décalée sur la seconde suivante."""
+        times = pd.Series(["00:04:00", "00:04:00", "00:04:01", "12:05:30 AM", "12:05:30 AM"])
+        result = build_timestamps(times, date(2025, 12, 1))
+
+        assert [ts.strftime("%H:%M:%S") for ts in result] == ["00:04:00", "00:04:00", "00:04:01",
+                                                               "00:05:30", "00:05:30"]
+
+    def test_small_backward_step_keeps_day(self):
+        """Vérifie qu'une ligne désordonnée ne décale pas le reste du fichier de 24 h."""
+        times = pd.Series(["10:00 AM", "10:05 AM", "10:02 AM", "10:10 AM", "11:55 PM", "12:05 AM"])
+        result = build_timestamps(times, date(2025, 12, 1))
+
+        assert [ts.day for ts in result] == [1, 1, 1, 1, 1, 2]
+        assert result.iloc[2] == pd.Timestamp("2025-12-01 10:02:00")
+
+    def test_stable_across_runs(self, tmp_path):
+        """Vérifie que la date vient du fichier (nom, puis _airbyte_emitted_at) et non du jour courant."""
+        dated = tmp_path / "station_test_2025-11-30.jsonl"
+        dated.write_text('{"_airbyte_data": {"Time": "12:04 AM"}}\n', encoding="utf-8")
+        emitted = tmp_path / "station_test.jsonl"
+        emitted.write_text('{"_airbyte_emitted_at": 1733011200000, "_airbyte_data": {}}\n', encoding="utf-8")
+
+        assert resolve_observation_date(str(dated)) == date(2025, 11, 30)
+        assert resolve_observation_date(str(emitted)) == date(2024, 12, 1)
+
+    def test_emitted_at_in_station_timezone(self, tmp_path):
+        """Vérifie que la date de synchronisation est prise dans le fuseau de la station."""
+        path = tmp_path / "station_test.jsonl"
+        # 2024-11-30 23:30 UTC = 2024-12-01 00:30 à Paris
+        path.write_text('{"_airbyte_emitted_at": 1733009400000, "_airbyte_data": {}}\n', encoding="utf-8")
+
+        assert resolve_observation_date(str(path), timezone_name="Europe/Paris") == date(2024, 12, 1)
+        assert resolve_observation_date(str(path), timezone_name="UTC") == date(2024, 11, 30)
+
+    def test_dated_filename_uses_station_metadata(self, tmp_path, monkeypatch):
+        """Vérifie qu'un export daté retrouve les métadonnées de sa station et la date de son nom."""
+        monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+        filename = "station_la_madelaine_FR_2025-11-30.jsonl"
+        path = tmp_path / filename
+        path.write_text('{"_airbyte_data": {"Time": "12:04 AM", "Temperature": "50.0 °F"}}\n', encoding="utf-8")
+
+        documents = transform_weather_data(str(path), filename)
+
+        assert len(documents) == 1
+        assert documents[0]["station_id"] == "ILAMAD25"
+        assert documents[0]["timestamp"] == datetime(2025, 11, 30, 0, 4)
@@ -0,0 +1,118 @@
+"""
+Tests du mode démon (polling incrémental d'un dossier de dépôt local).
+
+Usage:
+    pytest tests/test_daemon.py -v
+"""
+
+import json
+import os
+
+import mongomock
+import pytest
+
+from src.connectors.mongo_connector import MongoConnector
+from src.daemon import PipelineDaemon
+
+STATION_FILE = "station_la_madelaine_FR.jsonl"
+
+
+def write_station_file(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            payload = {"Time": f"12:{i % 60:02d} AM", "Temperature": "57.0 °F", "Humidity": "87 %"}
+            f.write(json.dumps({"_airbyte_data": payload}) + "\n")
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    """Démon sur un dossier local, MongoDB simulé par mongomock."""
+    monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+    mongo = MongoConnector()
+    mongo.db = mongomock.MongoClient()["test"]
+    # mongomock ignore partialFilterExpression : l'index unique des stations
+    # bloquerait les mesures, on ne crée donc pas les index ici
+    mongo.indexes_verified = True
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    return PipelineDaemon(interval=1, source="local", drop_dir=str(inbox),
+                          state_path=str(tmp_path / "state.json"), mongo=mongo)
+
+
+class TestPipelineDaemon:
+    """Tests du traitement incrémental."""
+
+    def test_only_new_files_processed(self, daemon):
+        """Vérifie qu'un fichier déjà traité n'est pas relu au cycle suivant."""
+        write_station_file(os.path.join(daemon.drop_dir, STATION_FILE), 3)
+
+        first = daemon.poll_once()
+        second = daemon.poll_once()
+
+        assert first["files"] == 1
+        assert first["inserted"] == 3
+        assert second["files"] == 0
+        assert daemon.mongo.db["weather_data"].count_documents({}) == 3
+
+    def test_modified_file_reprocessed(self, daemon):
+        """Vérifie qu'un fichier modifié (taille / mtime) est retraité."""
+        path = os.path.join(daemon.drop_dir, STATION_FILE)
+        write_station_file(path, 2)
+        daemon.poll_once()
+
+        write_station_file(path, 5)
+        result = daemon.poll_once()
+
+        assert result["files"] == 1
+        assert result["documents"] == 5
+
+    def test_state_persisted(self, daemon):
+        """Vérifie que l'état survit à un redémarrage du démon."""
+        write_station_file(os.path.join(daemon.drop_dir, STATION_FILE), 2)
+        daemon.poll_once()
+
+        restarted = PipelineDaemon(source="local", drop_dir=daemon.drop_dir,
+                                   state_path=daemon.state_path, mongo=daemon.mongo)
+        assert restarted.list_new_objects() == []
+
+    def test_unreadable_file_retried(self, daemon, monkeypatch):
+        """Vérifie qu'un fichier en erreur de lecture n'est pas marqué traité."""
+        from src.processing import cleaner
+
+        write_station_file(os.path.join(daemon.drop_dir, STATION_FILE), 3)
+
+        def broken_reader(path):
+            raise OSError("lecture interrompue")
+            yield
+
+        with monkeypatch.context() as m:
+            m.setattr(cleaner, "iter_jsonl_records", broken_reader)
+            result = daemon.poll_once()
+        assert result["failed"] == 1 and result["files"] == 0
+        assert daemon.state == {}
+
+        assert daemon.poll_once()["inserted"] == 3
+
+    def test_insert_error_not_recorded(self, daemon, monkeypatch):
+        """Vérifie qu'une insertion en erreur interrompt le cycle sans marquer le fichier."""
+        from pymongo.errors import OperationFailure
+
+        write_station_file(os.path.join(daemon.drop_dir, STATION_FILE), 3)
+
+        def failing_batch(collection, batch):
+            raise OperationFailure("disque plein", code=14031)
+
+        monkeypatch.setattr(MongoConnector, "_insert_batch", staticmethod(failing_batch))
+        with pytest.raises(OperationFailure):
+            daemon.poll_once()
+        assert daemon.list_new_objects() != []
+
+    def test_health(self, daemon):
+        """Vérifie la sonde de santé après succès puis après erreur."""
+        daemon.last_error = None
+        assert daemon.health()[0] is True
+
+        daemon.last_error = "boom"
+        healthy, details = daemon.health()
+        assert healthy is False
+        assert details["last_error"] == "boom"
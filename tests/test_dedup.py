@@ -0,0 +1,136 @@
+"""
+Tests de la déduplication des mesures avant insertion.
+
+Usage:
+    pytest tests/test_dedup.py -v
+"""
+
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from pymongo import ASCENDING
+
+from src.connectors.dedup import build_existing_keys_query, filter_new_documents
+
+START = datetime(2024, 10, 1, 12, 0)
+
+
+def measurement(station_id, minutes, microsecond=0):
+    return {
+        "record_type": "measurement",
+        "station_id": station_id,
+        "timestamp": START + timedelta(minutes=minutes, microseconds=microsecond),
+        "measurements": {"temperature_celsius": 12.5}
+    }
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient()["test"]["weather_data"]
+    collection.create_index([("station_id", ASCENDING), ("timestamp", ASCENDING)],
+                            name="idx_station_timestamp")
+    return collection
+
+
+class TestDedup:
+    """Tests du filtrage des mesures déjà présentes."""
+
+    def test_query_ranges_per_station(self):
+        """Vérifie une clause [min, max] par station, stations de référence exclues."""
+        query = build_existing_keys_query([
+            measurement("A", 10), measurement("A", 0), measurement("B", 5),
+            {"record_type": "station_reference", "station_id": "C", "timestamp": START}
+        ])
+
+        assert query == {"$or": [
+            {"station_id": "A", "timestamp": {"$gte": START, "$lte": START + timedelta(minutes=10)}},
+            {"station_id": "B", "timestamp": {"$gte": START + timedelta(minutes=5),
+                                              "$lte": START + timedelta(minutes=5)}},
+        ]}
+
+    def test_rerun_skips_existing(self, collection):
+        """Vérifie qu'une ré-exécution n'envoie que les nouvelles mesures."""
+        collection.insert_many([measurement("A", i) for i in range(3)])
+
+        kept, stats = filter_new_documents(collection, [measurement("A", i) for i in range(5)])
+
+        assert [doc["timestamp"] for doc in kept] == [START + timedelta(minutes=i) for i in (3, 4)]
+        assert stats["skipped"] == 3
+        assert stats["bytes_saved"] > 0
+
+    def test_bytes_saved_estimated_from_sample(self, collection, monkeypatch):
+        """Vérifie que bytes_saved n'encode qu'un échantillon des doublons (estimation proche)."""
+        import bson
+        from src.connectors import dedup
+        from src.processing.measurement_batch import SIZE_SAMPLE
+
+        documents = [measurement("A", i) for i in range(500)]
+        collection.insert_many([dict(doc) for doc in documents])
+        exact = sum(len(bson.encode(doc)) for doc in documents)
+
+        encoded = []
+        real_encode = bson.encode
+        monkeypatch.setattr(dedup.bson, "encode", lambda doc, *args: encoded.append(doc) or real_encode(doc, *args))
+        _, stats = filter_new_documents(collection, documents)
+
+        assert len(encoded) <= SIZE_SAMPLE
+        assert abs(stats["bytes_saved"] - exact) <= 0.05 * exact
+
+    def test_in_batch_duplicates_and_millisecond_precision(self, collection):
+        """Vérifie les doublons internes au lot et la comparaison à la milliseconde."""
+        collection.insert_one(measurement("A", 0))
+
+        kept, stats = filter_new_documents(collection, [
+            measurement("A", 0, microsecond=400),   # même milliseconde que l'existant
+            measurement("B", 0),
+            measurement("B", 0),
+        ])
+
+        assert len(kept) == 1
+        assert stats["skipped"] == 2
+
+    def test_station_references_untouched(self, collection):
+        """Vérifie que les stations de référence ne sont pas filtrées."""
+        station = {"record_type": "station_reference", "station_id": "07015", "timestamp": START}
+        kept, stats = filter_new_documents(collection, [station])
+
+        assert kept == [station]
+        assert stats["skipped"] == 0
+
+
+def station(station_id, name="Lille-Lesquin", minutes=0):
+    from src.processing.validator import validate_station_data
+
+    valid, _ = validate_station_data([{
+        "record_type": "station_reference", "station_id": station_id, "station_name": name,
+        "source": "infoclimat", "location": {"city": name, "country": "FR", "latitude": 50.57, "longitude": 3.1},
+        "timestamp": START + timedelta(minutes=minutes)
+    }])
+    return valid[0]
+
+
+class TestStationReferences:
+    """Tests des stations de référence (empreinte de contenu)."""
+
+    def test_hash_ignores_timestamp(self):
+        assert station("07015")["content_hash"] == station("07015", minutes=60)["content_hash"]
+        assert station("07015")["content_hash"] != station("07015", name="Lille")["content_hash"]
+
+    def test_only_new_or_changed_written(self):
+        """Vérifie qu'une ré-exécution sans changement n'écrit rien."""
+        from src.connectors.mongo_connector import MongoConnector
+
+        connector = MongoConnector()
+        connector.db = mongomock.MongoClient()["test"]
+        collection = connector.db[MongoConnector.COLLECTION_NAME]
+
+        assert connector.insert_documents([station("07015"), station("07020")]) == 2
+        assert connector.insert_documents([station("07015", minutes=60), station("07020", minutes=60)]) == 0
+        assert connector.insert_documents([station("07015", name="Lille", minutes=90), station("07030")]) == 2
+
+        stored = {doc["station_id"]: doc for doc in collection.find()}
+        assert len(stored) == 3
+        assert stored["07015"]["station_name"] == "Lille"
+        # Station inchangée : horodatage de la première écriture conservé
+        assert stored["07020"]["timestamp"] == START
@@ -0,0 +1,129 @@
+"""
+Tests des variables de prévision et de leur rafraîchissement incrémental.
+"""
+
+from datetime import datetime, timedelta
+
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.connectors.feature_store import FEATURE_COLLECTION, FeatureStore, read_features
+from src.processing.features import build_features
+
+START = datetime(2025, 12, 1, 0, 0)
+
+
+def measurements(station_id: str, first: int, count: int, step_minutes: int = 5) -> list:
+    rng = np.random.default_rng(first + len(station_id))
+    return [{"record_type": "measurement", "station_id": station_id,
+             "timestamp": START + timedelta(minutes=step_minutes * (first + i)),
+             "measurements": {"temperature_celsius": float(rng.normal(8, 3)), "humidity_percent": 80.0,
+                              "wind_speed_kmh": None, "pressure_hpa": 1015.0}}
+            for i in range(count)]
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(3)
+    n = 3000
+    timestamps = pd.Timestamp(START) + pd.to_timedelta(rng.integers(0, 5 * 86400, n), unit="s")
+    df = pd.DataFrame({
+        "station_id": pd.Categorical(rng.choice(["IICHTE19", "ILAMAD25", "07015"], n)),
+        "timestamp": timestamps.values.astype("datetime64[ns]"),
+        "temperature_celsius": np.where(rng.random(n) < 0.1, np.nan, rng.normal(10, 5, n)),
+    })
+    return df.drop_duplicates(["station_id", "timestamp"])
+
+
+class TestBuildFeatures:
+    """Variables vectorisées identiques aux calculs groupby pandas."""
+
+    def test_matches_pandas_groupby(self, frame):
+        features = build_features(frame, windows=("30min", "3h"), lags=(1, 3), fields=["temperature_celsius"])
+        expected = frame.sort_values(["station_id", "timestamp"], ignore_index=True)
+        groups = expected.groupby("station_id", observed=True)
+
+        for column, reference in [
+            ("temperature_celsius_lag_3", groups["temperature_celsius"].shift(3)),
+            ("temperature_celsius_diff_1", groups["temperature_celsius"].diff()),
+            ("temperature_celsius_mean_3h",
+             groups.rolling("3h", on="timestamp")["temperature_celsius"].mean().reset_index(drop=True)),
+        ]:
+            np.testing.assert_allclose(features[column].to_numpy(), reference.to_numpy(), equal_nan=True)
+
+    def test_calendar_features(self, frame):
+        features = build_features(frame, windows=(), lags=())
+        assert (features["hour"] == features["timestamp"].dt.hour).all()
+        assert features["hour_sin"].between(-1, 1).all()
+
+
+class TestFeatureStore:
+    """Rafraîchissement : seule la fin des séries est recalculée."""
+
+    @pytest.fixture
+    def collection(self):
+        return mongomock.MongoClient()["test"]["weather_data"]
+
+    def test_incremental_equals_full(self, collection, tmp_path):
+        store = FeatureStore(collection, state_path=str(tmp_path / "state.json"), windows=("1h",), lags=(1, 6))
+        collection.insert_many(measurements("ILAMAD25", 0, 100) + measurements("IICHTE19", 0, 50))
+        first = store.refresh()
+        assert first["written"] == 150
+
+        collection.insert_many(measurements("ILAMAD25", 100, 20))
+        second = store.refresh()
+        # Seules les 20 nouvelles lignes sont recalculées (contexte : 1 h + 6 retards)
+        assert (second["stations"], second["written"]) == (1, 20)
+        assert second["context_rows"] == 32
+        assert store.refresh()["written"] == 0
+
+        incremental = pd.DataFrame(list(collection.database[FEATURE_COLLECTION].find({}, {"_id": 0})))
+        full = FeatureStore(collection, state_path=str(tmp_path / "full.json"), windows=("1h",), lags=(1, 6))
+        full.refresh(full=True)
+        recomputed = pd.DataFrame(list(collection.database[FEATURE_COLLECTION].find({}, {"_id": 0})))
+
+        key = ["station_id", "timestamp"]
+        pd.testing.assert_frame_equal(incremental.sort_values(key, ignore_index=True),
+                                      recomputed.sort_values(key, ignore_index=True))
+
+    def test_late_measurement_recomputes_from_its_timestamp(self, collection, tmp_path):
+        store = FeatureStore(collection, sink="parquet", output_dir=str(tmp_path / "features"),
+                             state_path=str(tmp_path / "state.json"), windows=("1h",), lags=(1,))
+        collection.insert_many(measurements("ILAMAD25", 0, 10) + measurements("ILAMAD25", 11, 10))
+        store.refresh()
+
+        collection.insert_many(measurements("ILAMAD25", 10, 1))
+        assert store.refresh()["written"] == 11
+
+        features = read_features(str(tmp_path / "features"))
+        assert len(features) == 21
+        assert features["timestamp"].is_monotonic_increasing
+        assert features["temperature_celsius_lag_1"].iloc[11] == features["temperature_celsius"].iloc[10]
+
+    def test_duplicate_measurements_written_once(self, collection, tmp_path):
+        """Mesure chargée deux fois (pas d'index unique) : une seule ligne de variables."""
+        store = FeatureStore(collection, state_path=str(tmp_path / "state.json"), windows=("1h",), lags=(1,))
+        collection.insert_many(measurements("ILAMAD25", 0, 10))
+        store.refresh()
+
+        collection.insert_many(measurements("ILAMAD25", 9, 3))
+        assert store.refresh()["written"] == 3
+        assert collection.database[FEATURE_COLLECTION].count_documents({}) == 12
+
+    def test_late_commit_with_smaller_id_is_refreshed(self, collection, tmp_path):
+        """Mesure validée après le rafraîchissement avec un ObjectId plus ancien (écritures concurrentes)."""
+        from bson import ObjectId
+
+        store = FeatureStore(collection, state_path=str(tmp_path / "state.json"), windows=("1h",), lags=(1,))
+        late = dict(measurements("IICHTE19", 5, 1)[0], _id=ObjectId())
+        collection.insert_many(measurements("ILAMAD25", 0, 10) + measurements("IICHTE19", 0, 5))
+        store.refresh()
+        assert store.refresh()["written"] == 0
+
+        collection.insert_one(late)
+        result = store.refresh()
+        assert (result["stations"], result["new_rows"]) == (1, 1)
+        assert collection.database[FEATURE_COLLECTION].count_documents({"station_id": "IICHTE19"}) == 6
+        assert store.refresh()["written"] == 0
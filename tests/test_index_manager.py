@@ -0,0 +1,66 @@
+"""
+Tests de la réconciliation des index MongoDB.
+
+Usage:
+    pytest tests/test_index_manager.py -v
+"""
+
+import mongomock
+import pytest
+from pymongo import ASCENDING
+
+from src.connectors.index_manager import INDEX_SPECS, diff_indexes, reconcile_indexes
+from src.connectors.mongo_connector import MongoConnector
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["test"]["weather_data"]
+
+
+class TestIndexManager:
+    """Tests du diff entre index existants et spécifications."""
+
+    def test_creates_missing_once(self, collection):
+        """Vérifie que tous les index sont créés puis qu'un second passage ne crée rien."""
+        first = reconcile_indexes(collection)
+        second = reconcile_indexes(collection)
+
+        assert sorted(first["created"]) == sorted(spec["name"] for spec in INDEX_SPECS)
+        assert second["created"] == []
+        assert len(second["ok"]) == len(INDEX_SPECS)
+
+    def test_changed_not_rebuilt_without_migrate(self, collection):
+        """Vérifie qu'un index modifié est signalé mais reconstruit seulement avec rebuild_changed."""
+        collection.create_index([("source", ASCENDING), ("station_id", ASCENDING)], name="idx_source")
+
+        plan = reconcile_indexes(collection)
+        assert [spec["name"] for spec in plan["changed"]] == ["idx_source"]
+        assert "idx_source" not in plan["created"]
+
+        migrated = reconcile_indexes(collection, rebuild_changed=True)
+        assert migrated["created"] == ["idx_source"]
+        assert diff_indexes(collection)["changed"] == []
+
+    def test_stale_dropped_on_request(self, collection):
+        """Vérifie que les index non déclarés ne sont supprimés qu'avec drop_stale."""
+        collection.create_index([("legacy", ASCENDING)], name="idx_legacy")
+
+        assert reconcile_indexes(collection)["stale"] == ["idx_legacy"]
+        assert "idx_legacy" in collection.index_information()
+
+        reconcile_indexes(collection, drop_stale=True)
+        assert "idx_legacy" not in collection.index_information()
+
+    def test_init_db_cached(self, monkeypatch):
+        """Vérifie que init_db ne relit pas les index une seconde fois sur la même connexion."""
+        connector = MongoConnector()
+        connector.db = mongomock.MongoClient()["test"]
+        calls = []
+        monkeypatch.setattr("src.connectors.mongo_connector.reconcile_indexes",
+                            lambda coll, **kw: calls.append(kw) or reconcile_indexes(coll, **kw))
+
+        connector.init_db()
+        connector.init_db()
+
+        assert len(calls) == 1
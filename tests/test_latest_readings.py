@@ -0,0 +1,72 @@
+"""
+Tests de la collection matérialisée station_latest.
+"""
+
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.connectors.bson_batches import EncodedBatch
+from src.connectors.latest_readings import latest_per_station, rebuild_latest, update_latest
+from src.connectors.mongo_connector import MongoConnector
+from src.processing.measurement_batch import MeasurementBatch
+
+START = datetime(2025, 12, 1, 8, 0)
+
+
+def measurement(station_id: str, minutes: int, temperature: float = 10.0) -> dict:
+    return {"record_type": "measurement", "station_id": station_id, "station_name": station_id,
+            "source": "weather_underground", "location": {"latitude": 50.0, "longitude": 3.0},
+            "timestamp": START + timedelta(minutes=minutes),
+            "measurements": {"temperature_celsius": temperature, "humidity_percent": None,
+                             "wind_speed_kmh": None, "pressure_hpa": None}}
+
+
+@pytest.fixture
+def connector():
+    connector = MongoConnector()
+    connector.db = mongomock.MongoClient()["test"]
+    return connector
+
+
+class TestLatestPerStation:
+    """Mesure la plus récente de chaque station d'un lot."""
+
+    @pytest.mark.parametrize("wrap", [list, MeasurementBatch.from_documents, EncodedBatch.from_documents])
+    def test_newest_measurement_per_station(self, wrap):
+        docs = [measurement("A", 10, 1.0), measurement("B", 5, 2.0), measurement("A", 30, 3.0),
+                measurement("A", 20, 4.0)]
+        latest = latest_per_station(wrap(docs))
+
+        assert sorted(latest) == ["A", "B"]
+        assert latest["A"]["timestamp"] == START + timedelta(minutes=30)
+        assert latest["A"]["measurements"]["temperature_celsius"] == 3.0
+
+
+class TestUpdateLatest:
+    """Upserts conditionnels : seule une mesure plus récente remplace la mesure stockée."""
+
+    def test_older_batch_does_not_overwrite(self, connector):
+        collection = connector.db["station_latest"]
+        update_latest(collection, [measurement("A", 30, 3.0), measurement("B", 5)])
+        result = update_latest(collection, [measurement("A", 10, 1.0), measurement("B", 40, 9.0)])
+
+        assert result == {"stations": 2, "updated": 1}
+        readings = {doc["_id"]: doc for doc in connector.get_latest_readings()}
+        assert readings["A"]["measurements"]["temperature_celsius"] == 3.0
+        assert readings["B"]["measurements"]["temperature_celsius"] == 9.0
+
+    def test_maintained_on_insert(self, connector):
+        connector.insert_documents([measurement("A", i) for i in range(5)], batch_size=2)
+
+        readings = connector.get_latest_readings(["A"])
+        assert len(readings) == 1
+        assert readings[0]["timestamp"] == START + timedelta(minutes=4)
+
+    def test_rebuild_matches_incremental(self, connector):
+        docs = [measurement("A", 10), measurement("B", 20), measurement("A", 50)]
+        connector.db["weather_data"].insert_many([dict(doc) for doc in docs])
+        assert rebuild_latest(connector.db["weather_data"], connector.db["station_latest"]) == 2
+        assert [doc["timestamp"] for doc in connector.get_latest_readings()] == [
+            START + timedelta(minutes=50), START + timedelta(minutes=20)]
@@ -0,0 +1,91 @@
+"""
+Tests de la représentation compacte des mesures (MeasurementBatch).
+"""
+
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.connectors.dedup import filter_new_documents
+from src.connectors.mongo_connector import MongoConnector
+from src.processing import cleaner
+from src.processing.measurement_batch import MeasurementBatch
+from src.reporting.synthetic_data import write_weather_underground_file
+
+START = datetime(2025, 12, 1, 8, 0)
+FILENAME = "station_la_madelaine_FR.jsonl"
+
+
+def make_documents(station_id: str, count: int) -> list:
+    return [{
+        "record_type": "measurement",
+        "station_id": station_id,
+        "station_name": f"Station {station_id}",
+        "source": "weather_underground",
+        "location": {"city": "Lille", "country": "FR", "latitude": 50.6, "longitude": 3.0, "elevation": 20},
+        "timestamp": START + timedelta(minutes=5 * i),
+        "measurements": {"temperature_celsius": 10.5 + i, "humidity_percent": None,
+                         "wind_speed_kmh": 3.2, "pressure_hpa": 1013.0}
+    } for i in range(count)]
+
+
+class TestMeasurementBatch:
+    """Tests de la mise en colonnes et de la reconstruction des documents."""
+
+    def test_round_trip(self):
+        documents = make_documents("A", 3) + make_documents("B", 2)
+        batch = MeasurementBatch.from_documents(documents)
+
+        assert len(batch.stations) == 2
+        assert batch.documents() == documents
+        assert batch.documents(1, 3) == documents[1:3]
+
+    def test_row_view(self):
+        batch = MeasurementBatch.from_documents(make_documents("A", 3))
+        row = batch[-1]
+
+        assert row.station_id == "A"
+        assert row.timestamp == START + timedelta(minutes=10)
+        assert row.get("temperature_celsius") == 12.5
+        assert row.get("humidity_percent") is None
+        with pytest.raises(AttributeError):
+            row.extra = 1
+
+    def test_concat_merges_stations(self):
+        first = MeasurementBatch.from_documents(make_documents("A", 2))
+        second = MeasurementBatch.from_documents(make_documents("B", 1) + make_documents("A", 1))
+        merged = MeasurementBatch.concat([first, second])
+
+        assert [s["station_id"] for s in merged.stations] == ["A", "B"]
+        assert [row.station_id for row in merged] == ["A", "A", "B", "A"]
+
+    def test_compact_transform_matches_documents(self, tmp_path, monkeypatch):
+        """Tranches de validation et mise en colonnes : mêmes documents qu'en mode liste."""
+        monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+        monkeypatch.setenv("COMPACT_CHUNK_ROWS", "70")
+        path = str(tmp_path / FILENAME)
+        write_weather_underground_file(path, rows=400, noise=0.1, bad_line_every=50)
+
+        expected = cleaner.transform_weather_data(path, FILENAME)
+        batch = cleaner.transform_weather_data(path, FILENAME, compact=True)
+        assert isinstance(batch, MeasurementBatch)
+        assert batch.documents() == expected
+
+
+class TestCompactLoad:
+    """Déduplication et insertion d'un lot compact."""
+
+    def test_dedup_and_insert(self):
+        connector = MongoConnector()
+        connector.db = mongomock.MongoClient()["test"]
+        collection = connector.db[MongoConnector.COLLECTION_NAME]
+        documents = make_documents("A", 5)
+        collection.insert_many([dict(doc) for doc in documents[:2]])
+
+        kept, stats = filter_new_documents(collection, MeasurementBatch.from_documents(documents))
+        assert stats["skipped"] == 2
+        assert kept.documents() == documents[2:]
+
+        assert connector.insert_documents(kept, batch_size=2) == 3
+        assert collection.count_documents({}) == 5
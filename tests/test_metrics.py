@@ -0,0 +1,112 @@
+"""
+Tests des métriques Prometheus du pipeline.
+
+Usage:
+    pytest tests/test_metrics.py -v
+"""
+
+import urllib.request
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from src.monitoring import metrics
+from src.monitoring.metrics import MetricsRegistry, start_http_server
+from src.processing.validator import validate_weather_data
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registre isolé pour chaque test."""
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "_registry", registry)
+    return registry
+
+
+def measurement(temperature):
+    return {
+        "station_id": "ILAMAD25",
+        "location": {"city": "La Madeleine"},
+        "timestamp": datetime(2024, 10, 1, 12, 0),
+        "measurements": {"temperature_celsius": temperature},
+    }
+
+
+class TestMetricsRegistry:
+    """Tests du rendu au format texte Prometheus."""
+
+    def test_counter_render(self, registry):
+        """Vérifie le rendu HELP/TYPE et des labels triés."""
+        registry.inc("etl_rows_parsed_total", 10, source="infoclimat")
+        registry.inc("etl_rows_parsed_total", 5, source="infoclimat")
+
+        text = registry.render()
+
+        assert "# TYPE etl_rows_parsed_total counter" in text
+        assert 'etl_rows_parsed_total{source="infoclimat"} 15' in text
+
+    def test_histogram_buckets_cumulative(self, registry):
+        """Vérifie que les buckets sont cumulatifs et que +Inf = count."""
+        registry.histogram("latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            registry.observe("latency", value)
+
+        text = registry.render()
+
+        assert 'latency_bucket{le="0.1"} 1' in text
+        assert 'latency_bucket{le="1.0"} 2' in text
+        assert 'latency_bucket{le="+Inf"} 3' in text
+        assert "latency_count 3" in text
+
+    def test_type_conflict(self, registry):
+        """Vérifie qu'un même nom ne peut pas changer de type."""
+        registry.inc("etl_documents_inserted_total")
+        with pytest.raises(ValueError):
+            registry.set("etl_documents_inserted_total", 1)
+
+    def test_textfile_and_http(self, registry, tmp_path):
+        """Vérifie l'export fichier texte et l'endpoint /metrics."""
+        registry.set("etl_last_run_success", 1)
+
+        path = registry.write_textfile(str(tmp_path / "metrics.prom"))
+        with open(path, encoding="utf-8") as f:
+            assert "etl_last_run_success 1" in f.read()
+
+        server = start_http_server(0, host="127.0.0.1", registry=registry)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+        finally:
+            server.shutdown()
+        assert "etl_last_run_success 1" in body
+
+
+class TestPipelineInstrumentation:
+    """Tests de l'instrumentation des validateurs et du connecteur MongoDB."""
+
+    def test_rejections_by_rule(self, registry):
+        """Vérifie le comptage des rejets par champ et par règle."""
+        validate_weather_data([measurement(20.0), measurement(99.0)])
+
+        validated = registry.counter("etl_rows_validated_total")
+        rejected = registry.counter("etl_rows_rejected_total")
+        rules = registry.counter("etl_rejections_by_rule_total")
+
+        assert validated.value(record_type="measurement") == 2
+        assert rejected.value(record_type="measurement") == 1
+        assert rules.value(record_type="measurement", field="measurements.temperature_celsius",
+                           rule="less_than_equal") == 1
+
+    def test_insert_metrics(self, registry, monkeypatch):
+        """Vérifie les compteurs d'insertion et l'histogramme de latence par batch."""
+        from src.connectors.mongo_connector import MongoConnector
+
+        connector = MongoConnector()
+        connector.db = mongomock.MongoClient()["test"]
+
+        inserted = connector.insert_documents([{"n": i} for i in range(5)], batch_size=2)
+
+        assert inserted == 5
+        assert registry.counter("etl_documents_inserted_total").value(collection="weather_data") == 5
+        assert 'etl_insert_batch_seconds_count{collection="weather_data"} 3' in registry.render()
@@ -0,0 +1,122 @@
+"""
+Tests du découpage intra-fichier (plages d'octets) et de la fusion des segments.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.processing import cleaner, parallel_ingest
+from src.processing.measurement_batch import MeasurementBatch
+from src.processing.parallel_ingest import merge_segments, split_byte_ranges, transform_range
+from src.processing.timestamps import (build_timestamps, resolve_observation_date, segment_boundary,
+                                       segment_shifts, time_of_day_seconds)
+from src.reporting.synthetic_data import write_weather_underground_file
+
+FILENAME = "station_la_madelaine_FR.jsonl"
+
+
+@pytest.fixture
+def weather_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("STAGING_CACHE_ENABLED", "false")
+    path = tmp_path / FILENAME
+    # Nombreux doublons de minute : des séries coupées entre deux segments
+    write_weather_underground_file(str(path), rows=1500, duplicate_rate=0.4, bad_line_every=97)
+    return str(path)
+
+
+class TestSplitByteRanges:
+    """Tests du découpage aligné sur les fins de ligne."""
+
+    def test_ranges_cover_file_on_line_boundaries(self, weather_file):
+        with open(weather_file, "rb") as f:
+            content = f.read()
+
+        ranges = split_byte_ranges(weather_file, 7)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert content[end - 1:end] == b"\n"
+
+    def test_more_parts_than_lines(self, tmp_path):
+        path = tmp_path / "small.jsonl"
+        path.write_bytes(b'{"a": 1}\n{"a": 2}\n')
+        assert split_byte_ranges(str(path), 10) == [(0, 9), (9, 18)]
+
+
+class TestSegmentMerge:
+    """La fusion des segments donne les documents d'un traitement séquentiel."""
+
+    @pytest.mark.parametrize("parts", [2, 5, 13])
+    def test_same_documents_as_sequential(self, weather_file, parts):
+        expected = cleaner.transform_weather_data(weather_file, FILENAME)
+
+        meta = cleaner.STATION_METADATA[FILENAME]
+        base_date = resolve_observation_date(weather_file, FILENAME)
+        results = [transform_range(weather_file, start, end, meta, base_date)
+                   for start, end in split_byte_ranges(weather_file, parts)]
+
+        assert merge_segments(results) == expected
+
+    def test_segment_shifts_match_whole_series(self):
+        """Passage de minuit et série de doublons coupés au bord d'un segment."""
+        times = pd.Series(["11:50 PM", "11:55 PM", "11:55 PM", "11:55 PM", "12:00 AM", "12:00 AM"])
+        whole = build_timestamps(times, pd.Timestamp("2025-12-01").date())
+
+        seconds = time_of_day_seconds(times)
+        shifts = segment_shifts([segment_boundary(seconds[:2]), segment_boundary(seconds[2:3]),
+                                 segment_boundary(seconds[3:5]), segment_boundary(np.array([]))])
+        assert shifts == [(0, 0), (0, 1), (0, 2), (0, 0)]
+        assert whole.iloc[3] == pd.Timestamp("2025-12-01 23:55:02")
+        assert whole.iloc[4] == pd.Timestamp("2025-12-02 00:00:00")
+
+    def test_segment_shifts_small_backward_step(self):
+        """Léger recul de l'heure au bord d'un segment : même jour, comme en séquentiel."""
+        times = pd.Series(["10:00 AM", "10:05 AM", "10:02 AM", "10:10 AM"])
+        seconds = time_of_day_seconds(times)
+        assert segment_shifts([segment_boundary(seconds[:2]), segment_boundary(seconds[2:])]) == [(0, 0), (0, 0)]
+
+
+class ThreadPool(ThreadPoolExecutor):
+    """Pool de threads à la place des processus : transform_range reste remplaçable par monkeypatch."""
+
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers)
+
+
+class TestParallelTransform:
+    """Même type de résultat et même gestion d'erreur que le traitement séquentiel."""
+
+    @pytest.fixture(autouse=True)
+    def thread_pool(self, monkeypatch):
+        monkeypatch.setattr(parallel_ingest, "ProcessPoolExecutor", ThreadPool)
+
+    def test_compact_records_returned_as_measurement_batch(self, weather_file):
+        expected = cleaner.transform_weather_data(weather_file, FILENAME, compact=True)
+
+        meta = cleaner.STATION_METADATA[FILENAME]
+        documents = parallel_ingest.transform_weather_data_parallel(weather_file, FILENAME, meta,
+                                                                    workers=4, compact=True)
+
+        assert isinstance(documents, MeasurementBatch)
+        assert documents.documents() == expected.documents()
+
+    def test_worker_error_skips_file_unless_strict(self, weather_file, monkeypatch):
+        real_transform = parallel_ingest.transform_range
+
+        def failing_range(file_path, start, *args, **kwargs):
+            if start > 0:
+                raise ValueError("plage illisible")
+            return real_transform(file_path, start, *args, **kwargs)
+
+        monkeypatch.setattr(parallel_ingest, "transform_range", failing_range)
+        meta = cleaner.STATION_METADATA[FILENAME]
+
+        assert parallel_ingest.transform_weather_data_parallel(weather_file, FILENAME, meta, workers=4) == []
+
+        monkeypatch.setenv("PARALLEL_SPLIT_MIN_MB", "0")
+        monkeypatch.setenv("INGEST_WORKERS", "4")
+        with pytest.raises(cleaner.TransformError):
+            cleaner.process_file(weather_file, FILENAME, strict=True)
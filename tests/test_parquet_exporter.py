@@ -0,0 +1,117 @@
+"""
+Tests de l'export Parquet partitionné (MongoDB simulé avec mongomock).
+
+Usage:
+    pytest tests/test_parquet_exporter.py -v
+"""
+
+import os
+import pytest
+from datetime import datetime, timedelta
+
+mongomock = pytest.importorskip("mongomock")
+
+from src.connectors.parquet_exporter import ParquetExporter, read_parquet_export
+
+
+def make_measurement(station_id, timestamp, temperature):
+    return {
+        "record_type": "measurement",
+        "station_id": station_id,
+        "station_name": f"Station {station_id}",
+        "source": "weather_underground",
+        "location": {"city": "Test", "country": "FR", "latitude": 50.0, "longitude": 3.0, "elevation": 20},
+        "timestamp": timestamp,
+        "measurements": {
+            "temperature_celsius": temperature,
+            "humidity_percent": 80.0,
+            "wind_speed_kmh": None,
+            "pressure_hpa": 1010.0
+        }
+    }
+
+
+@pytest.fixture
+def collection():
+    coll = mongomock.MongoClient().db.weather_data
+    start = datetime(2025, 11, 30, 22, 0, 0)
+    docs = [make_measurement("ILAMAD25", start + timedelta(hours=i), 10.0 + i) for i in range(4)]
+    docs += [make_measurement("IICHTE19", start + timedelta(hours=i), 5.0) for i in range(2)]
+    docs.append({"record_type": "station_reference", "station_id": "00052",
+                 "timestamp": start, "location": {}})
+    coll.insert_many(docs)
+    return coll
+
+
+class TestParquetExporter:
+    """Tests pour l'export partitionné et incrémental."""
+
+    def test_partitioned_export(self, collection, tmp_path):
+        """Vérifie le partitionnement station/mois et le contenu aplati."""
+        exporter = ParquetExporter(collection, output_dir=str(tmp_path))
+        stats = exporter.export()
+
+        assert stats["rows"] == 6
+        assert sorted(stats["partitions_written"]) == [
+            "IICHTE19/2025-11", "ILAMAD25/2025-11", "ILAMAD25/2025-12"
+        ]
+        assert os.path.isdir(tmp_path / "station_id=ILAMAD25" / "month=2025-12")
+
+        df = read_parquet_export(str(tmp_path), station_ids=["ILAMAD25"])
+        assert len(df) == 4
+        assert set(df["temperature_celsius"]) == {10.0, 11.0, 12.0, 13.0}
+        assert df["wind_speed_kmh"].isna().all()
+
+    def test_station_and_time_filter(self, collection, tmp_path):
+        """Vérifie le filtre station + période."""
+        exporter = ParquetExporter(collection, output_dir=str(tmp_path))
+        stats = exporter.export(station_ids=["ILAMAD25"], start=datetime(2025, 12, 1))
+
+        assert stats["rows"] == 2
+        assert stats["partitions_written"] == ["ILAMAD25/2025-12"]
+
+    def test_incremental_only_new_partitions(self, collection, tmp_path):
+        """Vérifie qu'un second export n'écrit que les nouvelles partitions et le dernier mois de chaque station."""
+        exporter = ParquetExporter(collection, output_dir=str(tmp_path))
+        exporter.export()
+
+        collection.insert_one(make_measurement("ILAMAD25", datetime(2026, 1, 2, 8, 0), 3.0))
+        stats = exporter.export()
+
+        assert stats["partitions_written"] == ["IICHTE19/2025-11", "ILAMAD25/2025-12", "ILAMAD25/2026-01"]
+        assert stats["partitions_skipped"] == 0
+        assert len(read_parquet_export(str(tmp_path))) == 7
+
+    def test_incremental_refreshes_last_month(self, collection, tmp_path):
+        """Vérifie qu'une mesure chargée après l'export dans le dernier mois (partiel) est exportée."""
+        exporter = ParquetExporter(collection, output_dir=str(tmp_path))
+        exporter.export()
+
+        collection.insert_one(make_measurement("ILAMAD25", datetime(2025, 12, 20, 8, 0), 3.0))
+        stats = exporter.export()
+
+        assert "ILAMAD25/2025-12" in stats["partitions_written"]
+        df = read_parquet_export(str(tmp_path), station_ids=["ILAMAD25"])
+        assert len(df) == 5
+        assert len(exporter.load_manifest()["partitions"]["ILAMAD25/2025-12"]["files"]) == 1
+
+    def test_full_rewrite(self, collection, tmp_path):
+        """Vérifie que le mode complet réécrit sans dupliquer les lignes."""
+        exporter = ParquetExporter(collection, output_dir=str(tmp_path))
+        exporter.export()
+        exporter.export(incremental=False)
+
+        assert len(read_parquet_export(str(tmp_path))) == 6
+
+    def test_append_documents(self, collection, tmp_path):
+        """Vérifie l'ajout de mesures à une partition existante sans relire la collection."""
+        exporter = ParquetExporter(collection, output_dir=str(tmp_path))
+        exporter.export()
+
+        new_doc = make_measurement("ILAMAD25", datetime(2025, 12, 1, 5, 0, 0), 3.0)
+        stats = exporter.append_documents([new_doc])
+
+        assert stats["partitions_written"] == ["ILAMAD25/2025-12"]
+        assert exporter.load_manifest()["partitions"]["ILAMAD25/2025-12"]["rows"] == 3
+        df = read_parquet_export(str(tmp_path), station_ids=["ILAMAD25"])
+        assert len(df) == 5
@@ -0,0 +1,92 @@
+"""
+Tests unitaires pour le moniteur de réplication (calcul des métriques).
+
+Usage:
+    pytest tests/test_replication_monitor.py -v
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+import mongomock
+
+from src.reporting import replication_monitor
+from src.reporting.replication_monitor import (
+    LoadGenerator,
+    summarize_latencies,
+    compute_member_lag,
+    aggregate_member_lag
+)
+
+
+class TestLatencySummary:
+    """Tests pour la distribution des latences."""
+
+    def test_empty_series(self):
+        """Vérifie qu'une série vide ne lève pas d'erreur."""
+        assert summarize_latencies([]) == {"count": 0}
+
+    def test_percentiles(self):
+        """Vérifie les percentiles sur une série connue."""
+        summary = summarize_latencies([float(v) for v in range(1, 101)])
+
+        assert summary["count"] == 100
+        assert summary["min"] == 1.0
+        assert summary["max"] == 100.0
+        assert summary["p50"] == 50.5
+        assert summary["p99"] == 99.01
+
+
+class TestMemberLag:
+    """Tests pour le calcul du retard d'optime."""
+
+    def test_lag_relative_to_primary(self):
+        """Vérifie le lag des secondaires et l'exclusion des arbitres."""
+        now = datetime(2025, 12, 24, 10, 0, 0)
+        status = {"members": [
+            {"name": "mongo1:27017", "stateStr": "PRIMARY", "health": 1, "optimeDate": now},
+            {"name": "mongo2:27017", "stateStr": "SECONDARY", "health": 1,
+             "optimeDate": now - timedelta(seconds=3)},
+            {"name": "mongo-arbiter:27017", "stateStr": "ARBITER", "health": 1}
+        ]}
+
+        lags = {m["name"]: m["lag_seconds"] for m in compute_member_lag(status)}
+
+        assert lags["mongo1:27017"] == 0.0
+        assert lags["mongo2:27017"] == 3.0
+        assert lags["mongo-arbiter:27017"] is None
+
+    def test_aggregate_samples(self):
+        """Vérifie l'agrégation de plusieurs échantillons par membre."""
+        samples = [
+            [{"name": "mongo2", "state": "SECONDARY", "health": 1, "lag_seconds": 1.0}],
+            [{"name": "mongo2", "state": "SECONDARY", "health": 1, "lag_seconds": 3.0}]
+        ]
+
+        result = aggregate_member_lag(samples)
+
+        assert result["mongo2"]["samples"] == 2
+        assert result["mongo2"]["max"] == 3.0
+        assert result["mongo2"]["last"] == 3.0
+        assert result["mongo2"]["mean"] == 2.0
+
+
+class TestPipelineLoad:
+    """Charge "pipeline" : sous-processus arrêtable, documents comptés sur weather_data."""
+
+    def test_stop_terminates_pipeline_and_counts_documents(self, monkeypatch):
+        monkeypatch.setattr(replication_monitor, "PIPELINE_COMMAND",
+                            [sys.executable, "-c", "import time; time.sleep(60)"])
+        client = mongomock.MongoClient()
+        generator = LoadGenerator(client, "test", "pipeline", batch_size=0, write_concern=1)
+        generator.start()
+
+        time.sleep(0.2)
+        client["test"][replication_monitor.PIPELINE_COLLECTION].insert_many([{"n": i} for i in range(5)])
+        generator.stop()
+        generator.join(timeout=10)
+
+        assert not generator.is_alive()
+        assert generator.documents == 5
+        assert generator.interrupted and generator.errors == 0
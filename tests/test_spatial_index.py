@@ -0,0 +1,87 @@
+"""
+Tests de l'index spatial des stations de référence.
+"""
+
+import mongomock
+import numpy as np
+import pytest
+
+from src.connectors.mongo_connector import MongoConnector
+from src.processing import spatial_index
+from src.processing.cleaner import STATION_METADATA
+from src.processing.spatial_index import StationIndex, haversine_km, load_reference_index
+
+
+@pytest.fixture(scope="module")
+def random_stations():
+    """Stations réparties sur le globe, plus un amas dense sur la France."""
+    rng = np.random.default_rng(7)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, 20000)))
+    longitudes = rng.uniform(-180, 180, 20000)
+    latitudes[:5000] = rng.uniform(42, 51, 5000)
+    longitudes[:5000] = rng.uniform(-5, 8, 5000)
+    return [f"S{i}" for i in range(20000)], latitudes, longitudes
+
+
+def reference(station_id: str, latitude: float, longitude: float, content_hash: str = "h") -> dict:
+    return {"record_type": "station_reference", "station_id": station_id, "source": "infoclimat",
+            "location": {"latitude": latitude, "longitude": longitude}, "content_hash": content_hash}
+
+
+class TestStationIndex:
+    """Résultats identiques à une recherche exhaustive."""
+
+    QUERIES = [(50.659, 3.07), (89.9, 10.0), (-89.5, -170.0), (0.0, 179.99), (10.0, -179.9), (-33.9, 151.2)]
+
+    def test_nearest_matches_brute_force(self, random_stations):
+        ids, latitudes, longitudes = random_stations
+        index = StationIndex(ids, latitudes, longitudes)
+        for lat, lon in self.QUERIES:
+            distances = haversine_km(lat, lon, latitudes, longitudes)
+            expected = [ids[i] for i in np.argsort(distances)[:5]]
+            assert [station_id for station_id, _ in index.nearest(lat, lon, k=5)] == expected
+
+    @pytest.mark.parametrize("radius_km", [25, 500])
+    def test_within_radius_matches_brute_force(self, random_stations, radius_km):
+        ids, latitudes, longitudes = random_stations
+        index = StationIndex(ids, latitudes, longitudes)
+        for lat, lon in self.QUERIES:
+            distances = haversine_km(lat, lon, latitudes, longitudes)
+            expected = sorted(ids[i] for i in np.flatnonzero(distances <= radius_km))
+            result = index.within_radius(lat, lon, radius_km)
+            assert sorted(station_id for station_id, _ in result) == expected
+            assert [d for _, d in result] == sorted(d for _, d in result)
+
+    def test_max_radius_and_missing_coordinates(self):
+        index = StationIndex.from_documents([reference("A", 50.57, 3.1), reference("B", None, None),
+                                             reference("C", 48.85, 2.35)])
+        assert len(index) == 2
+        assert [s for s, _ in index.nearest(50.659, 3.07, k=3, max_radius_km=50)] == ["A"]
+
+    def test_pair_measurement_stations(self):
+        index = StationIndex.from_documents([reference("07015", 50.57, 3.1), reference("06400", 51.2, 2.87)])
+        pairs = index.pair_stations(STATION_METADATA.values(), k=1)
+        assert pairs["ILAMAD25"][0][0] == "07015"
+        assert pairs["IICHTE19"][0][0] == "06400"
+
+
+class TestReferenceIndexCache:
+    """Index reconstruit uniquement si les empreintes des stations changent."""
+
+    def test_rebuilt_on_content_change(self):
+        spatial_index.clear_cache()
+        connector = MongoConnector()
+        connector.db = mongomock.MongoClient()["test"]
+        collection = connector.db[MongoConnector.COLLECTION_NAME]
+        collection.insert_many([reference("07015", 50.57, 3.1), reference("06400", 51.2, 2.87)])
+
+        first = load_reference_index(collection, max_age_s=0)
+        assert load_reference_index(collection, max_age_s=0) is first
+
+        collection.update_one({"station_id": "07015"},
+                              {"$set": {"location.latitude": 51.1, "content_hash": "h2"}})
+        assert load_reference_index(collection, max_age_s=0) is not first
+
+        pairs = connector.pair_reference_stations(list(STATION_METADATA.values()), k=2)
+        assert [s for s, _ in pairs["ILAMAD25"]] == ["07015", "06400"]
+        spatial_index.clear_cache()
@@ -0,0 +1,98 @@
+"""
+Tests du cache de staging (JSONL Airbyte → Feather).
+
+Usage:
+    pytest tests/test_staging_cache.py -v
+"""
+
+import json
+import os
+import pytest
+
+from src.processing import staging_cache
+from src.processing.staging_cache import StagingCache
+from src.processing.cleaner import load_airbyte_jsonl, load_infoclimat_rows
+
+
+def write_jsonl(path, payloads):
+    with open(path, "w", encoding="utf-8") as f:
+        for payload in payloads:
+            f.write(json.dumps({"_airbyte_data": payload}) + "\n")
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Cache isolé dans un dossier temporaire."""
+    cache = StagingCache(cache_dir=str(tmp_path / "staging"))
+    monkeypatch.setattr(staging_cache, "_cache", cache)
+    monkeypatch.setenv("STAGING_CACHE_ENABLED", "true")
+    return cache
+
+
+class TestStagingCache:
+    """Tests pour le cache indexé par hash de contenu."""
+
+    def test_miss_then_hit(self, cache, tmp_path):
+        """Vérifie qu'un second chargement est servi par le cache à l'identique."""
+        path = tmp_path / "station_test.jsonl"
+        write_jsonl(path, [{"Time": "12:04 AM", "Temperature": "57.0 °F"},
+                           {"Time": "12:09 AM", "Temperature": "56.8 °F"}])
+
+        first = load_airbyte_jsonl(str(path))
+        second = load_airbyte_jsonl(str(path))
+
+        assert cache.stats["misses"] == 1
+        assert cache.stats["hits"] == 1
+        assert second.equals(first)
+
+    def test_content_change_invalidates(self, cache, tmp_path):
+        """Vérifie qu'un fichier modifié est reparsé."""
+        path = tmp_path / "station_test.jsonl"
+        write_jsonl(path, [{"Time": "12:04 AM"}])
+        load_airbyte_jsonl(str(path))
+
+        write_jsonl(path, [{"Time": "12:04 AM"}, {"Time": "12:09 AM"}])
+        df = load_airbyte_jsonl(str(path))
+
+        assert len(df) == 2
+        assert cache.stats["hits"] == 0
+
+    def test_infoclimat_nested_rows(self, cache, tmp_path):
+        """Vérifie la restitution des stations imbriquées (clés absentes conservées absentes)."""
+        path = tmp_path / "info_climat.jsonl"
+        write_jsonl(path, [{"stations": [
+            {"id": "00052", "name": "Armentières", "license": {"license": "CC BY"}},
+            {"id": "07015", "name": "Lille-Lesquin", "elevation": 47}
+        ]}])
+
+        first = load_infoclimat_rows(str(path))
+        second = load_infoclimat_rows(str(path))
+
+        assert cache.stats["hits"] == 1
+        assert second == first
+
+    def test_explicit_nulls_match_cold_read(self, cache, tmp_path):
+        """Vérifie qu'un hit restitue les clés à None d'origine (et seulement elles)."""
+        path = tmp_path / "info_climat.jsonl"
+        write_jsonl(path, [{"stations": [
+            {"id": "00052", "name": "Armentières", "elevation": None, "license": {"license": None}},
+            {"id": "07015", "name": "Lille-Lesquin", "elevation": 47, "license": {"url": "x"}}
+        ]}])
+
+        cold = load_infoclimat_rows(str(path))
+        hit = load_infoclimat_rows(str(path))
+
+        assert cache.stats["hits"] == 1
+        assert hit == cold
+        assert hit[0]["license"] == {"license": None}
+
+    def test_lru_eviction(self, tmp_path):
+        """Vérifie l'éviction des entrées les plus anciennes au-delà de la taille max."""
+        import pandas as pd
+
+        cache = StagingCache(cache_dir=str(tmp_path / "staging"), max_bytes=1)
+        cache.put("a", pd.DataFrame({"x": [1, 2, 3]}))
+        cache.put("b", pd.DataFrame({"x": [4, 5, 6]}))
+
+        assert cache.stats["evictions"] == 2
+        assert not os.path.exists(cache.path_for("a"))
@@ -0,0 +1,44 @@
+"""
+Tests du budget de démarrage du point d'entrée ETL.
+
+Le budget (STARTUP_BUDGET_MS, défaut 250 ms) est volontairement large par
+rapport à la mesure locale (~50 ms) pour absorber la variance des runners CI ;
+une régression typique (pandas ou boto3 importé en tête) dépasse 500 ms.
+
+Usage:
+    pytest tests/test_startup.py -v
+"""
+
+import os
+import statistics
+
+from src.reporting.benchmark_startup import measure_import, parse_importtime
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "250"))
+
+
+class TestStartupBudget:
+    """Tests du temps d'import de src.main."""
+
+    def test_parse_importtime(self):
+        """Vérifie l'analyse des lignes -X importtime."""
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        entries = parse_importtime(output)
+
+        assert entries == [
+            {"module": "json.decoder", "self_us": 120, "cumulative_us": 120, "depth": 1},
+            {"module": "json", "self_us": 300, "cumulative_us": 420, "depth": 0},
+        ]
+
+    def test_no_heavy_import(self):
+        """Vérifie que pandas, boto3, pymongo, pydantic... ne sont pas chargés à l'import."""
+        assert measure_import("src.main")["heavy_loaded"] == []
+
+    def test_startup_budget(self):
+        """Vérifie que l'import de src.main reste sous le budget."""
+        median_ms = statistics.median(measure_import("src.main")["total_ms"] for _ in range(3))
+        assert median_ms < STARTUP_BUDGET_MS, f"Démarrage : {median_ms:.1f} ms > {STARTUP_BUDGET_MS} ms"